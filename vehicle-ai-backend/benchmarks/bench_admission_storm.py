@@ -0,0 +1,93 @@
+# benchmarks/bench_admission_storm.py - Reconnect loop from one host against the /ws admission caps
+"""
+50 dashboards on separate hosts watch one vehicle while a misbehaving client
+on a single host loops on reconnect, --attempts times, never closing its
+sockets. Runs once with the per-host cap disabled and once with it set, and
+reports the cost per connect attempt, how many sockets the storm ended up
+holding, and the time to fan one state frame out afterwards.
+
+Usage: python benchmarks/bench_admission_storm.py [--attempts N] [--host-cap N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.websocket_manager import ConnectionManager, PreparedFrame
+
+DASHBOARDS = 50
+
+
+class FakeWebSocket:
+    def __init__(self, host: str):
+        self.client = SimpleNamespace(host=host)
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, data: str):
+        self.received += 1
+
+
+async def storm(attempts: int, host_cap: int):
+    manager = ConnectionManager()
+    manager.max_connections = 0
+    manager.max_connections_per_vehicle = 0
+    manager.max_connections_per_host = host_cap
+
+    dashboards = [FakeWebSocket(f"10.0.0.{index}") for index in range(DASHBOARDS)]
+    for websocket in dashboards:
+        await manager.connect(websocket, "fleet-1")
+
+    start = time.perf_counter()
+    for _ in range(attempts):
+        await manager.connect(FakeWebSocket("10.6.6.6"), "fleet-1")
+    connect_us = (time.perf_counter() - start) / attempts * 1e6
+    held = manager.host_connections.get("10.6.6.6", 0)
+
+    # Let the welcome frames drain, then time one broadcast to every socket of the vehicle
+    await asyncio.sleep(0.05)
+    before = sum(websocket.received for websocket in dashboards)
+    start = time.perf_counter()
+    await manager.broadcast(PreparedFrame.from_message({"type": "state_update"}), "fleet-1")
+    while sum(websocket.received for websocket in dashboards) < before + DASHBOARDS:
+        await asyncio.sleep(0)
+    fanout_ms = (time.perf_counter() - start) * 1000
+
+    rejected = manager.get_connection_stats()["admission"]["rejected"]
+    await manager.shutdown()
+    return connect_us, held, rejected, fanout_ms
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=5000)
+    parser.add_argument("--host-cap", type=int, default=16)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print(f"🚪 Admission storm benchmark ({args.attempts} reconnects from one host, {DASHBOARDS} dashboards)")
+    print("=" * 72)
+    print(f"   {'per-host cap':>12} {'µs/attempt':>11} {'storm sockets':>14} {'rejected':>9} {'fanout ms':>10}")
+
+    for host_cap in (0, args.host_cap):
+        connect_us, held, rejected, fanout_ms = await storm(args.attempts, host_cap)
+        label = str(host_cap) if host_cap else "off"
+        print(f"   {label:>12} {connect_us:>11.1f} {held:>14} {rejected:>9} {fanout_ms:>10.2f}")
+
+    print("=" * 72)
+    print("📊 Rejected connects never reach accept(), so the dashboards' fanout stays at its normal cost")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
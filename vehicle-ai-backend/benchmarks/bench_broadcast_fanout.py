@@ -0,0 +1,93 @@
+# benchmarks/bench_broadcast_fanout.py - Broadcast fanout cost against connection count
+"""
+Broadcasts a full translated state snapshot to 10 ... 10,000 simulated sockets
+attached to one vehicle and compares serializing the message for every
+recipient (send_json style) with ConnectionManager.broadcast of a
+PreparedFrame that is serialized once and shared.
+
+Usage: python benchmarks/bench_broadcast_fanout.py [--rounds N] [--counts 10,100,1000,10000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.vehicle_state import VehicleStateManager
+from services.state_broadcaster import StateBroadcaster
+from services.websocket_manager import ConnectionManager, PreparedFrame
+
+
+class FakeWebSocket:
+    """Stands in for a Starlette WebSocket; sends complete immediately"""
+
+    client = None
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send_text(self, data: str):
+        self.bytes_sent += len(data)
+
+
+def attach_sockets(manager: ConnectionManager, vehicle_id: str, count: int):
+    """Register fake sockets directly, skipping accept() and the welcome message"""
+    for _ in range(count):
+        manager._register(FakeWebSocket(), vehicle_id, "full")
+
+
+async def prepared_broadcast(manager: ConnectionManager, vehicle_id: str, message):
+    """Broadcast one shared frame and wait until every writer task has sent it"""
+    await manager.broadcast(PreparedFrame.from_message(message), vehicle_id=vehicle_id)
+    while any(client.queue_depth for client in manager.clients.values()):
+        await asyncio.sleep(0)
+
+
+async def per_recipient_broadcast(manager: ConnectionManager, vehicle_id: str, message):
+    """Emulates serializing the message once per recipient"""
+    for websocket in manager._broadcast_targets(vehicle_id):
+        await websocket.send_text(json.dumps(message))
+
+
+async def time_broadcasts(broadcast, rounds: int) -> float:
+    """Average milliseconds per broadcast"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await broadcast()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--counts", default="10,100,1000,10000")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    vehicle_state = VehicleStateManager("bench")
+    message = StateBroadcaster.snapshot_message(vehicle_state)
+
+    print("📡 Broadcast fanout benchmark")
+    print(f"   {len(json.dumps(message))} byte state snapshot, {args.rounds} broadcasts per size")
+    print("=" * 66)
+    print(f"   {'sockets':>8} {'per-recipient ms':>18} {'prepared ms':>13} {'µs/socket':>10} {'speedup':>8}")
+
+    for count in (int(value) for value in args.counts.split(",")):
+        manager = ConnectionManager()
+        attach_sockets(manager, "bench", count)
+
+        before = await time_broadcasts(lambda: per_recipient_broadcast(manager, "bench", message), args.rounds)
+        after = await time_broadcasts(lambda: prepared_broadcast(manager, "bench", message), args.rounds)
+        print(f"   {count:>8} {before:>18.2f} {after:>13.2f} {after * 1000 / count:>10.2f} {before / after:>7.1f}x")
+        await manager.shutdown()
+
+    print("=" * 66)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+# benchmarks/bench_burst_coalescing.py - Fanout under bursty input with coalesced broadcast ticks
+"""
+Simulates a user holding "volume up" / dragging the brightness slider: a burst
+of commands arriving every --interval-ms for one vehicle watched by N clients.
+Compares publishing every change immediately (tick 0) with merging changes
+into one update per tick, and reports frames sent and the delay between the
+last command and the client seeing its final state.
+
+Usage: python benchmarks/bench_burst_coalescing.py [--clients N] [--commands N] [--interval-ms MS] [--ticks 0,16,33,50]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.vehicle_registry import VehicleRegistry
+from services.state_broadcaster import StateBroadcaster
+from services.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Counts frames and remembers when the last state frame arrived"""
+
+    client = None
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.last_version = None
+        self.last_frame_at = 0.0
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+        self.last_version = json.loads(data).get("version")
+        self.last_frame_at = time.perf_counter()
+
+
+async def run(tick_ms: int, clients: int, commands: int, interval: float, mode: str):
+    """Return (frames, bytes, ms from last command to final state on every client)"""
+    registry = VehicleRegistry()
+    manager = ConnectionManager()
+    manager.send_queue_size = commands + 16
+    broadcaster = StateBroadcaster(registry, manager, tick_ms=tick_ms)
+    broadcaster.attach()
+    vehicle = registry.get("bench")
+
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    for websocket in sockets:
+        manager._register(websocket, "bench", mode)
+
+    for i in range(commands):
+        action = "infotainment_volume_up" if i % 2 == 0 else "lights_brighten"
+        await vehicle.execute_command(action, {})
+        last_command_at = time.perf_counter()
+        await asyncio.sleep(interval)
+
+    while any(websocket.last_version != vehicle.version for websocket in sockets):
+        await asyncio.sleep(0.001)
+    settle = (max(websocket.last_frame_at for websocket in sockets) - last_command_at) * 1000
+
+    frames = sum(websocket.frames for websocket in sockets)
+    sent = sum(websocket.bytes for websocket in sockets)
+    await manager.shutdown()
+    return frames, sent, max(settle, 0.0)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--commands", type=int, default=100)
+    parser.add_argument("--interval-ms", type=float, default=5.0)
+    parser.add_argument("--ticks", default="0,16,33,50")
+    parser.add_argument("--mode", choices=("full", "delta"), default="delta")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("🎚️  Burst coalescing benchmark")
+    print(f"   {args.clients} clients, {args.commands} commands every {args.interval_ms:.0f} ms, {args.mode} mode")
+    print("=" * 60)
+    print(f"   {'tick ms':>8} {'frames':>10} {'KB':>10} {'frames/client':>14} {'settle ms':>10}")
+
+    for tick_ms in (int(value) for value in args.ticks.split(",")):
+        frames, sent, settle = await run(tick_ms, args.clients, args.commands, args.interval_ms / 1000.0, args.mode)
+        print(f"   {tick_ms:>8} {frames:>10} {sent / 1024:>10.0f} {frames / args.clients:>14.1f} {settle:>10.1f}")
+
+    print("=" * 60)
+    print("📊 Coalesced ticks bound fanout to one frame per client per tick")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+# benchmarks/bench_dispatch.py - Command dispatch micro-benchmark
+"""
+Measures the cost of resolving every known action name (canonical names and
+aliases) to its handler. The registry lookup is compared with a linear scan
+that mirrors the old prefix cascade + if/elif chain, and the end-to-end cost of
+VehicleStateManager.execute_command is reported per action.
+
+Usage: python benchmarks/bench_dispatch.py [--iterations N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.command_registry import COMMAND_REGISTRY, SUBSYSTEMS
+from models.vehicle_state import VehicleStateManager
+
+PREFIXES = [f"{subsystem}_" for subsystem in SUBSYSTEMS]
+ACTIONS = list(COMMAND_REGISTRY.keys())
+
+
+def linear_dispatch(action: str):
+    """Emulates the old dispatch: prefix cascade, then string comparisons in declaration order"""
+    for prefix in PREFIXES:
+        if action.startswith(prefix):
+            for candidate in ACTIONS:
+                if candidate.startswith(prefix) and candidate == action:
+                    return COMMAND_REGISTRY[candidate]
+            return None
+    return None
+
+
+def time_lookup(dispatch, iterations: int) -> float:
+    """Average nanoseconds per dispatch across all actions"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for action in ACTIONS:
+            dispatch(action)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(ACTIONS)) * 1e9
+
+
+async def time_execute(iterations: int) -> float:
+    """Average microseconds per execute_command call across all actions"""
+    manager = VehicleStateManager("bench")
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for action in ACTIONS:
+            await manager.execute_command(action, {})
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(ACTIONS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("🧭 Command dispatch micro-benchmark")
+    print(f"   {len(ACTIONS)} action names, {args.iterations} iterations")
+    print("=" * 50)
+
+    linear = time_lookup(linear_dispatch, args.iterations)
+    registry = time_lookup(COMMAND_REGISTRY.get, args.iterations)
+    print(f"   Linear if/elif scan (before): {linear:8.1f} ns/dispatch")
+    print(f"   Registry lookup (after):      {registry:8.1f} ns/dispatch")
+
+    execute = asyncio.run(time_execute(max(1, args.iterations // 20)))
+    print(f"   execute_command end-to-end:   {execute:8.2f} µs/command")
+
+    print("=" * 50)
+    print(f"📊 Dispatch speedup: {linear / registry:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_frame_encoding.py - Size and encode cost of JSON vs binary state frames
+"""
+Encodes the same state snapshot and a typical single-field delta as JSON text
+(translated frontend shape) and with each available binary encoding (compact
+short-key layout), and reports bytes per frame and encode time per frame.
+
+Usage: python benchmarks/bench_frame_encoding.py [--iterations N]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.vehicle_registry import VehicleRegistry
+from services import frame_codec
+from services.state_broadcaster import StateBroadcaster
+
+DELTA_CHANGES = {"climate": {"temperature": 23.5}}
+
+
+def measure(encode, iterations: int):
+    """Return (bytes per frame, microseconds per encode)"""
+    size = len(encode())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode()
+    return size, (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    vehicle_state = VehicleRegistry().get("bench")
+    state = vehicle_state.get_all_states()
+
+    print("📦 State frame encoding benchmark")
+    print(f"   encodings available: {', '.join(frame_codec.available_encodings())}")
+    print("=" * 60)
+    print(f"   {'frame':<10} {'encoding':<10} {'bytes':>8} {'µs/encode':>11} {'size vs json':>13}")
+
+    for frame, encoders in (
+        ("snapshot", {
+            "json": lambda: json.dumps(StateBroadcaster.snapshot_message(vehicle_state)).encode(),
+            "binary": lambda encoding: frame_codec.encode_snapshot(encoding, "bench", state),
+        }),
+        ("delta", {
+            "json": lambda: json.dumps(StateBroadcaster.delta_message("bench", 0, 1, DELTA_CHANGES)).encode(),
+            "binary": lambda encoding: frame_codec.encode_delta(encoding, "bench", 0, 1, DELTA_CHANGES),
+        }),
+    ):
+        json_size, json_us = measure(encoders["json"], args.iterations)
+        print(f"   {frame:<10} {'json':<10} {json_size:>8} {json_us:>11.2f} {'1.00x':>13}")
+        for encoding in frame_codec.available_encodings()[1:]:
+            size, us = measure(lambda: encoders["binary"](encoding), args.iterations)
+            print(f"   {frame:<10} {encoding:<10} {size:>8} {us:>11.2f} {size / json_size:>12.2f}x")
+
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_heartbeat.py - Heartbeat bandwidth against connection count
+"""
+Simulates N connected clients that each send one heartbeat ping and measures
+the frames and bytes the server sends in response. The previous handling
+re-broadcast every ping to every client (O(n^2) frames); per-connection
+handling answers each ping with one pong to its sender (O(n)).
+
+Usage: python benchmarks/bench_heartbeat.py [--counts 10,100,1000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Counts the frames and bytes the server sends to one client"""
+
+    client = None
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+
+
+async def heartbeat_round(count: int, rebroadcast: bool):
+    """Every client pings once; returns (frames sent, bytes sent, seconds)"""
+    manager = ConnectionManager()
+    manager.send_queue_size = count + 16  # measure bandwidth, not queue drops
+    sockets = [FakeWebSocket() for _ in range(count)]
+    for websocket in sockets:
+        manager._register(websocket, "bench", "full")
+
+    start = time.perf_counter()
+    for websocket in sockets:
+        message = {"type": "ping", "timestamp": time.time()}
+        if rebroadcast:
+            await manager.broadcast(json.dumps(message))
+        else:
+            await manager.handle_heartbeat(message, websocket)
+        await asyncio.sleep(0)
+
+    while any(client.queue_depth for client in manager.clients.values()):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    frames = sum(websocket.frames for websocket in sockets)
+    sent = sum(websocket.bytes for websocket in sockets)
+    await manager.shutdown()
+    return frames, sent, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", default="10,100,1000")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("💓 Heartbeat bandwidth load test (one ping per client)")
+    print("=" * 76)
+    print(f"   {'clients':>8} {'rebroadcast frames':>19} {'KB':>9} {'per-sender frames':>18} {'KB':>7} {'ms':>7}")
+
+    for count in (int(value) for value in args.counts.split(",")):
+        before_frames, before_bytes, _ = await heartbeat_round(count, rebroadcast=True)
+        after_frames, after_bytes, after_seconds = await heartbeat_round(count, rebroadcast=False)
+        print(f"   {count:>8} {before_frames:>19} {before_bytes / 1024:>9.0f} {after_frames:>18} "
+              f"{after_bytes / 1024:>7.0f} {after_seconds * 1000:>7.1f}")
+
+    print("=" * 76)
+    print("📊 Rebroadcast grows with clients²; per-sender pongs grow linearly with clients")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
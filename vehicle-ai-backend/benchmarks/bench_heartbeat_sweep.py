@@ -0,0 +1,90 @@
+# benchmarks/bench_heartbeat_sweep.py - Ping burst size with a fixed sweep vs the heartbeat timer wheel
+"""
+Connects N simulated clients and runs one heartbeat interval of pings (on a
+simulated clock, without waiting). The fixed sweep pings every client at the
+same moment once per interval; the timer wheel pings each client at its own
+offset, one wheel tick at a time. Reports the largest burst of pings at one
+moment and how long the event loop spent queueing and writing a burst (the
+stall other work on the loop sees).
+
+Usage: python benchmarks/bench_heartbeat_sweep.py [--clients N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Counts pings delivered, across all clients"""
+
+    client = None
+    delivered = 0
+
+    async def send_text(self, data: str):
+        FakeWebSocket.delivered += 1
+
+
+async def drain(expected: int):
+    while FakeWebSocket.delivered < expected:
+        await asyncio.sleep(0)
+
+
+async def run(clients: int, staggered: bool):
+    """Return (largest burst, median stall ms, worst stall ms, pings sent) over one interval"""
+    manager = ConnectionManager()
+    manager.idle_timeout = 0
+    FakeWebSocket.delivered = 0
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    for websocket in sockets:
+        manager._register(websocket, "bench", "full")
+    await asyncio.sleep(0.01)  # let the writer tasks start before measuring
+
+    bursts = []
+    if staggered:
+        wheel = manager.heartbeat_timers
+        origin = time.monotonic()
+        for tick in range(1, wheel.slots + 2):
+            start = time.perf_counter()
+            pinged, _ = manager.run_heartbeat_timers(origin + tick * wheel.tick)
+            await drain(manager.heartbeat_stats["pings_sent"])
+            bursts.append((pinged, time.perf_counter() - start))
+    else:
+        start = time.perf_counter()
+        await manager.ping_all_connections()
+        await drain(clients)
+        bursts.append((clients, time.perf_counter() - start))
+
+    pings = FakeWebSocket.delivered
+    await manager.shutdown()
+    stalls = sorted(stall * 1000 for _, stall in bursts)
+    return max(burst for burst, _ in bursts), stalls[len(stalls) // 2], stalls[-1], pings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("⏱️  Heartbeat sweep benchmark")
+    print(f"   {args.clients} clients, one heartbeat interval")
+    print("=" * 72)
+    print(f"   {'':<22} {'largest burst':>13} {'median stall ms':>16} {'worst stall ms':>15} {'pings':>6}")
+
+    for label, staggered in (("Fixed sweep (before)", False), ("Timer wheel (after)", True)):
+        burst, median, worst, pings = await run(args.clients, staggered)
+        print(f"   {label:<22} {burst:>13} {median:>16.1f} {worst:>15.1f} {pings:>6}")
+
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+# benchmarks/bench_inference_offload.py - ML parser /parse throughput and /health latency under load
+"""
+Loads ml-parser/api_server.py (only ml-parser on sys.path) with a CPU-bound
+stand-in parser that spends --work-ms of pure Python per command, and drives
+it in-process through httpx's ASGITransport: --callers concurrent clients
+send --per-caller /parse requests each (backing off and retrying on 503)
+while a prober hits /health every few milliseconds. Runs with inference
+inline on the event loop (the previous behaviour), on the thread pool and
+on the process pool, and reports parse throughput, 503s and /health latency.
+
+Usage: python benchmarks/bench_inference_offload.py [--callers N] [--per-caller N] [--work-ms MS] [--workers N]
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import time
+
+ML_PARSER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ml-parser")
+sys.path.insert(0, ML_PARSER_DIR)
+
+import httpx
+
+logging.disable(logging.CRITICAL)
+import api_server  # noqa: E402
+
+
+class CpuBoundParser:
+    """Stand-in for EnsembleCommandParser: burns a fixed amount of CPU per command"""
+
+    def __init__(self, work_ms: float):
+        # Calibrate how many hash rounds take work_ms on this machine
+        rounds, start = 0, time.perf_counter()
+        while time.perf_counter() - start < 0.05:
+            self._burn(1000)
+            rounds += 1000
+        self.rounds = int(rounds * work_ms / 50)
+
+    @staticmethod
+    def _burn(rounds: int):
+        digest = b"vehicle"
+        for _ in range(rounds):
+            digest = hashlib.sha256(digest).digest()
+        return digest
+
+    def parse_command(self, text: str) -> dict:
+        self._burn(self.rounds)
+        return {"intent": "lights", "action": "lights_on", "confidence": 0.9, "parameters": {}, "source": "stand-in"}
+
+
+async def run(mode: str, callers: int, per_caller: int):
+    api_server.INFERENCE_EXECUTOR = mode
+    api_server.inference_stats.update(pending=0, completed=0, failed=0, rejected=0)
+    transport = httpx.ASGITransport(app=api_server.app)
+    health_latencies = []
+    answered_at = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://ml-parser") as client:
+        async def caller(index: int):
+            for sequence in range(per_caller):
+                while True:
+                    response = await client.post("/parse", json={"text": f"turn on light {index}.{sequence}"})
+                    if response.status_code != 503:
+                        assert response.status_code == 200, response.text
+                        break
+                    # Retry-After is in whole seconds; back off briefly to keep the run short
+                    await asyncio.sleep(0.01)
+
+        async def prober():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                health_latencies.append((time.perf_counter() - start) * 1000)
+                answered_at.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(prober())
+        start = time.perf_counter()
+        await asyncio.gather(*(caller(index) for index in range(callers)))
+        end = time.perf_counter()
+        done.set()
+        await probe_task
+
+    await api_server.shutdown_inference_executor()
+    health_latencies.sort()
+    # Longest stretch of the run in which /health answered nothing
+    moments = [start] + [moment for moment in answered_at if moment < end] + [end]
+    longest_gap = max(later - earlier for earlier, later in zip(moments, moments[1:])) * 1000
+    return callers * per_caller / (end - start), api_server.inference_stats["rejected"], health_latencies, longest_gap
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=32)
+    parser.add_argument("--per-caller", type=int, default=8)
+    parser.add_argument("--work-ms", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=16)
+    args = parser.parse_args()
+
+    api_server.parser = CpuBoundParser(args.work_ms)
+    api_server.PARSER_AVAILABLE = True
+    api_server.INFERENCE_WORKERS = args.workers
+    api_server.INFERENCE_QUEUE_SIZE = args.queue_size
+
+    print(f"🧠 Inference offload benchmark ({args.callers} callers x {args.per_caller} parses,"
+          f" {args.work_ms:g} ms CPU each, {args.workers} workers, queue {args.queue_size}, {os.cpu_count()} CPUs)")
+    print("=" * 84)
+    print(f"   {'executor':<8} {'parses/s':>9} {'503s':>6} {'probes':>7} {'health p50 ms':>14} {'p99 ms':>8}"
+          f" {'longest silence ms':>19}")
+
+    for mode in ("inline", "thread", "process"):
+        rate, rejected, health, longest_gap = await run(mode, args.callers, args.per_caller)
+        p50 = health[len(health) // 2]
+        p99 = health[min(len(health) - 1, int(len(health) * 0.99))]
+        print(f"   {mode:<8} {rate:>9.0f} {rejected:>6} {len(health):>7} {p50:>14.2f} {p99:>8.2f} {longest_gap:>19.0f}")
+
+    print("=" * 84)
+    print("📊 Off the loop, /health answers between inferences instead of queueing behind them")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
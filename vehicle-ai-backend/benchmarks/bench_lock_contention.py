@@ -0,0 +1,90 @@
+# benchmarks/bench_lock_contention.py - Lock contention benchmark for VehicleStateManager
+"""
+Runs a mixed climate/lights/seats/infotainment command stream against a single
+vehicle with a slow update callback registered (standing in for a WebSocket
+broadcast), and compares the old single-lock behaviour with per-subsystem locks.
+
+Usage: python benchmarks/bench_lock_contention.py [--commands N] [--workers N] [--callback-ms MS]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.vehicle_state import VehicleStateManager
+
+MIXED_COMMANDS = [
+    ("climate_increase_temperature", {}),
+    ("lights_dim", {}),
+    ("seats_heat_on", {"seat": "driver"}),
+    ("infotainment_volume_up", {}),
+    ("climate_decrease_temperature", {}),
+    ("lights_brighten", {}),
+    ("seats_heat_off", {"seat": "driver"}),
+    ("infotainment_volume_down", {}),
+]
+
+
+class SingleLockStateManager(VehicleStateManager):
+    """Emulates the previous behaviour: one lock held for the whole call, callbacks included"""
+
+    def __init__(self, vehicle_id: str = "bench"):
+        super().__init__(vehicle_id)
+        self._global_lock = asyncio.Lock()
+
+    async def execute_command(self, action, parameters):
+        async with self._global_lock:
+            return await super().execute_command(action, parameters)
+
+
+async def run_stream(manager: VehicleStateManager, total_commands: int, workers: int, callback_ms: float) -> float:
+    """Drive the command stream through the manager and return commands per second"""
+
+    async def slow_callback(action, parameters, result):
+        await asyncio.sleep(callback_ms / 1000.0)
+
+    manager.register_update_callback(slow_callback)
+
+    per_worker = total_commands // workers
+
+    async def worker(offset: int):
+        for i in range(per_worker):
+            action, parameters = MIXED_COMMANDS[(offset + i) % len(MIXED_COMMANDS)]
+            await manager.execute_command(action, dict(parameters))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(workers)))
+    elapsed = time.perf_counter() - start
+    return (per_worker * workers) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--callback-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("🔒 VehicleStateManager lock contention benchmark")
+    print(f"   {args.commands} mixed commands, {args.workers} concurrent workers, "
+          f"{args.callback_ms:.1f} ms update callback")
+    print("=" * 50)
+
+    before = await run_stream(SingleLockStateManager(), args.commands, args.workers, args.callback_ms)
+    print(f"   Single lock (before):       {before:10.0f} commands/s")
+
+    after = await run_stream(VehicleStateManager("bench"), args.commands, args.workers, args.callback_ms)
+    print(f"   Per-subsystem locks (after): {after:10.0f} commands/s")
+
+    print("=" * 50)
+    print(f"📊 Speedup: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+# benchmarks/bench_ml_circuit_breaker.py - Voice command latency while the ML service is hung
+"""
+Points MLParserService at a local socket that accepts connections but never
+answers (a hung ML service), with the request timeout lowered to --timeout
+seconds, and sends --commands voice commands one after another. Without the
+breaker (threshold set out of reach) every command waits out the timeout;
+with it, commands after the first failure_threshold ones go straight to the
+keyword fallback.
+
+Usage: python benchmarks/bench_ml_circuit_breaker.py [--commands N] [--timeout SECONDS]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from services.ml_parser_service import MLParserService
+
+
+async def hung_server():
+    """A server that reads requests and never replies"""
+    async def swallow(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while await reader.read(65536):
+                pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(swallow, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run(url: str, commands: int, failure_threshold: int):
+    service = MLParserService(url)
+    service.breaker.failure_threshold = failure_threshold
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(commands):
+        command_start = time.perf_counter()
+        result = await service.parse_command("turn on the lights")
+        latencies.append(time.perf_counter() - command_start)
+        assert result["source"] == "fallback", result
+    elapsed = time.perf_counter() - start
+    stats = service.breaker.get_stats()
+    await service.close()
+    return sorted(latencies), elapsed, stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    settings.ML_SERVICE_TIMEOUT = args.timeout
+    server, url = await hung_server()
+
+    print(f"⚡ ML circuit breaker benchmark ({args.commands} commands, hung service, {args.timeout}s timeout)")
+    print("=" * 70)
+    print(f"   {'breaker':<8} {'p50':>10} {'p99':>10} {'total s':>8} {'state':>10} {'refused':>8}")
+
+    for label, threshold in (("off", args.commands + 1), ("on", settings.ML_BREAKER_FAILURE_THRESHOLD)):
+        latencies, elapsed, stats = await run(url, args.commands, threshold)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"   {label:<8} {p50 * 1e6:>8.0f}µs {p99 * 1e6:>8.0f}µs {elapsed:>8.2f}"
+              f" {stats['state']:>10} {stats['rejected']:>8}")
+
+    print("=" * 70)
+    server.close()
+    print("📊 Once open, the breaker answers from the local fallback without touching the network")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+# benchmarks/bench_ml_client_pool.py - Parse latency with a per-request vs a shared pooled ML client
+"""
+Starts a stub ML parser (/parse and /health, no model) on a local port and
+sends --requests voice commands through MLParserService.parse_command, with
+--concurrency callers at a time, in two ways:
+
+  per-request  a new MLParserService for every command, as the NLP router did
+               (new client and SSL context, new TCP connection, fresh health check, never closed)
+  shared       one MLParserService for the whole run, as the app now does
+
+and reports p50/p99 latency and throughput for each.
+
+Usage: python benchmarks/bench_ml_client_pool.py [--requests N] [--concurrency N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI
+
+from services.ml_parser_service import MLParserService
+
+COMMANDS = ["turn on the lights", "set temperature to 22", "volume up", "heat the driver seat"]
+
+
+def create_stub_app() -> FastAPI:
+    stub = FastAPI()
+
+    @stub.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @stub.post("/parse")
+    async def parse(payload: dict):
+        return {"action": "lights_on", "confidence": 0.95, "parameters": {}, "intent": "lights",
+                "text": payload.get("text")}
+
+    return stub
+
+
+def start_stub_server() -> Tuple[uvicorn.Server, str]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_stub_app(), host="127.0.0.1", port=port,
+                                           log_level="critical", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run(url: str, requests: int, concurrency: int, shared: bool):
+    """Return (sorted latencies in ms, total seconds)"""
+    shared_service = MLParserService(url) if shared else None
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    leaked = []
+
+    async def one(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            service = shared_service
+            if service is None:
+                service = MLParserService(url)
+                leaked.append(service)
+            result = await service.parse_command(COMMANDS[index % len(COMMANDS)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert result["source"] == "ml_parser", result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    # The router never closed its per-request clients; close them here only to keep the run clean
+    for service in leaked + ([shared_service] if shared_service else []):
+        await service.close()
+    return sorted(latencies), elapsed
+
+
+def percentile(values, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    server, url = start_stub_server()
+
+    print(f"🔗 ML client pool benchmark ({args.requests} commands, {args.concurrency} concurrent, stub at {url})")
+    print("=" * 66)
+    print(f"   {'client':<12} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'commands/s':>11}")
+
+    for label, shared in (("per-request", False), ("shared", True)):
+        latencies, elapsed = await run(url, args.requests, args.concurrency, shared)
+        print(f"   {label:<12} {percentile(latencies, 0.50):>8.2f} {percentile(latencies, 0.99):>8.2f}"
+              f" {statistics.mean(latencies):>8.2f} {args.requests / elapsed:>11.0f}")
+
+    print("=" * 66)
+    server.should_exit = True
+    print("📊 The shared client skips the client setup, TCP handshake and health check that every per-request client paid for")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+# benchmarks/bench_multi_worker_bus.py - State fanout throughput with N workers on the Unix socket bus
+"""
+Starts a BusHub and N worker processes on one box. Each worker runs its own
+VehicleRegistry, ConnectionManager and StateBroadcaster joined to the bus,
+with --clients simulated WebSocket clients for every worker's vehicle. Each
+worker executes --commands commands on its own vehicle; the run ends when
+every worker holds the final version of every vehicle and all its clients
+have received their frames. Reports commands/s across the cluster and
+frames/s delivered to clients.
+
+The same-vehicle run has every worker write vehicle-0 instead, each write a
+compare-and-set on the version the worker last saw, retried on conflict.
+It checks that no acknowledged write is lost: every acknowledged version is
+unique, the final version is the total number of writes, and all workers
+end with the same state.
+
+Usage: python benchmarks/bench_multi_worker_bus.py [--workers 1,2,4] [--commands N] [--clients N]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.vehicle_registry import VehicleRegistry
+from services.broadcast_bus import UnixSocketBus, run_hub
+from services.state_broadcaster import StateBroadcaster
+from services.websocket_manager import ConnectionManager
+
+COMMANDS = ["infotainment_volume_up", "lights_brighten", "climate_increase_temperature", "lights_dim"]
+
+
+class FakeWebSocket:
+    """Counts frames delivered, across all clients of one worker"""
+
+    client = None
+    delivered = 0
+
+    async def send_text(self, data: str):
+        FakeWebSocket.delivered += 1
+
+
+async def worker(index: int, workers: int, path: str, commands: int, clients: int, shared: bool, barrier, results):
+    logging.disable(logging.CRITICAL)
+    registry = VehicleRegistry()
+    manager = ConnectionManager()
+    manager.send_queue_size = commands * workers + 16
+    bus = UnixSocketBus(path, worker_id=f"worker-{index}")
+    broadcaster = StateBroadcaster(registry, manager, tick_ms=0, bus=bus)
+    broadcaster.attach()
+    await broadcaster.start_bus()
+    await asyncio.wait_for(bus.connected.wait(), timeout=10)
+
+    vehicle_ids = ["vehicle-0"] if shared else [f"vehicle-{k}" for k in range(workers)]
+    for vehicle_id in vehicle_ids:
+        for _ in range(clients):
+            manager._register(FakeWebSocket(), vehicle_id, "delta")
+
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    start = time.perf_counter()
+    own = registry.get(vehicle_ids[0 if shared else index])
+    acknowledged, conflicts = [], 0
+    while len(acknowledged) < commands:
+        action = COMMANDS[len(acknowledged) % len(COMMANDS)]
+        result = await own.execute_command(action, {}, expected_version=own.version if shared else None)
+        if result["success"]:
+            acknowledged.append((own.vehicle_id, result["version"]))
+        elif result.get("conflict"):
+            conflicts += 1
+        else:
+            raise RuntimeError(f"{action} failed: {result.get('error')}")
+        if len(acknowledged) % 64 == 0:
+            await asyncio.sleep(0)
+
+    final_version = commands * workers if shared else commands
+    expected_frames = commands * workers * clients
+    while (FakeWebSocket.delivered < expected_frames
+           or any(registry.get(vehicle_id).version < final_version for vehicle_id in vehicle_ids)):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    states = {vehicle_id: registry.get(vehicle_id).get_all_states() for vehicle_id in vehicle_ids}
+    results.put((index, elapsed, FakeWebSocket.delivered, bus.stats["received"], acknowledged, conflicts, states))
+    await broadcaster.stop_bus()
+    await manager.shutdown()
+
+
+def worker_process(*args):
+    asyncio.run(worker(*args))
+
+
+def run(workers: int, commands: int, clients: int, shared: bool = False):
+    path = os.path.join(tempfile.mkdtemp(), "bus.sock")
+    hub = multiprocessing.Process(target=run_hub, args=(path,), daemon=True)
+    hub.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+
+    barrier = multiprocessing.Barrier(workers)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker_process,
+                                         args=(index, workers, path, commands, clients, shared, barrier, results))
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    outcome = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+    hub.terminate()
+
+    elapsed = max(result[1] for result in outcome)
+    frames = sum(result[2] for result in outcome)
+    remote = sum(result[3] for result in outcome)
+    acknowledged = [write for result in outcome for write in result[4]]
+    conflicts = sum(result[5] for result in outcome)
+
+    # No acknowledged write may be lost or share its version with another one
+    assert len(set(acknowledged)) == len(acknowledged) == commands * workers, "acknowledged writes were lost"
+    states = [result[6] for result in outcome]
+    assert all(state == states[0] for state in states), "workers did not converge on the same state"
+    return elapsed, frames, remote, conflicts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("👥 Multi-worker broadcast bus benchmark")
+    print(f"   {args.commands} commands per worker, {args.clients} clients per vehicle per worker")
+    print("=" * 66)
+    print(f"   {'workers':>8} {'seconds':>8} {'commands/s':>11} {'frames/s':>10} {'bus events in':>14}")
+
+    worker_counts = [int(value) for value in args.workers.split(",")]
+    for workers in worker_counts:
+        elapsed, frames, remote, _ = run(workers, args.commands, args.clients)
+        print(f"   {workers:>8} {elapsed:>8.2f} {args.commands * workers / elapsed:>11.0f} "
+              f"{frames / elapsed:>10.0f} {remote:>14}")
+
+    print("-" * 66)
+    print("   Same vehicle, compare-and-set writes from every worker")
+    print(f"   {'workers':>8} {'seconds':>8} {'writes/s':>11} {'frames/s':>10} {'CAS conflicts':>14}")
+    for workers in worker_counts:
+        elapsed, frames, _, conflicts = run(workers, args.commands, args.clients, shared=True)
+        print(f"   {workers:>8} {elapsed:>8.2f} {args.commands * workers / elapsed:>11.0f} "
+              f"{frames / elapsed:>10.0f} {conflicts:>14}")
+
+    print("=" * 66)
+    print("📊 Every worker converged on every vehicle's final version, and no acknowledged write was lost")
+
+
+if __name__ == "__main__":
+    main()
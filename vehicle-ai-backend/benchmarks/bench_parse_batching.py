@@ -0,0 +1,115 @@
+# benchmarks/bench_parse_batching.py - Parse throughput with and without client-side micro-batching
+"""
+Starts a stub ML parser on a local port whose /parse and /parse-batch block
+the server for --call-ms per request plus --item-ms per text (inference runs
+inline, as in ml-parser/api_server.py), then has 1, 8, 32 and 128 concurrent
+callers each send --per-caller distinct voice commands through
+MLParserService.parse_command. The parse cache is disabled and every text is
+unique, so only batching is measured.
+
+Usage: python benchmarks/bench_parse_batching.py [--callers 1,8,32,128] [--per-caller N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI
+
+from config import settings
+from services.ml_parser_service import MLParserService
+
+
+def create_stub_app(call_ms: float, item_ms: float) -> FastAPI:
+    stub = FastAPI()
+
+    def parse_one(text: str) -> dict:
+        return {"action": "climate_set_temperature", "confidence": 0.9, "parameters": {}, "intent": "climate",
+                "original_text": text}
+
+    @stub.post("/parse")
+    async def parse(payload: dict):
+        time.sleep((call_ms + item_ms) / 1000)
+        return parse_one(payload["text"])
+
+    @stub.post("/parse-batch")
+    async def parse_batch(payload: dict):
+        texts: List[str] = payload["texts"]
+        time.sleep((call_ms + item_ms * len(texts)) / 1000)
+        return {"results": [parse_one(text) for text in texts], "count": len(texts)}
+
+    return stub
+
+
+def start_stub_server(call_ms: float, item_ms: float) -> Tuple[uvicorn.Server, str]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_stub_app(call_ms, item_ms), host="127.0.0.1", port=port,
+                                           log_level="critical", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run(url: str, callers: int, per_caller: int, batch_size: int):
+    """Return (commands per second, sorted latencies in ms, average batch)"""
+    settings.ML_BATCH_MAX_SIZE = batch_size
+    service = MLParserService(url)
+    latencies = []
+
+    async def caller(index: int):
+        for sequence in range(per_caller):
+            start = time.perf_counter()
+            result = await service.parse_command(f"set temperature to {index}.{sequence}")
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert result["source"] == "ml_parser", result
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(index) for index in range(callers)))
+    elapsed = time.perf_counter() - start
+    average_batch = service.batcher.get_stats()["average_batch"] if service.batcher else 1.0
+    await service.close()
+    return callers * per_caller / elapsed, sorted(latencies), average_batch
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", default="1,8,32,128")
+    parser.add_argument("--per-caller", type=int, default=20)
+    parser.add_argument("--call-ms", type=float, default=4)
+    parser.add_argument("--item-ms", type=float, default=0.25)
+    parser.add_argument("--batch-size", type=int, default=settings.ML_BATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    settings.ML_PARSE_CACHE_SIZE = 0
+    server, url = start_stub_server(args.call_ms, args.item_ms)
+
+    print(f"📦 Parse batching benchmark ({args.call_ms:g} ms per call + {args.item_ms:g} ms per text,"
+          f" batches up to {args.batch_size}, {settings.ML_BATCH_MAX_DELAY_MS:g} ms window)")
+    print("=" * 76)
+    print(f"   {'callers':>7} {'single cmd/s':>13} {'p50 ms':>8} {'batched cmd/s':>14} {'p50 ms':>8} {'avg batch':>10}")
+
+    for callers in (int(value) for value in args.callers.split(",")):
+        single_rate, single_latencies, _ = await run(url, callers, args.per_caller, 1)
+        batched_rate, batched_latencies, average_batch = await run(url, callers, args.per_caller, args.batch_size)
+        print(f"   {callers:>7} {single_rate:>13.0f} {single_latencies[len(single_latencies) // 2]:>8.1f}"
+              f" {batched_rate:>14.0f} {batched_latencies[len(batched_latencies) // 2]:>8.1f} {average_batch:>10.1f}")
+
+    print("=" * 76)
+    server.should_exit = True
+    print("📊 Batching pays the per-call cost once per batch; a lone caller pays at most the batching window")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+# benchmarks/bench_parse_cache.py - Parse latency with and without the parse-result cache
+"""
+Starts a stub ML parser on a local port that takes --inference-ms per /parse
+(standing in for model inference) and replays a skewed stream of voice
+commands: a handful of phrases account for most of the traffic, spoken with
+varying case, punctuation and spacing. Runs the stream through
+MLParserService.parse_command with the cache disabled and enabled, and
+reports the hit rate and p50/p99 latency.
+
+Usage: python benchmarks/bench_parse_cache.py [--commands N] [--inference-ms MS]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI
+
+from config import settings
+from services.ml_parser_service import MLParserService
+
+PHRASES = [
+    "turn on the lights", "set temperature to 22", "volume up", "volume down", "next song",
+    "heat the driver seat", "turn off the lights", "set temperature to 21.5", "play some music",
+    "dim the lights", "open the sunroof", "navigate home", "call mom", "pause the music",
+    "set fan speed to 3", "turn on seat massage", "what is the temperature", "mute", "skip", "defrost",
+]
+VARIANTS = [str, str.capitalize, str.upper, lambda text: text + "!", lambda text: text.replace(" ", "  ") + "."]
+
+
+def create_stub_app(inference_ms: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.get("/health")
+    async def health():
+        return {"status": "healthy", "model_version": "bench-1"}
+
+    @stub.post("/parse")
+    async def parse(payload: dict):
+        await asyncio.sleep(inference_ms / 1000)
+        return {"action": "lights_on", "confidence": 0.95, "parameters": {}, "intent": "lights",
+                "original_text": payload.get("text"), "model_version": "bench-1"}
+
+    return stub
+
+
+def start_stub_server(inference_ms: float) -> Tuple[uvicorn.Server, str]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_stub_app(inference_ms), host="127.0.0.1", port=port,
+                                           log_level="critical", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def command_stream(count: int):
+    """Zipf-like: the n-th most common phrase is spoken about 1/n as often as the first"""
+    rng = random.Random(22)
+    weights = [1 / rank for rank in range(1, len(PHRASES) + 1)]
+    return [rng.choice(VARIANTS)(phrase) for phrase in rng.choices(PHRASES, weights, k=count)]
+
+
+async def run(url: str, commands, cache_size: int):
+    settings.ML_PARSE_CACHE_SIZE = cache_size
+    service = MLParserService(url)
+    latencies = []
+    for text in commands:
+        start = time.perf_counter()
+        await service.parse_command(text)
+        latencies.append((time.perf_counter() - start) * 1000)
+    stats = service.cache.get_stats()
+    await service.close()
+    return sorted(latencies), stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=2000)
+    parser.add_argument("--inference-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    server, url = start_stub_server(args.inference_ms)
+    commands = command_stream(args.commands)
+
+    print(f"📦 Parse cache benchmark ({args.commands} commands over {len(PHRASES)} phrases,"
+          f" {args.inference_ms:g} ms inference)")
+    print("=" * 62)
+    print(f"   {'cache':<6} {'hit rate':>9} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'total s':>8}")
+
+    for label, cache_size in (("off", 0), ("on", 512)):
+        latencies, stats = await run(url, commands, cache_size)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"   {label:<6} {stats['hit_rate']:>9.1%} {p50:>8.3f} {p99:>8.2f}"
+              f" {sum(latencies) / len(latencies):>8.2f} {sum(latencies) / 1000:>8.2f}")
+
+    print("=" * 62)
+    server.should_exit = True
+    print("📊 Only the first utterance of each phrase reaches the ML service while its entry lives")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+# benchmarks/bench_single_flight.py - Upstream /parse calls when a fleet sends the same phrase at once
+"""
+Starts a stub ML parser on a local port that takes --inference-ms per /parse
+and counts the requests it serves, then has --cars callers send the same
+phrase through one MLParserService at the same moment (as after a
+fleet-wide prompt). The parse cache is disabled so only in-flight
+deduplication is measured. Runs with single-flight bypassed and enabled.
+
+Usage: python benchmarks/bench_single_flight.py [--cars 10,100,500] [--inference-ms MS]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI
+
+from config import settings
+from services.ml_parser_service import MLParserService
+
+PHRASE = "Turn on the hazard lights"
+upstream_calls = 0
+
+
+def create_stub_app(inference_ms: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/parse")
+    async def parse(payload: dict):
+        global upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(inference_ms / 1000)
+        return {"action": "hazard_lights_on", "confidence": 0.95, "parameters": {}, "intent": "lights"}
+
+    return stub
+
+
+def start_stub_server(inference_ms: float) -> Tuple[uvicorn.Server, str]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_stub_app(inference_ms), host="127.0.0.1", port=port,
+                                           log_level="critical", access_log=False, backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run(service: MLParserService, cars: int, single_flight: bool):
+    """Return (upstream calls, seconds until every car had its result)"""
+    global upstream_calls
+    upstream_calls = 0
+    parse = service.parse_command if single_flight else service._request_parse
+    start = time.perf_counter()
+    results = await asyncio.gather(*(parse(PHRASE) for _ in range(cars)))
+    elapsed = time.perf_counter() - start
+    assert all(result["action"] == "hazard_lights_on" for result in results), results[0]
+    return upstream_calls, elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cars", default="10,100,500")
+    parser.add_argument("--inference-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    settings.ML_PARSE_CACHE_SIZE = 0
+    server, url = start_stub_server(args.inference_ms)
+    service = MLParserService(url)
+
+    print(f"✈️  Single-flight benchmark (one phrase from every car at once, {args.inference_ms:g} ms inference)")
+    print("=" * 68)
+    print(f"   {'cars':>5} {'upstream (off)':>15} {'ms (off)':>9} {'upstream (on)':>14} {'ms (on)':>8}")
+
+    for cars in (int(value) for value in args.cars.split(",")):
+        calls_off, seconds_off = await run(service, cars, single_flight=False)
+        calls_on, seconds_on = await run(service, cars, single_flight=True)
+        print(f"   {cars:>5} {calls_off:>15} {seconds_off * 1000:>9.0f} {calls_on:>14} {seconds_on * 1000:>8.0f}")
+
+    print("=" * 68)
+    print(f"   collapsed calls: {service.inflight.get_stats()['collapsed']}")
+    await service.close()
+    server.should_exit = True
+    print("📊 Concurrent identical parses share one upstream request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
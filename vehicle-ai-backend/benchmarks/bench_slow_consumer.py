@@ -0,0 +1,114 @@
+# benchmarks/bench_slow_consumer.py - Impact of one stalled client on broadcast latency
+"""
+Attaches N fast simulated clients and one stalled client (every send takes
+--stall-ms) to a vehicle, then runs a series of broadcasts. Compares the
+previous broadcast (one send task per socket, awaited one after another) with
+the per-connection writer queues: how long the broadcast call blocks its
+caller, and how long the fast clients wait for each frame.
+
+Usage: python benchmarks/bench_slow_consumer.py [--clients N] [--broadcasts N] [--stall-ms MS]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.websocket_manager import ConnectionManager, PreparedFrame
+
+
+class FakeWebSocket:
+    """Records when each frame arrives; a stalled socket takes stall seconds per send"""
+
+    client = None
+
+    def __init__(self, stall: float = 0.0):
+        self.stall = stall
+        self.latencies = []
+
+    async def send_text(self, data: str):
+        if self.stall:
+            await asyncio.sleep(self.stall)
+        self.latencies.append(time.perf_counter() - float(data))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def sequential_await_broadcast(sockets, text: str):
+    """Emulates the previous broadcast: concurrent send tasks awaited in order"""
+    tasks = [asyncio.create_task(websocket.send_text(text)) for websocket in sockets]
+    for task in tasks:
+        await task
+
+
+async def run(mode: str, clients: int, broadcasts: int, stall: float):
+    """Return (broadcast call latencies, fast-client delivery latencies) in ms"""
+    fast = [FakeWebSocket() for _ in range(clients)]
+    slow = FakeWebSocket(stall)
+    sockets = [slow] + fast
+
+    manager = ConnectionManager()
+    if mode == "queued":
+        for websocket in sockets:
+            manager._register(websocket, "bench", "full")
+
+    call_latencies = []
+    for _ in range(broadcasts):
+        text = repr(time.perf_counter())
+        start = time.perf_counter()
+        if mode == "queued":
+            await manager.broadcast(PreparedFrame(text, droppable=True), vehicle_id="bench")
+        else:
+            await sequential_await_broadcast(sockets, text)
+        call_latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.001)  # updates arrive spaced out, as from a live vehicle
+
+    # Let the fast clients finish receiving
+    while sum(len(websocket.latencies) for websocket in fast) < clients * broadcasts:
+        await asyncio.sleep(0.001)
+
+    stats = manager.get_connection_stats()["send_queues"]
+    await manager.shutdown()
+    delivery = [latency * 1000 for websocket in fast for latency in websocket.latencies]
+    return call_latencies, delivery, stats
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--broadcasts", type=int, default=50)
+    parser.add_argument("--stall-ms", type=float, default=200.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("🐢 Slow consumer benchmark")
+    print(f"   {args.clients} fast clients + 1 client stalling {args.stall_ms:.0f} ms per frame, "
+          f"{args.broadcasts} broadcasts")
+    print("=" * 66)
+
+    for label, mode in (("Sequential await (before)", "sequential"), ("Writer queues (after)", "queued")):
+        calls, delivery, stats = await run(mode, args.clients, args.broadcasts, args.stall_ms / 1000.0)
+        print(f"   {label}")
+        print(f"      broadcast call:     median {statistics.median(calls):8.2f} ms   p99 {percentile(calls, 0.99):8.2f} ms")
+        print(f"      fast-client frames: median {statistics.median(delivery):8.2f} ms   "
+              f"p99 {percentile(delivery, 0.99):8.2f} ms")
+        if mode == "queued":
+            print(f"      frames dropped for the stalled client: {stats['frames_dropped']}, "
+                  f"evictions: {stats['evictions']}")
+
+    print("=" * 66)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+# benchmarks/bench_state_payload.py - Full snapshot vs delta state update payloads
+"""
+Runs a mixed command stream against a VehicleStateManager and, for every
+update, builds the WebSocket frame a client would receive in "full" mode
+(translated snapshot, serialized as before deltas existed) and in "delta"
+mode (changed frontend fields only, as StateBroadcaster.delta_frame builds
+it) for every available frame encoding. Reports average frame size and
+build + serialization time per update.
+
+Usage: python benchmarks/bench_state_payload.py [--updates N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.vehicle_registry import VehicleRegistry
+from models.vehicle_state import VehicleStateManager
+from services import frame_codec
+from services.state_broadcaster import StateBroadcaster, changes_by_subsystem
+from services.websocket_manager import ConnectionManager
+
+MIXED_COMMANDS = [
+    ("climate_increase_temperature", {}),
+    ("lights_dim", {}),
+    ("seats_heat_on", {"seat": "driver"}),
+    ("infotainment_volume_up", {}),
+    ("climate_decrease_temperature", {}),
+    ("lights_brighten", {}),
+    ("seats_heat_off", {"seat": "driver"}),
+    ("infotainment_volume_down", {}),
+]
+
+
+async def collect_results(updates: int):
+    """Execute the command stream and return the manager plus every command result"""
+    manager = VehicleStateManager("bench")
+    results = []
+    for i in range(updates):
+        action, parameters = MIXED_COMMANDS[i % len(MIXED_COMMANDS)]
+        results.append(await manager.execute_command(action, dict(parameters)))
+    return manager, results
+
+
+def measure(build_frame, results):
+    """Average frame bytes and microseconds per frame; build_frame returns the encoded frame"""
+    total_bytes = 0
+    start = time.perf_counter()
+    for result in results:
+        total_bytes += len(build_frame(result))
+    elapsed = time.perf_counter() - start
+    return total_bytes / len(results), elapsed / len(results) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=20000)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("📦 State update payload benchmark")
+    print(f"   {args.updates} mixed updates")
+    print("=" * 50)
+
+    manager, results = asyncio.run(collect_results(args.updates))
+
+    full_bytes, full_us = measure(
+        lambda result: json.dumps(StateBroadcaster.snapshot_message(manager)).encode("utf-8"), results
+    )
+    print(f"   {'Full snapshot (before)':<24} {full_bytes:8.0f} bytes  {full_us:8.2f} µs/update")
+
+    broadcaster = StateBroadcaster(VehicleRegistry(), ConnectionManager())
+    ratios = []
+    for encoding in frame_codec.available_encodings():
+        delta_bytes, delta_us = measure(
+            lambda result: broadcaster.delta_frame(manager.vehicle_id, result["version"] - 1, result["version"],
+                                                   changes_by_subsystem(result), encoding).data,
+            results
+        )
+        ratios.append((encoding, full_bytes / delta_bytes, full_us / delta_us))
+        print(f"   {'Delta, ' + encoding:<24} {delta_bytes:8.0f} bytes  {delta_us:8.2f} µs/update")
+
+    print("=" * 50)
+    for encoding, size_ratio, speed_ratio in ratios:
+        print(f"📊 {encoding:<8} delta: payload reduction {size_ratio:.1f}x, serialization speedup {speed_ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
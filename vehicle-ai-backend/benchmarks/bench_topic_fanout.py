@@ -0,0 +1,101 @@
+# benchmarks/bench_topic_fanout.py - Outbound bandwidth with per-subsystem topic subscriptions
+"""
+Connects N widget-style clients to one vehicle, each interested in a single
+subsystem, and runs a mixed command stream through the StateBroadcaster.
+Compares the bytes and frames sent when every client receives every update
+(the default subscription) with clients subscribed only to their subsystem.
+
+Usage: python benchmarks/bench_topic_fanout.py [--clients N] [--updates N] [--mode full|delta]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.command_registry import SUBSYSTEMS
+from models.vehicle_registry import VehicleRegistry
+from services.state_broadcaster import StateBroadcaster
+from services.websocket_manager import ConnectionManager
+
+MIXED_COMMANDS = [
+    ("climate_increase_temperature", {}),
+    ("lights_dim", {}),
+    ("seats_heat_on", {"seat": "driver"}),
+    ("infotainment_volume_up", {}),
+    ("climate_decrease_temperature", {}),
+    ("lights_brighten", {}),
+    ("seats_heat_off", {"seat": "driver"}),
+    ("infotainment_volume_down", {}),
+]
+
+
+class FakeWebSocket:
+    """Counts the frames and bytes the server sends to one client"""
+
+    client = None
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+
+
+async def run(clients: int, updates: int, mode: str, use_topics: bool):
+    """Return (frames, bytes) sent for the command stream"""
+    registry = VehicleRegistry()
+    manager = ConnectionManager()
+    manager.send_queue_size = updates + 16
+    StateBroadcaster(registry, manager, tick_ms=0).attach()  # per-update fanout, no coalescing
+    vehicle = registry.get("bench")
+
+    sockets = []
+    for index in range(clients):
+        websocket = FakeWebSocket()
+        manager._register(websocket, "bench", mode)
+        if use_topics:
+            manager.unsubscribe(websocket, ["*"])
+            manager.subscribe(websocket, [SUBSYSTEMS[index % len(SUBSYSTEMS)]])
+        sockets.append(websocket)
+
+    for i in range(updates):
+        action, parameters = MIXED_COMMANDS[i % len(MIXED_COMMANDS)]
+        await vehicle.execute_command(action, dict(parameters))
+        while any(client.queue_depth for client in manager.clients.values()):
+            await asyncio.sleep(0)
+
+    frames = sum(websocket.frames for websocket in sockets)
+    sent = sum(websocket.bytes for websocket in sockets)
+    await manager.shutdown()
+    return frames, sent
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=400)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--mode", choices=("full", "delta"), default="full")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    print("🎯 Topic subscription fanout benchmark")
+    print(f"   {args.clients} single-subsystem clients, {args.updates} mixed updates, {args.mode} mode")
+    print("=" * 50)
+
+    before_frames, before_bytes = await run(args.clients, args.updates, args.mode, use_topics=False)
+    after_frames, after_bytes = await run(args.clients, args.updates, args.mode, use_topics=True)
+    print(f"   All subsystems (before): {before_frames:8} frames {before_bytes / 1024:10.0f} KB")
+    print(f"   Topic subscribed (after): {after_frames:7} frames {after_bytes / 1024:10.0f} KB")
+
+    print("=" * 50)
+    print(f"📊 Outbound bandwidth reduction: {before_bytes / after_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,6 +7,13 @@ class Settings:
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "true").lower() == "true"
+    # Uvicorn worker processes; more than one shares state through the broadcast bus (reload is off then)
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    # "auto" (Unix socket bus when WORKERS > 1), "inprocess" or "unix"
+    BROADCAST_BUS: str = os.getenv("BROADCAST_BUS", "auto").lower()
+    BROADCAST_BUS_SOCKET: str = os.getenv("BROADCAST_BUS_SOCKET", "/tmp/vehicle-ai-backend-bus.sock")
+    # Seconds a write waits for the vehicle's bus-wide write lock before failing
+    BROADCAST_BUS_LOCK_TIMEOUT: float = float(os.getenv("BROADCAST_BUS_LOCK_TIMEOUT", "5"))
 
     # CORS configuration
     ALLOWED_ORIGINS: List[str] = [
@@ -24,11 +31,56 @@ class Settings:
     # ML Service configuration
     ML_SERVICE_URL: str = os.getenv("ML_SERVICE_URL", "http://localhost:8001")
     ML_SERVICE_TIMEOUT: int = int(os.getenv("ML_SERVICE_TIMEOUT", "30"))
+    # Connection pool of the shared ML service client
+    ML_SERVICE_MAX_CONNECTIONS: int = int(os.getenv("ML_SERVICE_MAX_CONNECTIONS", "100"))
+    ML_SERVICE_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("ML_SERVICE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    ML_SERVICE_KEEPALIVE_EXPIRY: float = float(os.getenv("ML_SERVICE_KEEPALIVE_EXPIRY", "30"))
+    # HTTP/2 to the ML service (needs the h2 package; falls back to HTTP/1.1 without it)
+    ML_SERVICE_HTTP2: bool = os.getenv("ML_SERVICE_HTTP2", "false").lower() == "true"
+    # Consecutive failed parse requests that open the ML circuit breaker
+    ML_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("ML_BREAKER_FAILURE_THRESHOLD", "5"))
+    # Seconds an open breaker waits before letting a trial request through
+    ML_BREAKER_RECOVERY_TIMEOUT: float = float(os.getenv("ML_BREAKER_RECOVERY_TIMEOUT", "30"))
+    # Seconds between background /health probes of the ML service (0 disables)
+    ML_HEALTH_PROBE_INTERVAL: float = float(os.getenv("ML_HEALTH_PROBE_INTERVAL", "10"))
+    # Parse results cached per normalized utterance (0 disables), and their lifetime in seconds
+    ML_PARSE_CACHE_SIZE: int = int(os.getenv("ML_PARSE_CACHE_SIZE", "512"))
+    ML_PARSE_CACHE_TTL: float = float(os.getenv("ML_PARSE_CACHE_TTL", "300"))
+    # Parse requests sent together to /parse-batch: at most this many (1 disables batching) ...
+    ML_BATCH_MAX_SIZE: int = int(os.getenv("ML_BATCH_MAX_SIZE", "16"))
+    # ... gathered for at most this many milliseconds
+    ML_BATCH_MAX_DELAY_MS: float = float(os.getenv("ML_BATCH_MAX_DELAY_MS", "2"))
 
     # WebSocket configuration
     WEBSOCKET_HEARTBEAT_INTERVAL: int = int(os.getenv("WEBSOCKET_HEARTBEAT_INTERVAL", "30"))
+    # Seconds without any message from a client (pong, ping or request) before it is reaped; 0 disables
+    WEBSOCKET_IDLE_TIMEOUT: int = int(os.getenv("WEBSOCKET_IDLE_TIMEOUT", "90"))
+    # Requests carrying a request_id that may run concurrently on one socket
+    WEBSOCKET_MAX_INFLIGHT: int = int(os.getenv("WEBSOCKET_MAX_INFLIGHT", "8"))
+    # Connection caps checked before a socket is accepted (0 disables a cap)
+    WEBSOCKET_MAX_CONNECTIONS: int = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS", "10000"))
+    WEBSOCKET_MAX_CONNECTIONS_PER_HOST: int = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS_PER_HOST", "256"))
+    WEBSOCKET_MAX_CONNECTIONS_PER_VEHICLE: int = int(os.getenv("WEBSOCKET_MAX_CONNECTIONS_PER_VEHICLE", "1000"))
+    # "full" sends the whole state after every change, "delta" only the changed fields
+    # (clients can override per connection with /ws?updates=delta)
+    STATE_BROADCAST_MODE: str = os.getenv("STATE_BROADCAST_MODE", "full").lower()
+    # Recent state changes kept per vehicle so reconnecting clients can resume (0 disables)
+    STATE_REPLAY_BUFFER_SIZE: int = int(os.getenv("STATE_REPLAY_BUFFER_SIZE", "256"))
+    # Window in ms in which state changes are merged into one update per vehicle (0 publishes immediately)
+    STATE_BROADCAST_TICK_MS: int = int(os.getenv("STATE_BROADCAST_TICK_MS", "33"))
+    # Outbound frames buffered per client before the drop policy applies
+    WEBSOCKET_SEND_QUEUE_SIZE: int = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "256"))
+    # "drop_oldest", "coalesce" or "disconnect"
+    WEBSOCKET_DROP_POLICY: str = os.getenv("WEBSOCKET_DROP_POLICY", "drop_oldest").lower()
 
     # Vehicle state configuration
+    DEFAULT_VEHICLE_ID: str = os.getenv("DEFAULT_VEHICLE_ID", "default")
+    # Vehicles with live state at once (0 = unlimited); beyond this the least recently used one is dropped
+    MAX_VEHICLES: int = int(os.getenv("MAX_VEHICLES", "10000"))
+    # Seconds without any access after which a vehicle's state is dropped; it comes back with
+    # default settings and a higher version (0 keeps it forever)
+    VEHICLE_IDLE_TIMEOUT: float = float(os.getenv("VEHICLE_IDLE_TIMEOUT", "3600"))
+    MAX_BATCH_COMMANDS: int = int(os.getenv("MAX_BATCH_COMMANDS", "50"))
     DEFAULT_TEMPERATURE: float = float(os.getenv("DEFAULT_TEMPERATURE", "22.0"))
     DEFAULT_FAN_SPEED: int = int(os.getenv("DEFAULT_FAN_SPEED", "3"))
     DEFAULT_VOLUME: int = int(os.getenv("DEFAULT_VOLUME", "50"))
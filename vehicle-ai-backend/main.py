@@ -375,7 +375,7 @@
 
 
 # main.py - Complete file with ML integration and WebSocket handling
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import asyncio
@@ -399,9 +399,14 @@ if sys.platform == "win32":
         pass  # Ignore if already configured
 
 # Import routers
-from routers import climate, infotainment, lights, seats, nlp
+from routers import climate, infotainment, lights, seats, nlp, commands
 from models.vehicle_state import VehicleStateManager
+from models.vehicle_registry import VehicleRegistry
+from routers.dependencies import get_vehicle_state
 from services.websocket_manager import ConnectionManager
+from services.state_broadcaster import StateBroadcaster, UPDATE_MODES
+from services import frame_codec
+from services.broadcast_bus import create_bus
 from services.ml_parser_service import MLParserService
 from config import settings
 
@@ -436,67 +441,6 @@ app.add_middleware(
 )
 
 
-def translate_backend_to_frontend_state(backend_state: Dict[str, Any]) -> Dict[str, Any]:
-    """Translate backend state structure to match frontend expectations"""
-    translated = {}
-
-    # Translate climate
-    if "climate" in backend_state:
-        translated["climate"] = {
-            "temperature": backend_state["climate"].get("temperature", 22),
-            "temp": backend_state["climate"].get("temperature", 22),  # Frontend uses 'temp'
-            "ac_enabled": backend_state["climate"].get("ac_enabled", False),
-            "fan_speed": backend_state["climate"].get("fan_speed", 3),
-            "heating_enabled": backend_state["climate"].get("heating_enabled", False),
-            "auto_mode": backend_state["climate"].get("auto_mode", True),
-            "recirculation": backend_state["climate"].get("recirculation", False)
-        }
-
-    # Translate infotainment to include both formats
-    if "infotainment" in backend_state:
-        translated["infotainment"] = backend_state["infotainment"]
-        translated["media"] = {  # Frontend uses 'media'
-            "volume": backend_state["infotainment"].get("volume", 50),
-            "playing": backend_state["infotainment"].get("playing", False),
-            "on": backend_state["infotainment"].get("playing", False),  # Frontend uses 'on'
-            "source": backend_state["infotainment"].get("source", "radio"),
-            "station": backend_state["infotainment"].get("station", "FM 101.5"),
-            "track": backend_state["infotainment"].get("track"),
-            "artist": backend_state["infotainment"].get("artist"),
-            "muted": backend_state["infotainment"].get("muted", False)
-        }
-
-    # Lights structure matches
-    if "lights" in backend_state:
-        translated["lights"] = {
-            "interior_lights": backend_state["lights"].get("interior_lights", True),
-            "on": backend_state["lights"].get("interior_lights", True),  # Frontend uses 'on'
-            "ambient_lights": backend_state["lights"].get("ambient_lights", True),
-            "reading_lights": backend_state["lights"].get("reading_lights", False),
-            "brightness": backend_state["lights"].get("brightness", 80),
-            "ambient_color": backend_state["lights"].get("ambient_color", "white")
-        }
-
-    # Translate seats
-    if "seats" in backend_state:
-        translated["seats"] = {
-            "driver_heating": backend_state["seats"].get("driver_heating", False),
-            "heatOn": backend_state["seats"].get("driver_heating", False),  # Frontend uses 'heatOn'
-            "passenger_heating": backend_state["seats"].get("passenger_heating", False),
-            "driver_massage": backend_state["seats"].get("driver_massage", False),
-            "passenger_massage": backend_state["seats"].get("passenger_massage", False),
-            "driver_position": backend_state["seats"].get("driver_position", {"height": 50, "tilt": 50, "lumbar": 50}),
-            "passenger_position": backend_state["seats"].get("passenger_position",
-                                                             {"height": 50, "tilt": 50, "lumbar": 50}),
-            "position": 3  # Default position for frontend slider
-        }
-
-    translated["last_updated"] = backend_state.get("last_updated", time.time())
-
-    return translated
-
-
-
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -536,12 +480,19 @@ async def log_requests(request: Request, call_next):
 
 
 # Initialize managers
-vehicle_state = VehicleStateManager()
+vehicle_registry = VehicleRegistry()
 connection_manager = ConnectionManager()
+# Vehicles with connected clients are never evicted from the registry
+vehicle_registry.is_in_use = connection_manager.has_clients
+# With several workers, state changes reach the other workers' clients through the bus
+broadcast_bus = create_bus()
+state_broadcaster = StateBroadcaster(vehicle_registry, connection_manager, bus=broadcast_bus)
+state_broadcaster.attach()
 
 # Make services available to routers
-app.state.vehicle_state = vehicle_state
+app.state.vehicle_registry = vehicle_registry
 app.state.connection_manager = connection_manager
+app.state.state_broadcaster = state_broadcaster
 
 # Include routers
 app.include_router(climate.router, prefix="/api/climate", tags=["climate"])
@@ -549,6 +500,7 @@ app.include_router(infotainment.router, prefix="/api/infotainment", tags=["infot
 app.include_router(lights.router, prefix="/api/lights", tags=["lights"])
 app.include_router(seats.router, prefix="/api/seats", tags=["seats"])
 app.include_router(nlp.router, prefix="/api/nlp", tags=["nlp"])
+app.include_router(commands.router, prefix="/api/commands", tags=["commands"])
 
 
 @app.get("/")
@@ -566,23 +518,38 @@ async def health_check():
         "status": "healthy",
         "timestamp": time.time(),
         "services": {
-            "vehicle_state": "healthy" if vehicle_state else "unavailable",
-            "websocket_manager": "healthy" if connection_manager else "unavailable"
+            "vehicle_state": "healthy" if vehicle_registry is not None else "unavailable",
+            "websocket_manager": "healthy" if connection_manager else "unavailable",
+            "broadcast_bus": broadcast_bus.kind,
+            "ml_parser": app.state.ml_parser_service.breaker.state
+            if getattr(app.state, "ml_parser_service", None) else "unavailable"
         },
+        "active_vehicles": len(vehicle_registry),
         "version": "1.0.0"
     }
 
 
 @app.get("/api/status")
-async def get_status():
-    """Get overall vehicle status"""
+async def get_status(known_version: Optional[int] = None,
+                     vehicle_state: VehicleStateManager = Depends(get_vehicle_state)):
+    """Get overall vehicle status; pass known_version to skip the state payload when unchanged"""
     logger.info("Status endpoint accessed")
     try:
+        if known_version is not None and known_version == vehicle_state.version:
+            return {
+                "status": "unchanged",
+                "vehicle_id": vehicle_state.vehicle_id,
+                "version": vehicle_state.version,
+                "timestamp": time.time()
+            }
+
         # Get the current vehicle state
         current_state = vehicle_state.get_all_states()
 
         return {
             "status": "running",
+            "vehicle_id": vehicle_state.vehicle_id,
+            "version": current_state["version"],
             "vehicle_state": current_state,  # This is the key the test is looking for
             "connections": len(connection_manager.active_connections) if connection_manager else 0,
             "timestamp": time.time()
@@ -680,85 +647,210 @@ async def process_voice_command(text: str):
     }
 
 
+@app.get("/api/vehicles")
+async def list_vehicles():
+    """List vehicles that currently have live state"""
+    return {
+        "default_vehicle_id": vehicle_registry.default_vehicle_id,
+        "vehicles": vehicle_registry.vehicle_ids(),
+        "count": len(vehicle_registry),
+        "timestamp": time.time()
+    }
+
+
+async def send_reply(websocket: WebSocket, response: Dict[str, Any], request_id: Any = None):
+    """Send a reply to one client, tagged with the request_id of the message it answers"""
+    if request_id is not None:
+        response["request_id"] = request_id
+    await connection_manager.send_personal_message(json.dumps(response), websocket)
+
+
+async def handle_client_message(websocket: WebSocket, vehicle_state: VehicleStateManager, message: Dict[str, Any]):
+    """Handle one request received on /ws and send its reply"""
+    request_id = message.get("request_id")
+    logger.info(f"WebSocket message received: {message}")
+
+    if message.get("type") == "voice_command":
+        response = await process_voice_command(message.get("text", ""))
+        await send_reply(websocket, response, request_id)
+
+    elif message.get("type") == "get_state":
+        # Skip the full payload if the client already holds the current version
+        if message.get("known_version") is not None and message["known_version"] == vehicle_state.version:
+            await send_reply(websocket, {
+                "type": "state_unchanged",
+                "vehicle_id": vehicle_state.vehicle_id,
+                "version": vehicle_state.version,
+                "timestamp": time.time()
+            }, request_id)
+            return
+
+        # Send the full translated state (also used by delta clients to resync)
+        await state_broadcaster.send_snapshot(websocket, vehicle_state, request_id)
+
+    elif message.get("type") == "resume":
+        if isinstance(message.get("last_version"), int):
+            await state_broadcaster.resume(websocket, vehicle_state, message["last_version"], request_id)
+        else:
+            await connection_manager.send_error_to_client(websocket, "resume requires an integer last_version",
+                                                          "INVALID_MESSAGE", request_id)
+
+    elif message.get("type") in ["subscribe", "unsubscribe"]:
+        try:
+            if message["type"] == "subscribe":
+                topics = connection_manager.subscribe(websocket, message.get("topics") or [])
+            else:
+                topics = connection_manager.unsubscribe(websocket, message.get("topics") or [])
+
+            await send_reply(websocket, {
+                "type": "subscription_update",
+                "topics": topics,
+                "timestamp": time.time()
+            }, request_id)
+        except ValueError as e:
+            await connection_manager.send_error_to_client(websocket, str(e), "INVALID_TOPIC", request_id)
+
+    elif message.get("type") == "manual_control":
+        try:
+            system = message.get("system")
+            action = message.get("action")
+            parameters = message.get("parameters", {})
+
+            execution_result = await vehicle_state.execute_command(
+                action, parameters, message.get("expected_version")
+            )
+
+            response = {
+                "type": "manual_control_response",
+                "system": system,
+                "action": action,
+                "success": execution_result.get("success", False),
+                "execution_result": execution_result,
+                "timestamp": time.time()
+            }
+            await send_reply(websocket, response, request_id)
+
+        except Exception as e:
+            logger.error(f"Error processing manual control: {e}")
+            error_response = {
+                "type": "manual_control_response",
+                "success": False,
+                "error": str(e),
+                "timestamp": time.time()
+            }
+            await send_reply(websocket, error_response, request_id)
+
+    elif message.get("type") == "batch":
+        try:
+            commands = message.get("commands") or []
+            if not commands or len(commands) > settings.MAX_BATCH_COMMANDS:
+                raise ValueError(f"Batch must contain 1-{settings.MAX_BATCH_COMMANDS} commands")
+
+            batch_result = await vehicle_state.execute_batch(
+                commands,
+                atomic=bool(message.get("atomic")),
+                expected_version=message.get("expected_version")
+            )
+
+            await send_reply(websocket, {
+                "type": "batch_response",
+                **batch_result,
+                "timestamp": time.time()
+            }, request_id)
+
+        except Exception as e:
+            logger.error(f"Error processing command batch: {e}")
+            await send_reply(websocket, {
+                "type": "batch_response",
+                "success": False,
+                "error": str(e),
+                "timestamp": time.time()
+            }, request_id)
+
+    elif request_id is not None:
+        # Untagged clients never relied on a reply here; tagged ones would wait for one forever
+        await connection_manager.send_error_to_client(websocket, f"Unknown message type: {message.get('type')}",
+                                                      "INVALID_MESSAGE", request_id)
+
+
+async def run_pipelined_request(websocket: WebSocket, vehicle_state: VehicleStateManager, message: Dict[str, Any]):
+    """Task body for a request carrying a request_id"""
+    try:
+        await handle_client_message(websocket, vehicle_state, message)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing WebSocket request {message.get('request_id')}: {e}")
+        await connection_manager.send_error_to_client(websocket, str(e), "GENERAL_ERROR", message.get("request_id"))
+
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, vehicle_id: Optional[str] = None, updates: Optional[str] = None,
+                             last_version: Optional[int] = None, encoding: str = "json"):
     logger.info(f"WebSocket connection attempt from {websocket.client.host}")
-    await connection_manager.connect(websocket)
+    update_mode = (updates or settings.STATE_BROADCAST_MODE).lower()
+    encoding = encoding.lower()
+    vehicle_id = vehicle_id or vehicle_registry.default_vehicle_id
+    try:
+        # Only validated here: state is created after admission, so rejected connects cost nothing
+        vehicle_registry.validate_vehicle_id(vehicle_id)
+        if update_mode not in UPDATE_MODES:
+            raise ValueError(f"Unknown update mode: {update_mode}")
+        if encoding not in frame_codec.available_encodings():
+            raise ValueError(f"Unsupported encoding: {encoding} (available: {frame_codec.available_encodings()})")
+    except ValueError as e:
+        logger.warning(f"Rejecting WebSocket connection: {e}")
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # Binary clients get the short-key layout up front so they can expand state frames
+    welcome_extra = {"schema": frame_codec.schema()} if encoding != "json" else None
+    if not await connection_manager.connect(websocket, vehicle_id, update_mode, encoding, welcome_extra):
+        return
+
+    try:
+        vehicle_state = vehicle_registry.get(vehicle_id)
+    except ValueError as e:
+        logger.warning(f"Closing WebSocket connection: {e}")
+        connection_manager.disconnect(websocket)
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e)[:120])
+        return
+
+    # Reconnecting clients pass the last version they saw and only receive what they missed
+    if last_version is not None:
+        await state_broadcaster.resume(websocket, vehicle_state, last_version)
+
+    inflight = asyncio.Semaphore(settings.WEBSOCKET_MAX_INFLIGHT)
+    pending_requests = set()
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
-            logger.info(f"WebSocket message received: {message}")
-
-            if message.get("type") == "voice_command":
-                response = await process_voice_command(message.get("text", ""))
-                await connection_manager.send_personal_message(json.dumps(response), websocket)
-
-                if response.get("success"):
-                    # Translate state before broadcasting
-                    backend_state = vehicle_state.get_all_states()
-                    frontend_state = translate_backend_to_frontend_state(backend_state)
-
-                    state_update = {
-                        "type": "state_update",
-                        "data": frontend_state,
-                        "timestamp": time.time()
-                    }
-                    await connection_manager.broadcast(json.dumps(state_update))
-
-            elif message.get("type") == "get_state":
-                # Send translated state
-                backend_state = vehicle_state.get_all_states()
-                frontend_state = translate_backend_to_frontend_state(backend_state)
-
-                await connection_manager.send_personal_message(json.dumps({
-                    "type": "state_update",
-                    "data": frontend_state,
-                    "timestamp": time.time()
-                }), websocket)
-
-            elif message.get("type") == "manual_control":
-                try:
-                    system = message.get("system")
-                    action = message.get("action")
-                    parameters = message.get("parameters", {})
-
-                    execution_result = await vehicle_state.execute_command(action, parameters)
-
-                    response = {
-                        "type": "manual_control_response",
-                        "system": system,
-                        "action": action,
-                        "success": execution_result.get("success", False),
-                        "execution_result": execution_result,
-                        "timestamp": time.time()
-                    }
-                    await connection_manager.send_personal_message(json.dumps(response), websocket)
-
-                    if execution_result.get("success"):
-                        # Translate state before broadcasting
-                        backend_state = vehicle_state.get_all_states()
-                        frontend_state = translate_backend_to_frontend_state(backend_state)
-
-                        state_update = {
-                            "type": "state_update",
-                            "data": frontend_state,
-                            "timestamp": time.time()
-                        }
-                        await connection_manager.broadcast(json.dumps(state_update))
-
-                except Exception as e:
-                    logger.error(f"Error processing manual control: {e}")
-                    error_response = {
-                        "type": "manual_control_response",
-                        "success": False,
-                        "error": str(e),
-                        "timestamp": time.time()
-                    }
-                    await connection_manager.send_personal_message(json.dumps(error_response), websocket)
-
-            elif message.get("type") in ["ping", "pong"]:
-                await connection_manager.broadcast(json.dumps(message))
+            connection_manager.touch(websocket)
+
+            # Heartbeats are answered to the sender only and kept out of the request log
+            if message.get("type") in ["ping", "pong"]:
+                await connection_manager.handle_heartbeat(message, websocket)
+                continue
+
+            # Requests without a request_id are handled one at a time, in the order received
+            request_id = message.get("request_id")
+            if request_id is None:
+                await handle_client_message(websocket, vehicle_state, message)
+                continue
+
+            if isinstance(request_id, bool) or not isinstance(request_id, (str, int)):
+                await connection_manager.send_error_to_client(websocket, "request_id must be a string or integer",
+                                                              "INVALID_MESSAGE")
+                continue
+
+            # Tagged requests run concurrently, so a slow voice command does not hold up get_state;
+            # once WEBSOCKET_MAX_INFLIGHT requests are running, reading waits for one to finish
+            await inflight.acquire()
+            task = asyncio.create_task(run_pipelined_request(websocket, vehicle_state, message))
+            pending_requests.add(task)
+            task.add_done_callback(pending_requests.discard)
+            task.add_done_callback(lambda _: inflight.release())
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected from {websocket.client.host}")
@@ -766,6 +858,10 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         connection_manager.disconnect(websocket)
+    finally:
+        # Replies to a closed socket have nowhere to go
+        for task in pending_requests:
+            task.cancel()
 
 
 # Startup event
@@ -775,14 +871,26 @@ async def startup_event():
     logger.info(f"Debug mode: {settings.DEBUG}")
     logger.info(f"Allowed origins: {settings.ALLOWED_ORIGINS}")
     logger.info(f"ML Service URL: {settings.ML_SERVICE_URL}")
+    logger.info(f"Broadcast bus: {broadcast_bus.kind} (worker {broadcast_bus.worker_id})")
+    await state_broadcaster.start_bus()
+    # One pooled keep-alive client to the ML service, shared by every request
+    if getattr(app.state, "ml_parser_service", None) is None:
+        app.state.ml_parser_service = MLParserService()
+    app.state.ml_parser_service.start_health_probe()
 
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Vehicle AI Backend shutting down...")
+    await state_broadcaster.flush()
+    await state_broadcaster.stop_bus()
     if connection_manager:
         await connection_manager.shutdown()
+    ml_service = getattr(app.state, "ml_parser_service", None)
+    if ml_service is not None:
+        app.state.ml_parser_service = None
+        await ml_service.close()
 
 
 if __name__ == "__main__":
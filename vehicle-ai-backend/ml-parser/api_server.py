@@ -1,7 +1,9 @@
 # api_server.py (Enhanced version)
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Callable, Any
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
 import logging
 import time
 import uvicorn
@@ -38,6 +40,25 @@ if PARSER_AVAILABLE:
 else:
     parser = None
 
+# Reported by /parse and /health so clients can drop results cached from an older model
+MODEL_VERSION = os.getenv("ML_MODEL_VERSION") or str(getattr(parser, "model_version", app.version))
+MAX_BATCH_SIZE = int(os.getenv("ML_MAX_BATCH_SIZE", "128"))
+
+# Inference runs off the event loop so /health and other requests stay responsive:
+# "thread" (default), "process" (workers fork with the loaded parser) or "inline" (on the loop)
+INFERENCE_EXECUTOR = os.getenv("ML_INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS = int(os.getenv("ML_INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+# Inference jobs running or waiting for a worker; beyond this requests get 503 with Retry-After
+INFERENCE_QUEUE_SIZE = int(os.getenv("ML_INFERENCE_QUEUE_SIZE", str(INFERENCE_WORKERS * 4)))
+INFERENCE_RETRY_AFTER = int(os.getenv("ML_INFERENCE_RETRY_AFTER", "1"))
+
+if INFERENCE_EXECUTOR not in ("thread", "process", "inline"):
+    logging.warning(f"⚠️ Unknown ML_INFERENCE_EXECUTOR '{INFERENCE_EXECUTOR}', using 'thread'")
+    INFERENCE_EXECUTOR = "thread"
+
+inference_executor: Optional[Executor] = None
+inference_stats = {"pending": 0, "completed": 0, "failed": 0, "rejected": 0}
+
 
 class CommandRequest(BaseModel):
     text: str
@@ -54,6 +75,21 @@ class CommandResponse(BaseModel):
     source: str
     original_text: str
     processed_text: Optional[str] = None
+    model_version: Optional[str] = None
+    error: Optional[str] = None
+    # Sub-commands of a multi-intent utterance ("make it cooler and turn up the music"), in order
+    commands: Optional[List[dict]] = None
+
+
+class BatchCommandRequest(BaseModel):
+    texts: List[str]
+
+
+class BatchCommandResponse(BaseModel):
+    results: List[CommandResponse]
+    count: int
+    processing_time: float
+    model_version: Optional[str] = None
 
 
 class TestResult(BaseModel):
@@ -62,6 +98,144 @@ class TestResult(BaseModel):
     data: dict
 
 
+def preprocess(original_text: str) -> str:
+    # Apply text preprocessing if available
+    if hasattr(parser, 'preprocess_text'):
+        return parser.preprocess_text(original_text)
+    return original_text
+
+
+def build_response(original_text: str, processed_text: str, result: dict, processing_time: float) -> CommandResponse:
+    # Ensure result has all required fields
+    return CommandResponse(
+        intent=result.get("intent", "unknown"),
+        confidence=result.get("confidence", 0.0),
+        action=result.get("action", "unknown"),
+        parameters=result.get("parameters", {}),
+        processing_time=processing_time,
+        source=result.get("source", "ml_ensemble"),
+        original_text=original_text,
+        processed_text=processed_text if processed_text != original_text else None,
+        model_version=MODEL_VERSION,
+        commands=build_sub_commands(result.get("commands"))
+    )
+
+
+def build_sub_commands(commands: Any) -> Optional[List[dict]]:
+    """Sub-commands the parser split a chained utterance into, or None for a single command"""
+    if not isinstance(commands, list):
+        return None
+    sub_commands = [
+        {
+            "intent": command.get("intent", "unknown"),
+            "confidence": command.get("confidence", 0.0),
+            "action": command.get("action", "unknown"),
+            "parameters": command.get("parameters", {})
+        }
+        for command in commands if isinstance(command, dict)
+    ]
+    return sub_commands or None
+
+
+def infer_one(text: str) -> Tuple[str, dict]:
+    """Preprocess and parse one text (runs on the inference executor)"""
+    processed_text = preprocess(text)
+    return processed_text, parser.parse_command(processed_text)
+
+
+def infer_batch(texts: List[str]) -> List[Tuple[str, Optional[dict], Optional[str]]]:
+    """Preprocess and parse several texts (runs on the inference executor).
+
+    Returns (processed_text, result, error) per text. Parsers that can batch
+    natively get all texts at once; their failure fails the whole batch.
+    """
+    processed_texts = [preprocess(text) for text in texts]
+    if hasattr(parser, 'parse_batch'):
+        return [(processed_text, result, None)
+                for processed_text, result in zip(processed_texts, parser.parse_batch(processed_texts))]
+
+    outcomes = []
+    for processed_text in processed_texts:
+        try:
+            outcomes.append((processed_text, parser.parse_command(processed_text), None))
+        except Exception as e:
+            logging.error(f"❌ Parsing error in batch: {e}")
+            outcomes.append((processed_text, None, str(e)))
+    return outcomes
+
+
+def infer_debug(text: str) -> Tuple[dict, dict]:
+    """Parse one text without preprocessing and explain the confidence (runs on the inference executor)"""
+    result = parser.parse_command(text)
+    return result, getattr(parser, 'get_confidence_breakdown', lambda x: {})(text)
+
+
+def get_inference_executor() -> Executor:
+    global inference_executor
+    if inference_executor is None:
+        if INFERENCE_EXECUTOR == "process":
+            inference_executor = ProcessPoolExecutor(max_workers=INFERENCE_WORKERS)
+        else:
+            inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+        logging.info(f"🧵 Inference executor: {INFERENCE_EXECUTOR} with {INFERENCE_WORKERS} workers,"
+                     f" queue of {INFERENCE_QUEUE_SIZE}")
+    return inference_executor
+
+
+async def run_inference(job: Callable[..., Any], *args) -> Any:
+    """Run an infer_* job on the inference executor, or refuse with 503 if its queue is full"""
+    if inference_stats["pending"] >= INFERENCE_QUEUE_SIZE:
+        inference_stats["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue is full, retry later",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)}
+        )
+
+    inference_stats["pending"] += 1
+    if INFERENCE_EXECUTOR == "inline":
+        try:
+            result = job(*args)
+        except Exception:
+            finish_inference(succeeded=False)
+            raise
+        finish_inference(succeeded=True)
+        return result
+
+    loop = asyncio.get_running_loop()
+    try:
+        future = get_inference_executor().submit(job, *args)
+    except Exception:
+        finish_inference(succeeded=False)
+        raise
+    # The slot is freed when the job ends, not when the request stops waiting for it:
+    # a cancelled request leaves its job running on a worker
+    future.add_done_callback(lambda done: on_inference_done(loop, done))
+    return await asyncio.wrap_future(future)
+
+
+def on_inference_done(loop: asyncio.AbstractEventLoop, future: Future):
+    """Executor job done-callback (runs on a worker thread): account for the job on the event loop"""
+    succeeded = not future.cancelled() and future.exception() is None
+    try:
+        loop.call_soon_threadsafe(finish_inference, succeeded)
+    except RuntimeError:
+        pass  # The loop is already closed at shutdown; nobody reads the stats any more
+
+
+def finish_inference(succeeded: bool):
+    inference_stats["pending"] -= 1
+    inference_stats["completed" if succeeded else "failed"] += 1
+
+
+@app.on_event("shutdown")
+async def shutdown_inference_executor():
+    global inference_executor
+    if inference_executor is not None:
+        inference_executor.shutdown(wait=False, cancel_futures=True)
+        inference_executor = None
+
+
 @app.post("/parse", response_model=CommandResponse)
 async def parse_command(request: CommandRequest):
     """Parse voice command using ML/LLM ensemble"""
@@ -75,38 +249,65 @@ async def parse_command(request: CommandRequest):
 
     try:
         original_text = request.text
-        processed_text = original_text
-
-        # Apply text preprocessing if available
-        if hasattr(parser, 'preprocess_text'):
-            processed_text = parser.preprocess_text(original_text)
 
         # Parse the command
-        result = parser.parse_command(processed_text)
+        processed_text, result = await run_inference(infer_one, original_text)
 
-        processing_time = time.time() - start_time
-
-        # Ensure result has all required fields
-        response = CommandResponse(
-            intent=result.get("intent", "unknown"),
-            confidence=result.get("confidence", 0.0),
-            action=result.get("action", "unknown"),
-            parameters=result.get("parameters", {}),
-            processing_time=processing_time,
-            source=result.get("source", "ml_ensemble"),
-            original_text=original_text,
-            processed_text=processed_text if processed_text != original_text else None
-        )
+        response = build_response(original_text, processed_text, result, time.time() - start_time)
 
         logging.info(f"✅ Parsed '{original_text}' -> {result.get('action')} ({result.get('confidence'):.2f})")
 
         return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"❌ Parsing error: {e}")
         raise HTTPException(status_code=500, detail=f"Parsing failed: {str(e)}")
 
 
+@app.post("/parse-batch", response_model=BatchCommandResponse)
+async def parse_command_batch(request: BatchCommandRequest):
+    """Parse several voice commands in one pass.
+
+    Results come back in request order. A text that fails to parse gets a
+    result with action "unknown" and an error message instead of failing
+    the whole batch.
+    """
+    if not PARSER_AVAILABLE or not parser:
+        raise HTTPException(
+            status_code=503,
+            detail="ML Parser not available. Check logs for initialization errors."
+        )
+    if len(request.texts) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} texts per batch")
+
+    start_time = time.time()
+    try:
+        outcomes = await run_inference(infer_batch, request.texts)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"❌ Batch parsing error: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch parsing failed: {str(e)}")
+
+    processing_time = time.time() - start_time
+    responses = []
+    for original_text, (processed_text, result, error) in zip(request.texts, outcomes):
+        if error is not None:
+            responses.append(CommandResponse(
+                intent="unknown", confidence=0.0, action="unknown", parameters={},
+                processing_time=processing_time, source="error", original_text=original_text,
+                model_version=MODEL_VERSION, error=f"Parsing failed: {error}"
+            ))
+        else:
+            responses.append(build_response(original_text, processed_text, result, processing_time))
+
+    logging.info(f"✅ Parsed batch of {len(responses)} in {processing_time * 1000:.1f}ms")
+    return BatchCommandResponse(results=responses, count=len(responses),
+                                processing_time=processing_time, model_version=MODEL_VERSION)
+
+
 @app.post("/test-parse", response_model=TestResult)
 async def test_parse_command(request: CommandRequest):
     """Test parsing without execution - useful for development"""
@@ -121,7 +322,7 @@ async def test_parse_command(request: CommandRequest):
         start_time = time.time()
 
         # Parse the command
-        result = parser.parse_command(request.text)
+        result, confidence_breakdown = await run_inference(infer_debug, request.text)
         processing_time = time.time() - start_time
 
         # Add debugging information
@@ -129,7 +330,7 @@ async def test_parse_command(request: CommandRequest):
             "original_text": request.text,
             "parsed_result": result,
             "processing_time": processing_time,
-            "confidence_breakdown": getattr(parser, 'get_confidence_breakdown', lambda x: {})(request.text),
+            "confidence_breakdown": confidence_breakdown,
             "parser_method": result.get("source", "unknown")
         }
 
@@ -139,6 +340,8 @@ async def test_parse_command(request: CommandRequest):
             data=debug_info
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"❌ Test parsing error: {e}")
         return TestResult(
@@ -188,6 +391,7 @@ async def health_check():
     return {
         "status": "healthy" if PARSER_AVAILABLE else "degraded",
         "parser_available": PARSER_AVAILABLE,
+        "model_version": MODEL_VERSION,
         "timestamp": time.time()
     }
 
@@ -198,7 +402,14 @@ async def get_status():
     status = {
         "parser_available": PARSER_AVAILABLE,
         "timestamp": time.time(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "model_version": MODEL_VERSION,
+        "inference": {
+            "executor": INFERENCE_EXECUTOR,
+            "workers": INFERENCE_WORKERS,
+            "queue_size": INFERENCE_QUEUE_SIZE,
+            **inference_stats
+        }
     }
 
     if PARSER_AVAILABLE and parser:
@@ -224,6 +435,7 @@ async def root():
         "parser_available": PARSER_AVAILABLE,
         "endpoints": {
             "parse": "/parse - Parse voice commands",
+            "parse_batch": "/parse-batch - Parse several voice commands in one pass",
             "test": "/test-parse - Test parsing without execution",
             "commands": "/test-commands - Get test commands",
             "health": "/health - Health check",
@@ -0,0 +1,362 @@
+# models/command_registry.py - Table-driven registry of vehicle commands
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Callable, List, Tuple
+from models.schemas import VehicleState
+
+# A validator inspects the parameters and returns an error message, or None if they are usable.
+# A handler applies the command to the state and returns the changed fields.
+Validator = Callable[[Dict[str, Any]], Optional[str]]
+Handler = Callable[[VehicleState, Dict[str, Any]], Dict[str, Any]]
+
+# Independently lockable vehicle subsystems; action names are prefixed with one of these
+SUBSYSTEMS = ("climate", "lights", "seats", "infotainment")
+
+VALID_COLORS = ["white", "blue", "red", "green", "purple", "orange"]
+VALID_SOURCES = ["radio", "bluetooth", "usb", "aux", "music"]
+
+
+@dataclass(frozen=True)
+class CommandSpec:
+    """Metadata and implementation of a single vehicle command"""
+    name: str
+    subsystem: str
+    handler: Handler
+    aliases: Tuple[str, ...] = ()
+    validator: Optional[Validator] = None
+    parameters: Dict[str, str] = field(default_factory=dict)
+    description: str = ""
+
+    def execute(self, state: VehicleState, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate the parameters and apply the command to the given state"""
+        result = {"action": action, "success": False, "changes": {}}
+
+        error = self.validator(parameters) if self.validator else None
+        if error:
+            result["error"] = error
+            return result
+
+        result["changes"] = self.handler(state, parameters)
+        result["success"] = True
+        return result
+
+    def describe(self) -> Dict[str, Any]:
+        """Introspectable description of the command"""
+        return {
+            "name": self.name,
+            "subsystem": self.subsystem,
+            "aliases": list(self.aliases),
+            "parameters": dict(self.parameters),
+            "description": self.description
+        }
+
+
+# Maps every action name (canonical names and aliases) to its spec; built once at import time
+COMMAND_REGISTRY: Dict[str, CommandSpec] = {}
+
+
+def command(name: str, *aliases: str, validator: Optional[Validator] = None,
+            parameters: Optional[Dict[str, str]] = None, description: str = ""):
+    """Register the decorated function as the handler for a command and its aliases"""
+    subsystem = name.split("_", 1)[0]
+    if subsystem not in SUBSYSTEMS:
+        raise ValueError(f"Command {name} does not belong to a known subsystem")
+
+    def decorator(handler: Handler) -> Handler:
+        spec = CommandSpec(
+            name=name,
+            subsystem=subsystem,
+            handler=handler,
+            aliases=aliases,
+            validator=validator,
+            parameters=parameters or {},
+            description=description or (handler.__doc__ or "").strip()
+        )
+        for action in (name,) + aliases:
+            if action in COMMAND_REGISTRY:
+                raise ValueError(f"Duplicate command registration: {action}")
+            COMMAND_REGISTRY[action] = spec
+        return handler
+
+    return decorator
+
+
+def get_command(action: str) -> Optional[CommandSpec]:
+    """Look up the spec for an action name or alias"""
+    return COMMAND_REGISTRY.get(action)
+
+
+def describe_commands() -> List[Dict[str, Any]]:
+    """Describe every registered command once, in registration order"""
+    seen = {}
+    for spec in COMMAND_REGISTRY.values():
+        seen.setdefault(spec.name, spec)
+    return [spec.describe() for spec in seen.values()]
+
+
+# Parameter validators
+
+def _number(key: str, error: str) -> Validator:
+    def validate(parameters: Dict[str, Any]) -> Optional[str]:
+        return None if isinstance(parameters.get(key, 0), (int, float)) else error
+    return validate
+
+
+def _choice(key: str, default: str, choices: List[str], error: str) -> Validator:
+    def validate(parameters: Dict[str, Any]) -> Optional[str]:
+        return None if parameters.get(key, default) in choices else error
+    return validate
+
+
+def _validate_fan_speed(parameters: Dict[str, Any]) -> Optional[str]:
+    speed = parameters.get("speed", 3)
+    return None if isinstance(speed, int) and 1 <= speed <= 5 else "Invalid fan speed"
+
+
+def _validate_position(parameters: Dict[str, Any]) -> Optional[str]:
+    return None if isinstance(parameters.get("position", {}), dict) else "Invalid position format"
+
+
+# Climate commands
+
+@command("climate_set_temperature", validator=_number("temperature", "Invalid temperature value"),
+         parameters={"temperature": "number, clamped to 16-32 (default 22)"})
+def _climate_set_temperature(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the cabin temperature"""
+    state.climate.temperature = float(max(16, min(32, parameters.get("temperature", 22))))
+    return {"temperature": state.climate.temperature}
+
+
+@command("climate_turn_on_ac")
+def _climate_turn_on_ac(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the air conditioning on"""
+    state.climate.ac_enabled = True
+    return {"ac_enabled": True}
+
+
+@command("climate_turn_off_ac")
+def _climate_turn_off_ac(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the air conditioning off"""
+    state.climate.ac_enabled = False
+    return {"ac_enabled": False}
+
+
+@command("climate_increase_temperature", "climate_increase")
+def _climate_increase_temperature(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise the temperature by one degree"""
+    state.climate.temperature = min(32, state.climate.temperature + 1)
+    return {"temperature": state.climate.temperature}
+
+
+@command("climate_decrease_temperature", "climate_decrease")
+def _climate_decrease_temperature(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Lower the temperature by one degree"""
+    state.climate.temperature = max(16, state.climate.temperature - 1)
+    return {"temperature": state.climate.temperature}
+
+
+@command("climate_set_fan_speed", validator=_validate_fan_speed,
+         parameters={"speed": "integer 1-5 (default 3)"})
+def _climate_set_fan_speed(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the fan speed"""
+    state.climate.fan_speed = parameters.get("speed", 3)
+    return {"fan_speed": state.climate.fan_speed}
+
+
+@command("climate_toggle_auto")
+def _climate_toggle_auto(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Toggle automatic climate mode"""
+    state.climate.auto_mode = not state.climate.auto_mode
+    return {"auto_mode": state.climate.auto_mode}
+
+
+@command("climate_toggle_recirculation")
+def _climate_toggle_recirculation(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Toggle air recirculation"""
+    state.climate.recirculation = not state.climate.recirculation
+    return {"recirculation": state.climate.recirculation}
+
+
+# Lights commands
+
+@command("lights_turn_on")
+def _lights_turn_on(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn interior and ambient lights on"""
+    state.lights.interior_lights = True
+    state.lights.ambient_lights = True
+    return {"interior_lights": True, "ambient_lights": True}
+
+
+@command("lights_turn_off")
+def _lights_turn_off(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn all lights off"""
+    state.lights.interior_lights = False
+    state.lights.ambient_lights = False
+    state.lights.reading_lights = False
+    return {"interior_lights": False, "ambient_lights": False, "reading_lights": False}
+
+
+@command("lights_set_brightness", "lights_set", validator=_number("brightness", "Invalid brightness value"),
+         parameters={"brightness": "number, clamped to 0-100 (default 80)"})
+def _lights_set_brightness(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the light brightness"""
+    state.lights.brightness = int(max(0, min(100, parameters.get("brightness", 80))))
+    return {"brightness": state.lights.brightness}
+
+
+@command("lights_brighten")
+def _lights_brighten(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise the brightness by 10%"""
+    state.lights.brightness = min(100, state.lights.brightness + 10)
+    return {"brightness": state.lights.brightness}
+
+
+@command("lights_dim")
+def _lights_dim(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Lower the brightness by 10%"""
+    state.lights.brightness = max(0, state.lights.brightness - 10)
+    return {"brightness": state.lights.brightness}
+
+
+@command("lights_toggle_interior")
+def _lights_toggle_interior(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Toggle the interior lights"""
+    state.lights.interior_lights = not state.lights.interior_lights
+    return {"interior_lights": state.lights.interior_lights}
+
+
+@command("lights_toggle_ambient")
+def _lights_toggle_ambient(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Toggle the ambient lights"""
+    state.lights.ambient_lights = not state.lights.ambient_lights
+    return {"ambient_lights": state.lights.ambient_lights}
+
+
+@command("lights_toggle_reading")
+def _lights_toggle_reading(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Toggle the reading lights"""
+    state.lights.reading_lights = not state.lights.reading_lights
+    return {"reading_lights": state.lights.reading_lights}
+
+
+@command("lights_set_color", validator=_choice("color", "white", VALID_COLORS, "Invalid color"),
+         parameters={"color": f"one of {VALID_COLORS} (default white)"})
+def _lights_set_color(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the ambient light color"""
+    state.lights.ambient_color = parameters.get("color", "white")
+    return {"ambient_color": state.lights.ambient_color}
+
+
+# Seats commands
+
+def _seat_flag(flag: str, value: bool) -> Handler:
+    def handler(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        seat = "driver" if parameters.get("seat", "driver") == "driver" else "passenger"
+        setattr(state.seats, f"{seat}_{flag}", value)
+        return {f"{seat}_{flag}": value}
+    return handler
+
+
+SEAT_PARAMETERS = {"seat": "driver or passenger (default driver)"}
+
+command("seats_heat_on", parameters=SEAT_PARAMETERS, description="Turn seat heating on")(_seat_flag("heating", True))
+command("seats_heat_off", parameters=SEAT_PARAMETERS, description="Turn seat heating off")(_seat_flag("heating", False))
+command("seats_massage_on", parameters=SEAT_PARAMETERS, description="Turn seat massage on")(_seat_flag("massage", True))
+command("seats_massage_off", parameters=SEAT_PARAMETERS,
+        description="Turn seat massage off")(_seat_flag("massage", False))
+
+
+@command("seats_adjust_position", "seats_adjust", validator=_validate_position,
+         parameters={**SEAT_PARAMETERS, "position": "object with height/tilt/lumbar values, clamped to 0-100"})
+def _seats_adjust_position(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Adjust seat height, tilt and lumbar support"""
+    seat = "driver" if parameters.get("seat", "driver") == "driver" else "passenger"
+    current = getattr(state.seats, f"{seat}_position")
+    position = parameters.get("position", {})
+    for key in ("height", "tilt", "lumbar"):
+        if key in position:
+            current[key] = max(0, min(100, position[key]))
+    return {f"{seat}_position": current}
+
+
+# Infotainment commands
+
+@command("infotainment_set_volume", "infotainment_set", validator=_number("volume", "Invalid volume value"),
+         parameters={"volume": "number, clamped to 0-100 (default 50)"})
+def _infotainment_set_volume(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the audio volume"""
+    state.infotainment.volume = int(max(0, min(100, parameters.get("volume", 50))))
+    return {"volume": state.infotainment.volume}
+
+
+@command("infotainment_volume_up", "infotainment_increase")
+def _infotainment_volume_up(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Raise the volume by 5"""
+    state.infotainment.volume = min(100, state.infotainment.volume + 5)
+    return {"volume": state.infotainment.volume}
+
+
+@command("infotainment_volume_down", "infotainment_decrease")
+def _infotainment_volume_down(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Lower the volume by 5"""
+    state.infotainment.volume = max(0, state.infotainment.volume - 5)
+    return {"volume": state.infotainment.volume}
+
+
+@command("infotainment_play", "infotainment_play_music")
+def _infotainment_play(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Start playback"""
+    state.infotainment.playing = True
+    return {"playing": True}
+
+
+@command("infotainment_pause", "infotainment_stop", "infotainment_pause_music")
+def _infotainment_pause(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Pause playback"""
+    state.infotainment.playing = False
+    return {"playing": False}
+
+
+@command("infotainment_mute")
+def _infotainment_mute(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Mute audio"""
+    state.infotainment.muted = True
+    return {"muted": True}
+
+
+@command("infotainment_unmute")
+def _infotainment_unmute(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Unmute audio"""
+    state.infotainment.muted = False
+    return {"muted": False}
+
+
+@command("infotainment_next_track")
+def _infotainment_next_track(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Skip to the next track"""
+    state.infotainment.track = "Next Track"
+    return {"track": "Next Track"}
+
+
+@command("infotainment_previous_track")
+def _infotainment_previous_track(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Go back to the previous track"""
+    state.infotainment.track = "Previous Track"
+    return {"track": "Previous Track"}
+
+
+@command("infotainment_set_source", validator=_choice("source", "radio", VALID_SOURCES, "Invalid source"),
+         parameters={"source": f"one of {VALID_SOURCES} (default radio)"})
+def _infotainment_set_source(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Select the audio source"""
+    state.infotainment.source = parameters.get("source", "radio")
+    return {"source": state.infotainment.source}
+
+
+@command("infotainment_radio_tune", parameters={"station": "station name (default FM 101.5)"})
+def _infotainment_radio_tune(state: VehicleState, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Tune the radio to a station and start playing"""
+    station = parameters.get("station", "FM 101.5")
+    state.infotainment.station = station
+    state.infotainment.source = "radio"
+    state.infotainment.playing = True
+    return {"station": station, "source": "radio", "playing": True}
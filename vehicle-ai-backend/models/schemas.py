@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import time
@@ -24,6 +24,31 @@ class VoiceCommand(BaseModel):
         }
 
 
+class BatchCommand(BaseModel):
+    """Single action within a command batch"""
+    action: str = Field(..., description="Action name, e.g. climate_set_temperature")
+    parameters: Dict[str, Any] = Field(default_factory=dict, description="Action parameters")
+
+
+class BatchCommandRequest(BaseModel):
+    """Batch of actions applied under one lock acquisition"""
+    commands: List[BatchCommand] = Field(..., description="Actions to apply, in order")
+    atomic: bool = Field(False, description="Apply all commands or none of them")
+    expected_version: Optional[int] = Field(None, description="Reject the batch if the state version differs")
+
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "atomic": True,
+            "commands": [
+                {"action": "climate_decrease_temperature", "parameters": {}},
+                {"action": "lights_dim", "parameters": {}},
+                {"action": "seats_heat_on", "parameters": {"seat": "driver"}},
+                {"action": "infotainment_volume_down", "parameters": {}}
+            ]
+        }
+    })
+
+
 # Response Models
 class NLPResponse(BaseModel):
     """NLP processing response model"""
@@ -56,7 +81,7 @@ class NLPResponse(BaseModel):
 # Vehicle State Models
 class ClimateState(BaseModel):
     """Climate control state"""
-    temperature: float = Field(22.0, ge=16.0, le=30.0, description="Temperature in Celsius")
+    temperature: float = Field(22.0, ge=16.0, le=32.0, description="Temperature in Celsius")
     fan_speed: int = Field(3, ge=0, le=5, description="Fan speed level")
     ac_enabled: bool = Field(True, description="Air conditioning enabled")
     heating_enabled: bool = Field(False, description="Heating enabled")
@@ -154,6 +179,7 @@ class VehicleState(BaseModel):
     lights: LightsState = Field(default_factory=LightsState)
     seats: SeatsState = Field(default_factory=SeatsState)
     infotainment: InfotainmentState = Field(default_factory=InfotainmentState)
+    version: int = Field(0, ge=0, description="Monotonically increasing state version")
     last_updated: float = Field(default_factory=time.time, description="Last update timestamp")
 
     class Config:
@@ -191,6 +217,7 @@ class VehicleState(BaseModel):
                     "playing": True,
                     "muted": False
                 },
+                "version": 42,
                 "last_updated": 1234567890.123
             }
         }
@@ -0,0 +1,81 @@
+# models/state_transaction.py - Copy-on-write staging of vehicle state changes
+import copy
+from typing import Dict, Any, List, Tuple
+from models.schemas import VehicleState
+
+
+class SubsystemView:
+    """Copy-on-write view of one subsystem model (climate, lights, ...).
+
+    Reads fall through to the underlying model unless the field has been
+    staged; writes are staged and never touch the model. Mutable containers
+    (such as seat position dicts) are copied into the stage on first access so
+    in-place edits stay isolated too.
+    """
+
+    __slots__ = ("_model", "_staged")
+
+    def __init__(self, model, staged: Dict[str, Any]):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_staged", staged)
+
+    def __getattr__(self, name: str) -> Any:
+        staged = object.__getattribute__(self, "_staged")
+        if name in staged:
+            return staged[name]
+
+        value = getattr(object.__getattribute__(self, "_model"), name)
+        if isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
+            staged[name] = value
+        return value
+
+    def __setattr__(self, name: str, value: Any):
+        model = object.__getattribute__(self, "_model")
+        if not hasattr(model, name):
+            raise AttributeError(f"{type(model).__name__} has no field '{name}'")
+        object.__getattribute__(self, "_staged")[name] = value
+
+
+class StateView:
+    """Copy-on-write view of a VehicleState used to stage a transaction.
+
+    Command handlers run against the view exactly as they would against the
+    real state. commit() copies only the staged fields onto the real state;
+    rollback() simply discards them.
+    """
+
+    def __init__(self, state: VehicleState):
+        self._state = state
+        self._staged: Dict[str, Dict[str, Any]] = {}
+        self._views: Dict[str, SubsystemView] = {}
+
+    def __getattr__(self, subsystem: str) -> SubsystemView:
+        if subsystem.startswith("_"):
+            raise AttributeError(subsystem)
+
+        view = self._views.get(subsystem)
+        if view is None:
+            view = SubsystemView(getattr(self._state, subsystem), self._staged.setdefault(subsystem, {}))
+            self._views[subsystem] = view
+        return view
+
+    def staged_fields(self) -> List[Tuple[str, str]]:
+        """(subsystem, field) pairs that would be written by commit()"""
+        return [(subsystem, name) for subsystem, fields in self._staged.items() for name in fields]
+
+    def commit(self) -> int:
+        """Write staged fields onto the real state; returns the number of fields written"""
+        written = 0
+        for subsystem, fields in self._staged.items():
+            model = getattr(self._state, subsystem)
+            for name, value in fields.items():
+                setattr(model, name, value)
+                written += 1
+        self.rollback()
+        return written
+
+    def rollback(self):
+        """Discard all staged changes"""
+        self._staged.clear()
+        self._views.clear()
@@ -0,0 +1,179 @@
+# models/vehicle_registry.py - Fleet-wide registry of per-vehicle state managers
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import AsyncContextManager, Callable, Dict, List, Optional
+from models.vehicle_state import VehicleStateManager, WritePublisher
+from config import settings
+
+logger = logging.getLogger("vehicle-registry")
+
+VEHICLE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+
+
+class VehicleRegistry:
+    """Registry of vehicle state managers keyed by vehicle ID.
+
+    Managers are created lazily on first access, each with its own lock, so
+    commands for different vehicles never wait on each other.
+
+    Memory is bounded by the vehicles actually in use: a vehicle that has not
+    been accessed for idle_timeout seconds is dropped the next time a new
+    vehicle is registered, and once max_vehicles are live the least recently
+    used one makes room. Vehicles that is_in_use reports as busy (e.g. with
+    WebSocket clients) and the default vehicle are never dropped; if nothing
+    can be dropped, registering another vehicle fails with ValueError.
+
+    Dropping a vehicle discards its settings: when it is used again it starts
+    over from the defaults. Its version does not start over. The registry
+    remembers the last version of each dropped vehicle (up to max_tombstones
+    of them, then only the highest forgotten one) and the recreated vehicle
+    starts above it, so a version never names two different states and
+    expected_version checks and client resumes stay exact.
+    """
+
+    def __init__(self, default_vehicle_id: Optional[str] = None, max_vehicles: Optional[int] = None,
+                 idle_timeout: Optional[float] = None, max_tombstones: int = 100_000):
+        self.default_vehicle_id = default_vehicle_id or settings.DEFAULT_VEHICLE_ID
+        self.max_vehicles = settings.MAX_VEHICLES if max_vehicles is None else max_vehicles  # 0 = unlimited
+        self.idle_timeout = settings.VEHICLE_IDLE_TIMEOUT if idle_timeout is None else idle_timeout  # 0 = never
+        # Least recently used first
+        self._vehicles: "OrderedDict[str, VehicleStateManager]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        # vehicle_id -> last version of a dropped vehicle, oldest first
+        self._tombstones: "OrderedDict[str, int]" = OrderedDict()
+        self.max_tombstones = max_tombstones
+        # Highest version among tombstones forgotten to stay within max_tombstones
+        self._version_floor = 0
+        self._update_callbacks = []
+        self._removal_callbacks: List[Callable[[str], None]] = []
+        self.is_in_use: Callable[[str], bool] = lambda vehicle_id: False
+        self._write_lock: Optional[Callable[[str], AsyncContextManager]] = None
+        self._publish_write: Optional[WritePublisher] = None
+        self.evictions = 0
+
+        logger.info(f"Vehicle Registry initialized (default vehicle: '{self.default_vehicle_id}')")
+
+    @staticmethod
+    def validate_vehicle_id(vehicle_id: str) -> str:
+        """Validate a vehicle ID, raising ValueError if it is malformed"""
+        if not isinstance(vehicle_id, str) or not VEHICLE_ID_PATTERN.match(vehicle_id):
+            raise ValueError(f"Invalid vehicle ID: {vehicle_id!r}")
+        return vehicle_id
+
+    def get(self, vehicle_id: Optional[str] = None) -> VehicleStateManager:
+        """Get the state manager for a vehicle, creating it on first use"""
+        vehicle_id = vehicle_id or self.default_vehicle_id
+
+        manager = self._vehicles.get(vehicle_id)
+        now = time.monotonic()
+        if manager is None:
+            self.validate_vehicle_id(vehicle_id)
+            self._make_room(now)
+            last_version = self._tombstones.pop(vehicle_id, self._version_floor)
+            # A recreated vehicle starts from default settings at a version it never had before
+            manager = VehicleStateManager(vehicle_id, version=last_version + 1 if last_version else 0)
+            manager.write_lock = self._write_lock
+            manager.publish_write = self._publish_write
+            for callback in self._update_callbacks:
+                manager.register_update_callback(callback)
+            self._vehicles[vehicle_id] = manager
+            logger.info(f"Registered vehicle '{vehicle_id}' (active vehicles: {len(self._vehicles)})")
+        else:
+            self._vehicles.move_to_end(vehicle_id)
+        self._last_used[vehicle_id] = now
+
+        return manager
+
+    def _evictable(self, vehicle_id: str) -> bool:
+        return vehicle_id != self.default_vehicle_id and not self.is_in_use(vehicle_id)
+
+    def _make_room(self, now: float):
+        """Drop idle vehicles, then the least recently used one if still at max_vehicles"""
+        if self.idle_timeout > 0:
+            # Oldest first; stop at the first vehicle used within the timeout
+            for vehicle_id in list(self._vehicles):
+                if now - self._last_used[vehicle_id] < self.idle_timeout:
+                    break
+                if self._evictable(vehicle_id):
+                    self._evict(vehicle_id, "idle")
+                else:
+                    # Busy vehicles count as used so the scan does not revisit them
+                    self._vehicles.move_to_end(vehicle_id)
+                    self._last_used[vehicle_id] = now
+
+        if self.max_vehicles and len(self._vehicles) >= self.max_vehicles:
+            victim = next((vehicle_id for vehicle_id in self._vehicles if self._evictable(vehicle_id)), None)
+            if victim is None:
+                raise ValueError(f"Vehicle limit reached ({self.max_vehicles} active vehicles)")
+            self._evict(victim, "vehicle limit")
+
+    def _evict(self, vehicle_id: str, reason: str):
+        self.evictions += 1
+        logger.info(f"Evicting vehicle '{vehicle_id}' ({reason})")
+        self.remove(vehicle_id)
+
+    def peek(self, vehicle_id: str) -> Optional[VehicleStateManager]:
+        """Get the state manager for a vehicle without creating it"""
+        return self._vehicles.get(vehicle_id)
+
+    def remove(self, vehicle_id: str) -> bool:
+        """Drop a vehicle's state manager; returns True if it existed"""
+        manager = self._vehicles.pop(vehicle_id, None)
+        self._last_used.pop(vehicle_id, None)
+        if manager is not None:
+            self._remember_version(vehicle_id, manager.version)
+            for callback in self._update_callbacks:
+                manager.unregister_update_callback(callback)
+            for callback in self._removal_callbacks:
+                callback(vehicle_id)
+            logger.info(f"Removed vehicle '{vehicle_id}' (active vehicles: {len(self._vehicles)})")
+        return manager is not None
+
+    def _remember_version(self, vehicle_id: str, version: int):
+        self._tombstones[vehicle_id] = version
+        self._tombstones.move_to_end(vehicle_id)
+        while len(self._tombstones) > self.max_tombstones:
+            _, forgotten = self._tombstones.popitem(last=False)
+            self._version_floor = max(self._version_floor, forgotten)
+
+    def register_removal_callback(self, callback: Callable[[str], None]):
+        """Call callback(vehicle_id) whenever a vehicle's state manager is dropped"""
+        self._removal_callbacks.append(callback)
+
+    def vehicle_ids(self) -> List[str]:
+        """List IDs of all vehicles with live state"""
+        return list(self._vehicles.keys())
+
+    def set_write_lock(self, write_lock: Optional[Callable[[str], AsyncContextManager]],
+                       publish_write: Optional[WritePublisher] = None):
+        """Serialize writes to every current and future vehicle with write_lock(vehicle_id).
+
+        publish_write(action, parameters, result) is awaited after each write,
+        before the lock is released; update callbacks run after the release.
+        """
+        self._write_lock = write_lock
+        self._publish_write = publish_write
+        for manager in self._vehicles.values():
+            manager.write_lock = write_lock
+            manager.publish_write = publish_write
+
+    def register_update_callback(self, callback):
+        """Register an update callback on every current and future vehicle"""
+        self._update_callbacks.append(callback)
+        for manager in self._vehicles.values():
+            manager.register_update_callback(callback)
+
+    def unregister_update_callback(self, callback):
+        """Unregister an update callback from every vehicle"""
+        if callback in self._update_callbacks:
+            self._update_callbacks.remove(callback)
+        for manager in self._vehicles.values():
+            manager.unregister_update_callback(callback)
+
+    def __len__(self) -> int:
+        return len(self._vehicles)
+
+    def __contains__(self, vehicle_id: str) -> bool:
+        return vehicle_id in self._vehicles
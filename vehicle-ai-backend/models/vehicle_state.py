@@ -590,343 +590,296 @@
 import asyncio
 import logging
 import time
-from typing import Dict, Any, Optional, Union
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Union, Iterable, List, Callable, AsyncContextManager, Awaitable
 from models.schemas import (
     VehicleState, ClimateState, LightsState,
     SeatsState, InfotainmentState
 )
+from models.command_registry import SUBSYSTEMS, get_command, describe_commands
+from models.state_transaction import StateView
 
 logger = logging.getLogger("vehicle-state")
 
+# publish_write(action, parameters, result)
+WritePublisher = Callable[[str, Dict[str, Any], Dict[str, Any]], Awaitable[None]]
+
 
 class VehicleStateManager:
     """Manages the complete vehicle state across all systems"""
 
-    def __init__(self):
+    def __init__(self, vehicle_id: str = "default", version: int = 0):
         # Initialize default states
-        self.state = VehicleState()
-        self._lock = asyncio.Lock()
+        self.vehicle_id = vehicle_id
+        self.state = VehicleState(version=version)
+        self._locks = {subsystem: asyncio.Lock() for subsystem in SUBSYSTEMS}
         self._update_callbacks = []
+        # write_lock(vehicle_id) -> async context manager serializing writes with other
+        # workers (see BroadcastBus.write_lock); None when this worker is the only writer
+        self.write_lock: Optional[Callable[[str], AsyncContextManager]] = None
+        # publish_write(action, parameters, result) hands a write to the other workers
+        # while the write lock is still held
+        self.publish_write: Optional[WritePublisher] = None
+
+        logger.info(f"Vehicle State Manager initialized for vehicle '{vehicle_id}'")
+        logger.debug(f"Initial state: {self.state.dict()}")
+
+    @asynccontextmanager
+    async def _acquire(self, subsystems: Iterable[str]):
+        """Hold the locks of several subsystems, acquired in a fixed order to avoid deadlocks"""
+        locks = [self._locks[subsystem] for subsystem in sorted(set(subsystems))]
+        acquired = []
+        try:
+            for lock in locks:
+                await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    @asynccontextmanager
+    async def _write_access(self):
+        """Hold the vehicle's cross-worker write lock, if there is one"""
+        if self.write_lock is None:
+            yield
+        else:
+            async with self.write_lock(self.vehicle_id):
+                yield
+
+    async def _publish_write(self, action: str, parameters: Dict[str, Any], result: Dict[str, Any]):
+        """Hand a successful write to the other workers; called with the write lock held"""
+        if self.write_lock is None or self.publish_write is None:
+            return
+        try:
+            await self.publish_write(action, parameters, result)
+        except Exception as e:
+            logger.error(f"[{self.vehicle_id}] Failed to publish {action} to the other workers: {e}")
+
+    @property
+    def version(self) -> int:
+        """Current state version; incremented by every successful mutation"""
+        return self.state.version
+
+    def _check_version(self, action: str, expected_version: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Return a conflict result if the caller's expected version is stale"""
+        if expected_version is None or expected_version == self.state.version:
+            return None
+
+        logger.info(f"[{self.vehicle_id}] Rejecting stale {action}: "
+                    f"expected version {expected_version}, current {self.state.version}")
+        return {
+            "action": action,
+            "success": False,
+            "changes": {},
+            "error": f"Version conflict: expected {expected_version}, current {self.state.version}",
+            "conflict": True,
+            "current_version": self.state.version,
+            "vehicle_id": self.vehicle_id
+        }
+
+    def _is_stale(self, expected_version: Optional[int]) -> bool:
+        """True if expected_version is already behind; other workers can only move the version forward"""
+        return expected_version is not None and expected_version < self.state.version
+
+    def _write_unavailable(self, action: str, error: Exception) -> Dict[str, Any]:
+        logger.warning(f"[{self.vehicle_id}] {action} not applied: {error}")
+        return {"action": action, "success": False, "changes": {}, "error": str(error),
+                "vehicle_id": self.vehicle_id}
+
+    async def execute_command(self, action: str, parameters: Dict[str, Any],
+                              expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """Execute a parsed command on the vehicle state.
+
+        Only the lock of the addressed subsystem is held while the state is
+        mutated; update callbacks run after it has been released. If
+        expected_version is given and no longer matches, the command is rejected;
+        one that is already behind is rejected without waiting for any lock.
+        With a write_lock, the command is applied and published to the other
+        workers under it; update callbacks run after it has been released too.
+        """
+        if self._is_stale(expected_version):
+            return self._check_version(action, expected_version)
+
+        spec = get_command(action)
+        if spec is None:
+            subsystem = action.split("_", 1)[0]
+            error = (f"Unknown {subsystem} action: {action}" if subsystem in SUBSYSTEMS
+                     else f"Unknown action category: {action}")
+            logger.warning(f"Unknown action: {action}")
+            return {"action": action, "success": False, "changes": {}, "error": error, "vehicle_id": self.vehicle_id}
+
+        try:
+            async with self._write_access():
+                result = await self._execute_command(spec, action, parameters, expected_version)
+                if result.get("success"):
+                    await self._publish_write(action, parameters, result)
+        except TimeoutError as e:
+            return self._write_unavailable(action, e)
+
+        if result.get("success"):
+            await self._notify_update_callbacks(action, parameters, result)
+
+        return result
 
-        logger.info("Vehicle State Manager initialized")
-        logger.info(f"Initial state: {self.state.dict()}")
+    async def _execute_command(self, spec, action: str, parameters: Dict[str, Any],
+                               expected_version: Optional[int]) -> Dict[str, Any]:
+        async with self._locks[spec.subsystem]:
+            # Re-check now that the lock is held; nothing below awaits before the mutation
+            conflict = self._check_version(action, expected_version)
+            if conflict:
+                return conflict
 
-    async def execute_command(self, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a parsed command on the vehicle state"""
-        async with self._lock:
             try:
-                logger.info(f"Executing command: {action} with parameters: {parameters}")
-                result = {"action": action, "success": False, "changes": {}}
-
-                # Route to appropriate handler based on action prefix
-                if action.startswith("climate_"):
-                    result = await self._execute_climate_action(action, parameters)
-                elif action.startswith("lights_"):
-                    result = await self._execute_lights_action(action, parameters)
-                elif action.startswith("seats_"):
-                    result = await self._execute_seats_action(action, parameters)
-                elif action.startswith("infotainment_"):
-                    result = await self._execute_infotainment_action(action, parameters)
-                else:
-                    result["error"] = f"Unknown action category: {action}"
-                    logger.warning(f"Unknown action: {action}")
+                logger.info(f"[{self.vehicle_id}] Executing command: {action} with parameters: {parameters}")
+
+                result = spec.execute(self.state, action, parameters)
+                result["subsystem"] = spec.subsystem
+                result["vehicle_id"] = self.vehicle_id
 
-                # Update timestamp if successful
+                # Update timestamp and version if successful
                 if result.get("success"):
                     self.state.last_updated = time.time()
+                    self.state.version += 1
                     logger.info(f"Command executed successfully: {result}")
-                    await self._notify_update_callbacks(action, parameters, result)
                 else:
                     logger.warning(f"Command execution failed: {result}")
 
-                return result
-
             except Exception as e:
                 logger.error(f"Error executing command {action}: {e}", exc_info=True)
-                return {"action": action, "success": False, "error": str(e)}
-
-    async def _execute_climate_action(self, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute climate-related actions"""
-        result = {"action": action, "success": False, "changes": {}}
-
-        if action == "climate_set_temperature":
-            temp = parameters.get("temperature", 22)
-            if isinstance(temp, (int, float)):
-                self.state.climate.temperature = float(max(16, min(32, temp)))
-                result["success"] = True
-                result["changes"]["temperature"] = self.state.climate.temperature
-            else:
-                result["error"] = "Invalid temperature value"
-
-        elif action == "climate_turn_on_ac":
-            self.state.climate.ac_enabled = True
-            result["success"] = True
-            result["changes"]["ac_enabled"] = True
-
-        elif action == "climate_turn_off_ac":
-            self.state.climate.ac_enabled = False
-            result["success"] = True
-            result["changes"]["ac_enabled"] = False
-
-        elif action == "climate_increase_temperature" or action == "climate_increase":
-            current_temp = self.state.climate.temperature
-            new_temp = min(32, current_temp + 1)
-            self.state.climate.temperature = new_temp
-            result["success"] = True
-            result["changes"]["temperature"] = new_temp
-
-        elif action == "climate_decrease_temperature" or action == "climate_decrease":
-            current_temp = self.state.climate.temperature
-            new_temp = max(16, current_temp - 1)
-            self.state.climate.temperature = new_temp
-            result["success"] = True
-            result["changes"]["temperature"] = new_temp
-
-        elif action == "climate_set_fan_speed":
-            speed = parameters.get("speed", 3)
-            if isinstance(speed, int) and 1 <= speed <= 5:
-                self.state.climate.fan_speed = speed
-                result["success"] = True
-                result["changes"]["fan_speed"] = speed
-            else:
-                result["error"] = "Invalid fan speed"
-
-        elif action == "climate_toggle_auto":
-            self.state.climate.auto_mode = not self.state.climate.auto_mode
-            result["success"] = True
-            result["changes"]["auto_mode"] = self.state.climate.auto_mode
+                return {"action": action, "success": False, "error": str(e), "vehicle_id": self.vehicle_id}
 
-        elif action == "climate_toggle_recirculation":
-            self.state.climate.recirculation = not self.state.climate.recirculation
-            result["success"] = True
-            result["changes"]["recirculation"] = self.state.climate.recirculation
-
-        else:
-            result["error"] = f"Unknown climate action: {action}"
+            result["version"] = self.state.version
 
         return result
 
-    async def _execute_lights_action(self, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute lights-related actions"""
-        result = {"action": action, "success": False, "changes": {}}
-
-        if action == "lights_turn_on":
-            self.state.lights.interior_lights = True
-            self.state.lights.ambient_lights = True
-            result["success"] = True
-            result["changes"]["interior_lights"] = True
-            result["changes"]["ambient_lights"] = True
-
-        elif action == "lights_turn_off":
-            self.state.lights.interior_lights = False
-            self.state.lights.ambient_lights = False
-            self.state.lights.reading_lights = False
-            result["success"] = True
-            result["changes"]["interior_lights"] = False
-            result["changes"]["ambient_lights"] = False
-            result["changes"]["reading_lights"] = False
-
-        elif action == "lights_set_brightness" or action == "lights_set":
-            brightness = parameters.get("brightness", 80)
-            if isinstance(brightness, (int, float)):
-                self.state.lights.brightness = int(max(0, min(100, brightness)))
-                result["success"] = True
-                result["changes"]["brightness"] = self.state.lights.brightness
-            else:
-                result["error"] = "Invalid brightness value"
-
-        elif action == "lights_brighten":
-            current = self.state.lights.brightness
-            new_brightness = min(100, current + 10)
-            self.state.lights.brightness = new_brightness
-            result["success"] = True
-            result["changes"]["brightness"] = new_brightness
-
-        elif action == "lights_dim":
-            current = self.state.lights.brightness
-            new_brightness = max(0, current - 10)
-            self.state.lights.brightness = new_brightness
-            result["success"] = True
-            result["changes"]["brightness"] = new_brightness
-
-        elif action == "lights_toggle_interior":
-            self.state.lights.interior_lights = not self.state.lights.interior_lights
-            result["success"] = True
-            result["changes"]["interior_lights"] = self.state.lights.interior_lights
-
-        elif action == "lights_toggle_ambient":
-            self.state.lights.ambient_lights = not self.state.lights.ambient_lights
-            result["success"] = True
-            result["changes"]["ambient_lights"] = self.state.lights.ambient_lights
-
-        elif action == "lights_toggle_reading":
-            self.state.lights.reading_lights = not self.state.lights.reading_lights
-            result["success"] = True
-            result["changes"]["reading_lights"] = self.state.lights.reading_lights
-
-        elif action == "lights_set_color":
-            color = parameters.get("color", "white")
-            if color in ["white", "blue", "red", "green", "purple", "orange"]:
-                self.state.lights.ambient_color = color
-                result["success"] = True
-                result["changes"]["ambient_color"] = color
-            else:
-                result["error"] = "Invalid color"
-
-        else:
-            result["error"] = f"Unknown lights action: {action}"
-
-        return result
-
-    async def _execute_seats_action(self, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute seats-related actions"""
-        result = {"action": action, "success": False, "changes": {}}
-        seat = parameters.get("seat", "driver")
-
-        if action == "seats_heat_on":
-            if seat == "driver":
-                self.state.seats.driver_heating = True
-                result["changes"]["driver_heating"] = True
-            else:
-                self.state.seats.passenger_heating = True
-                result["changes"]["passenger_heating"] = True
-            result["success"] = True
-
-        elif action == "seats_heat_off":
-            if seat == "driver":
-                self.state.seats.driver_heating = False
-                result["changes"]["driver_heating"] = False
-            else:
-                self.state.seats.passenger_heating = False
-                result["changes"]["passenger_heating"] = False
-            result["success"] = True
-
-        elif action == "seats_massage_on":
-            if seat == "driver":
-                self.state.seats.driver_massage = True
-                result["changes"]["driver_massage"] = True
-            else:
-                self.state.seats.passenger_massage = True
-                result["changes"]["passenger_massage"] = True
-            result["success"] = True
-
-        elif action == "seats_massage_off":
-            if seat == "driver":
-                self.state.seats.driver_massage = False
-                result["changes"]["driver_massage"] = False
-            else:
-                self.state.seats.passenger_massage = False
-                result["changes"]["passenger_massage"] = False
-            result["success"] = True
-
-        elif action == "seats_adjust_position" or action == "seats_adjust":
-            position = parameters.get("position", {})
-            if isinstance(position, dict):
-                if seat == "driver":
-                    if "height" in position:
-                        self.state.seats.driver_position["height"] = max(0, min(100, position["height"]))
-                    if "tilt" in position:
-                        self.state.seats.driver_position["tilt"] = max(0, min(100, position["tilt"]))
-                    if "lumbar" in position:
-                        self.state.seats.driver_position["lumbar"] = max(0, min(100, position["lumbar"]))
-                    result["changes"]["driver_position"] = self.state.seats.driver_position
+    async def execute_batch(self, commands: List[Dict[str, Any]], atomic: bool = False,
+                            expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """Execute several commands under a single acquisition of the locks they need.
+
+        Commands are applied in order and each gets its own result; callbacks are
+        notified once with the merged changes, keyed by subsystem. With atomic=True
+        the commands are staged on a copy-on-write view and committed only if all
+        of them succeed; otherwise nothing is applied. The whole batch bumps the
+        state version once.
+
+        Every command gets a result with "applied" telling whether its changes
+        are in the state. After a rollback, commands that had succeeded are
+        marked rolled_back and the commands after the failing one are reported
+        as not run, so results always line up with commands.
+        """
+        kind = "transaction" if atomic else "batch"
+        if self._is_stale(expected_version):
+            return self._check_version(kind, expected_version)
+
+        try:
+            async with self._write_access():
+                batch_result = await self._execute_batch(kind, commands, atomic, expected_version)
+                committed = batch_result.get("committed", batch_result.get("succeeded", 0) > 0)
+                if committed:
+                    await self._publish_write(kind, {"commands": commands}, batch_result)
+        except TimeoutError as e:
+            return self._write_unavailable(kind, e)
+
+        if committed:
+            await self._notify_update_callbacks(kind, {"commands": commands}, batch_result)
+
+        return batch_result
+
+    async def _execute_batch(self, kind: str, commands: List[Dict[str, Any]], atomic: bool,
+                             expected_version: Optional[int]) -> Dict[str, Any]:
+        specs = [get_command(command.get("action", "")) for command in commands]
+        subsystems = {spec.subsystem for spec in specs if spec is not None}
+
+        results = []
+        merged_changes: Dict[str, Dict[str, Any]] = {}
+        committed = False
+
+        async with self._acquire(subsystems):
+            conflict = self._check_version(kind, expected_version)
+            if conflict:
+                return conflict
+
+            logger.info(f"[{self.vehicle_id}] Executing {kind} of {len(commands)} commands")
+            target = StateView(self.state) if atomic else self.state
+
+            for command, spec in zip(commands, specs):
+                action = command.get("action", "")
+                parameters = command.get("parameters") or {}
+
+                if spec is None:
+                    result = {"action": action, "success": False, "changes": {}, "error": f"Unknown action: {action}"}
                 else:
-                    if "height" in position:
-                        self.state.seats.passenger_position["height"] = max(0, min(100, position["height"]))
-                    if "tilt" in position:
-                        self.state.seats.passenger_position["tilt"] = max(0, min(100, position["tilt"]))
-                    if "lumbar" in position:
-                        self.state.seats.passenger_position["lumbar"] = max(0, min(100, position["lumbar"]))
-                    result["changes"]["passenger_position"] = self.state.seats.passenger_position
-                result["success"] = True
-            else:
-                result["error"] = "Invalid position format"
+                    try:
+                        result = spec.execute(target, action, parameters)
+                    except Exception as e:
+                        logger.error(f"Error executing batched command {action}: {e}", exc_info=True)
+                        result = {"action": action, "success": False, "changes": {}, "error": str(e)}
 
-        else:
-            result["error"] = f"Unknown seats action: {action}"
-
-        return result
-
-    async def _execute_infotainment_action(self, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute infotainment-related actions"""
-        result = {"action": action, "success": False, "changes": {}}
-
-        if action == "infotainment_set_volume" or action == "infotainment_set":
-            volume = parameters.get("volume", 50)
-            if isinstance(volume, (int, float)):
-                self.state.infotainment.volume = int(max(0, min(100, volume)))
-                result["success"] = True
-                result["changes"]["volume"] = self.state.infotainment.volume
-            else:
-                result["error"] = "Invalid volume value"
-
-        elif action == "infotainment_volume_up" or action == "infotainment_increase":
-            current_volume = self.state.infotainment.volume
-            new_volume = min(100, current_volume + 5)
-            self.state.infotainment.volume = new_volume
-            result["success"] = True
-            result["changes"]["volume"] = new_volume
-
-        elif action == "infotainment_volume_down" or action == "infotainment_decrease":
-            current_volume = self.state.infotainment.volume
-            new_volume = max(0, current_volume - 5)
-            self.state.infotainment.volume = new_volume
-            result["success"] = True
-            result["changes"]["volume"] = new_volume
-
-        elif action == "infotainment_play":
-            self.state.infotainment.playing = True
-            result["success"] = True
-            result["changes"]["playing"] = True
-
-        elif action == "infotainment_pause" or action == "infotainment_stop":
-            self.state.infotainment.playing = False
-            result["success"] = True
-            result["changes"]["playing"] = False
-
-        elif action == "infotainment_mute":
-            self.state.infotainment.muted = True
-            result["success"] = True
-            result["changes"]["muted"] = True
-
-        elif action == "infotainment_unmute":
-            self.state.infotainment.muted = False
-            result["success"] = True
-            result["changes"]["muted"] = False
-
-        elif action == "infotainment_next_track":
-            self.state.infotainment.track = "Next Track"
-            result["success"] = True
-            result["changes"]["track"] = "Next Track"
-
-        elif action == "infotainment_previous_track":
-            self.state.infotainment.track = "Previous Track"
-            result["success"] = True
-            result["changes"]["track"] = "Previous Track"
-
-        elif action == "infotainment_set_source":
-            source = parameters.get("source", "radio")
-            if source in ["radio", "bluetooth", "usb", "aux", "music"]:
-                self.state.infotainment.source = source
-                result["success"] = True
-                result["changes"]["source"] = source
+                results.append(result)
+                if result.get("success"):
+                    merged_changes.setdefault(spec.subsystem, {}).update(result["changes"])
+                elif atomic:
+                    break
+
+            succeeded = sum(1 for result in results if result.get("success"))
+            failed = len(results) - succeeded
+            not_run = len(commands) - len(results)
+
+            if atomic:
+                if succeeded == len(commands):
+                    written = target.commit()
+                    committed = True
+                    logger.info(f"[{self.vehicle_id}] Transaction committed ({written} fields)")
+                else:
+                    target.rollback()
+                    merged_changes = {}
+                    logger.warning(f"[{self.vehicle_id}] Transaction rolled back at command {len(results)}")
+                    for result in results:
+                        if result.get("success"):
+                            result.update(success=False, rolled_back=True)
+                    for command in commands[len(results):]:
+                        results.append({"action": command.get("action", ""), "success": False, "changes": {},
+                                        "not_run": True, "error": "Not run: transaction rolled back"})
             else:
-                result["error"] = "Invalid source"
-
-        elif action == "infotainment_radio_tune":
-            station = parameters.get("station", "FM 101.5")
-            self.state.infotainment.station = station
-            self.state.infotainment.source = "radio"
-            self.state.infotainment.playing = True
-            result["success"] = True
-            result["changes"]["station"] = station
-            result["changes"]["source"] = "radio"
-            result["changes"]["playing"] = True
-
-        else:
-            result["error"] = f"Unknown infotainment action: {action}"
-
-        return result
+                committed = succeeded > 0
+
+            for result in results:
+                result["applied"] = committed and bool(result.get("success"))
+
+            if committed:
+                self.state.last_updated = time.time()
+                self.state.version += 1
+            version = self.state.version
+
+        batch_result = {
+            "action": kind,
+            "success": succeeded == len(commands),
+            "results": results,
+            "changes": merged_changes,
+            "succeeded": succeeded if committed else 0,
+            "failed": failed,
+            "rolled_back": 0 if committed or not atomic else succeeded,
+            "not_run": not_run,
+            "version": version,
+            "vehicle_id": self.vehicle_id
+        }
+        if atomic:
+            batch_result["committed"] = committed
+        logger.info(f"[{self.vehicle_id}] {kind.capitalize()} complete: "
+                    f"{batch_result['succeeded']}/{len(commands)} commands applied")
+
+        return batch_result
+
+    async def execute_transaction(self, commands: List[Dict[str, Any]],
+                                  expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """Apply several commands atomically: all of them or none"""
+        return await self.execute_batch(commands, atomic=True, expected_version=expected_version)
+
+    @staticmethod
+    def get_supported_commands() -> List[Dict[str, Any]]:
+        """Describe every command this manager can execute"""
+        return describe_commands()
 
     async def _notify_update_callbacks(self, action: str, parameters: Dict[str, Any], result: Any):
         """Notify all registered update callbacks"""
@@ -968,14 +921,41 @@ class VehicleStateManager:
         return self.state.infotainment
 
     async def reset_all_states(self):
-        """Reset all vehicle states to defaults"""
-        async with self._lock:
-            self.state = VehicleState()
-            self.state.last_updated = time.time()
-            logger.info("All vehicle states reset to defaults")
-            await self._notify_update_callbacks("reset_all", {}, {"success": True})
+        """Reset all vehicle states to defaults.
+
+        Raises TimeoutError if the write lock could not be obtained.
+        """
+        async with self._write_access():
+            async with self._acquire(SUBSYSTEMS):
+                self.state = VehicleState(version=self.state.version + 1)
+                self.state.last_updated = time.time()
+                result = {"success": True, "version": self.state.version, "vehicle_id": self.vehicle_id}
+                logger.info("All vehicle states reset to defaults")
+            await self._publish_write("reset_all", {}, result)
+        await self._notify_update_callbacks("reset_all", {}, result)
+
+    async def apply_remote_state(self, state: Dict[str, Any]) -> bool:
+        """Adopt a state snapshot (get_all_states() output) produced by another worker.
+
+        The snapshot is validated like any VehicleState and rejected with
+        ValueError if invalid. Versions only move forward: a snapshot that is
+        not newer than the current state is ignored. Update callbacks are not
+        notified; the caller decides how to publish the change locally.
+        Returns True if applied.
+        """
+        remote = VehicleState(**state)
+        async with self._acquire(SUBSYSTEMS):
+            if remote.version <= self.state.version:
+                return False
+
+            for subsystem in SUBSYSTEMS:
+                setattr(self.state, subsystem, getattr(remote, subsystem))
+            self.state.version = remote.version
+            self.state.last_updated = remote.last_updated
+            return True
 
     # Legacy method for backward compatibility
-    async def process_nlp_action(self, action: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_nlp_action(self, action: str, parameters: Dict[str, Any],
+                                 expected_version: Optional[int] = None) -> Dict[str, Any]:
         """Process NLP action - redirects to execute_command"""
-        return await self.execute_command(action, parameters)
\ No newline at end of file
+        return await self.execute_command(action, parameters, expected_version)
\ No newline at end of file
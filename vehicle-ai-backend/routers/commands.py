@@ -0,0 +1,47 @@
+from fastapi import APIRouter, HTTPException, Depends
+from models.command_registry import SUBSYSTEMS, describe_commands
+from models.schemas import BatchCommandRequest
+from models.vehicle_state import VehicleStateManager
+from routers.dependencies import get_vehicle_state, raise_on_version_conflict
+from config import settings
+import logging
+import time
+
+logger = logging.getLogger("commands-router")
+router = APIRouter()
+
+
+@router.get("")
+async def list_commands():
+    """List every command the vehicle state manager understands"""
+    commands = describe_commands()
+    return {
+        "subsystems": list(SUBSYSTEMS),
+        "commands": commands,
+        "count": len(commands),
+        "timestamp": time.time()
+    }
+
+
+@router.post("/batch")
+async def execute_batch(
+        batch: BatchCommandRequest,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state)
+):
+    """Apply several actions under one lock acquisition; clients receive one state update"""
+    if not batch.commands:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one command")
+    if len(batch.commands) > settings.MAX_BATCH_COMMANDS:
+        raise HTTPException(status_code=400,
+                            detail=f"Batch is limited to {settings.MAX_BATCH_COMMANDS} commands")
+
+    try:
+        result = await vehicle_state.execute_batch([command.model_dump() for command in batch.commands],
+                                                   atomic=batch.atomic,
+                                                   expected_version=batch.expected_version)
+    except Exception as e:
+        logger.error(f"Error executing command batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to execute command batch")
+
+    raise_on_version_conflict(result)
+    return result
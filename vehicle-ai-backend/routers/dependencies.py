@@ -0,0 +1,32 @@
+from fastapi import Request, HTTPException, Query
+from models.vehicle_state import VehicleStateManager
+from services.ml_parser_service import MLParserService
+from typing import Optional, Dict, Any
+
+
+def get_vehicle_state(
+        request: Request,
+        vehicle_id: Optional[str] = Query(None, description="Target vehicle ID (defaults to the default vehicle)")
+) -> VehicleStateManager:
+    """Resolve the state manager for the vehicle addressed by the request"""
+    try:
+        return request.app.state.vehicle_registry.get(vehicle_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def get_ml_service(request: Request) -> MLParserService:
+    """The app-wide ML parser client, created on first use if startup has not run"""
+    ml_service = getattr(request.app.state, "ml_parser_service", None)
+    if ml_service is None:
+        ml_service = request.app.state.ml_parser_service = MLParserService()
+    return ml_service
+
+
+def raise_on_version_conflict(result: Dict[str, Any]):
+    """Turn a stale expected_version rejection into an HTTP 409"""
+    if result.get("conflict"):
+        raise HTTPException(status_code=409, detail={
+            "error": result.get("error"),
+            "current_version": result.get("current_version")
+        })
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from models.schemas import InfotainmentState
-from typing import Dict, Any
+from models.vehicle_state import VehicleStateManager
+from routers.dependencies import get_vehicle_state, raise_on_version_conflict
+from typing import Dict, Any, Optional
 import logging
 
 logger = logging.getLogger("infotainment-router")
@@ -8,10 +10,9 @@ router = APIRouter()
 
 
 @router.get("/status", response_model=InfotainmentState)
-async def get_infotainment_status(request: Request):
+async def get_infotainment_status(vehicle_state: VehicleStateManager = Depends(get_vehicle_state)):
     """Get current infotainment status"""
     try:
-        vehicle_state = request.app.state.vehicle_state
         return vehicle_state.get_infotainment_state()
     except Exception as e:
         logger.error(f"Error getting infotainment status: {e}")
@@ -19,92 +20,128 @@ async def get_infotainment_status(request: Request):
 
 
 @router.post("/volume")
-async def set_volume(volume: int, request: Request):
+async def set_volume(
+        volume: int,
+        expected_version: Optional[int] = None,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state)
+):
     """Set audio volume"""
     try:
         if not 0 <= volume <= 100:
             raise HTTPException(status_code=400, detail="Volume must be between 0-100")
 
-        vehicle_state = request.app.state.vehicle_state
-        result = await vehicle_state.process_nlp_action("infotainment_set_volume", {"volume": volume})
+        result = await vehicle_state.process_nlp_action("infotainment_set_volume", {"volume": volume}, expected_version)
+        raise_on_version_conflict(result)
 
         return {"success": True, "volume": volume, "result": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error setting volume: {e}")
         raise HTTPException(status_code=500, detail="Failed to set volume")
 
 
 @router.post("/mute")
-async def toggle_mute(muted: bool, request: Request):
+async def toggle_mute(
+        muted: bool,
+        expected_version: Optional[int] = None,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state)
+):
     """Toggle audio mute"""
     try:
-        vehicle_state = request.app.state.vehicle_state
         action = "infotainment_mute" if muted else "infotainment_unmute"
-        result = await vehicle_state.process_nlp_action(action, {})
+        result = await vehicle_state.process_nlp_action(action, {}, expected_version)
+        raise_on_version_conflict(result)
 
         return {"success": True, "muted": muted, "result": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error toggling mute: {e}")
         raise HTTPException(status_code=500, detail="Failed to toggle mute")
 
 
 @router.post("/play")
-async def toggle_playback(playing: bool, request: Request):
+async def toggle_playback(
+        playing: bool,
+        expected_version: Optional[int] = None,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state)
+):
     """Toggle music playback"""
     try:
-        vehicle_state = request.app.state.vehicle_state
         action = "infotainment_play_music" if playing else "infotainment_pause_music"
-        result = await vehicle_state.process_nlp_action(action, {})
+        result = await vehicle_state.process_nlp_action(action, {}, expected_version)
+        raise_on_version_conflict(result)
 
         return {"success": True, "playing": playing, "result": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error toggling playback: {e}")
         raise HTTPException(status_code=500, detail="Failed to toggle playback")
 
 
 @router.post("/track")
-async def change_track(direction: str, request: Request):
+async def change_track(
+        direction: str,
+        expected_version: Optional[int] = None,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state)
+):
     """Change to next or previous track"""
     try:
         valid_directions = ["next", "previous"]
         if direction not in valid_directions:
             raise HTTPException(status_code=400, detail=f"Direction must be one of: {valid_directions}")
 
-        vehicle_state = request.app.state.vehicle_state
         action = f"infotainment_{direction}_track"
-        result = await vehicle_state.process_nlp_action(action, {})
+        result = await vehicle_state.process_nlp_action(action, {}, expected_version)
+        raise_on_version_conflict(result)
 
         return {"success": True, "direction": direction, "result": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error changing track: {e}")
         raise HTTPException(status_code=500, detail="Failed to change track")
 
 
 @router.post("/radio")
-async def tune_radio(station: str, request: Request):
+async def tune_radio(
+        station: str,
+        expected_version: Optional[int] = None,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state)
+):
     """Tune to radio station"""
     try:
-        vehicle_state = request.app.state.vehicle_state
-        result = await vehicle_state.process_nlp_action("infotainment_radio_tune", {"station": station})
+        result = await vehicle_state.process_nlp_action("infotainment_radio_tune", {"station": station}, expected_version)
+        raise_on_version_conflict(result)
 
         return {"success": True, "station": station, "result": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error tuning radio: {e}")
         raise HTTPException(status_code=500, detail="Failed to tune radio")
 
 
 @router.post("/source")
-async def set_audio_source(source: str, request: Request):
+async def set_audio_source(
+        source: str,
+        expected_version: Optional[int] = None,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state)
+):
     """Set audio source"""
     try:
         valid_sources = ["radio", "bluetooth", "usb", "aux", "music"]
         if source not in valid_sources:
             raise HTTPException(status_code=400, detail=f"Source must be one of: {valid_sources}")
 
-        vehicle_state = request.app.state.vehicle_state
-        result = await vehicle_state.process_nlp_action("infotainment_set_source", {"source": source})
+        result = await vehicle_state.process_nlp_action("infotainment_set_source", {"source": source}, expected_version)
+        raise_on_version_conflict(result)
 
         return {"success": True, "source": source, "result": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error setting audio source: {e}")
         raise HTTPException(status_code=500, detail="Failed to set audio source")
\ No newline at end of file
@@ -641,14 +641,15 @@
 
 
 # routers/nlp.py - Fixed version with working audio processing
-from fastapi import APIRouter, Request, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Request, HTTPException, File, UploadFile, Form, Depends
 from pydantic import BaseModel
+from models.vehicle_state import VehicleStateManager
+from routers.dependencies import get_vehicle_state, get_ml_service
 from services.ml_parser_service import MLParserService
 from services.speech_service import SpeechService
 import logging
 import time
-import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 logger = logging.getLogger("nlp-router")
 router = APIRouter()
@@ -670,53 +671,6 @@ class VoiceResponse(BaseModel):
     error: Optional[str] = None
 
 
-def translate_backend_to_frontend_state(backend_state: Dict[str, Any]) -> Dict[str, Any]:
-    """Translate backend state structure to match frontend expectations"""
-    translated = {}
-
-    if "climate" in backend_state:
-        translated["climate"] = {
-            "temperature": backend_state["climate"].get("temperature", 22),
-            "temp": backend_state["climate"].get("temperature", 22),
-            "ac_enabled": backend_state["climate"].get("ac_enabled", False),
-            "fan_speed": backend_state["climate"].get("fan_speed", 3),
-            "heating_enabled": backend_state["climate"].get("heating_enabled", False),
-            "auto_mode": backend_state["climate"].get("auto_mode", True),
-            "recirculation": backend_state["climate"].get("recirculation", False)
-        }
-
-    if "infotainment" in backend_state:
-        translated["infotainment"] = backend_state["infotainment"]
-        translated["media"] = {
-            "volume": backend_state["infotainment"].get("volume", 50),
-            "playing": backend_state["infotainment"].get("playing", False),
-            "source": backend_state["infotainment"].get("source", "radio"),
-            "station": backend_state["infotainment"].get("station", "FM 101.5"),
-            "track": backend_state["infotainment"].get("track"),
-            "artist": backend_state["infotainment"].get("artist"),
-            "muted": backend_state["infotainment"].get("muted", False)
-        }
-
-    if "lights" in backend_state:
-        translated["lights"] = backend_state["lights"]
-
-    if "seats" in backend_state:
-        translated["seats"] = {
-            "driver_heating": backend_state["seats"].get("driver_heating", False),
-            "heatOn": backend_state["seats"].get("driver_heating", False),
-            "passenger_heating": backend_state["seats"].get("passenger_heating", False),
-            "driver_massage": backend_state["seats"].get("driver_massage", False),
-            "passenger_massage": backend_state["seats"].get("passenger_massage", False),
-            "driver_position": backend_state["seats"].get("driver_position", {"height": 50, "tilt": 50, "lumbar": 50}),
-            "passenger_position": backend_state["seats"].get("passenger_position",
-                                                             {"height": 50, "tilt": 50, "lumbar": 50}),
-            "position": 3
-        }
-
-    translated["last_updated"] = backend_state.get("last_updated", time.time())
-    return translated
-
-
 @router.get("/test")
 async def test_nlp():
     """Test endpoint for NLP service"""
@@ -733,7 +687,9 @@ async def test_nlp():
 async def process_voice_audio(
         request: Request,
         audio: UploadFile = File(...),
-        format: Optional[str] = Form("webm")
+        format: Optional[str] = Form("webm"),
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state),
+        ml_service: MLParserService = Depends(get_ml_service)
 ):
     """Process audio file through complete voice pipeline"""
     start_time = time.time()
@@ -788,16 +744,10 @@ async def process_voice_audio(
 
         # Step 2: Process the transcribed text through ML service
         logger.info("📤 Sending to ML service...")
-        ml_service = MLParserService()
         ml_result = await ml_service.parse_command(transcribed_text)
 
-        # Step 3: Execute the action
-        vehicle_state = request.app.state.vehicle_state
-        connection_manager = request.app.state.connection_manager
-
-        execution_result = await execute_vehicle_action(
-            ml_result, vehicle_state, connection_manager
-        )
+        # Step 3: Execute the action (state changes are broadcast by the state broadcaster)
+        execution_result = await execute_vehicle_action(ml_result, vehicle_state)
 
         processing_time = time.time() - start_time
 
@@ -821,7 +771,12 @@ async def process_voice_audio(
 
 
 @router.post("/process-voice", response_model=VoiceResponse)
-async def process_voice_command(command: VoiceCommand, request: Request):
+async def process_voice_command(
+        command: VoiceCommand,
+        request: Request,
+        vehicle_state: VehicleStateManager = Depends(get_vehicle_state),
+        ml_service: MLParserService = Depends(get_ml_service)
+):
     """Process voice command using ML service"""
     if not command.timestamp:
         command.timestamp = time.time()
@@ -829,15 +784,9 @@ async def process_voice_command(command: VoiceCommand, request: Request):
     logger.info(f"Processing voice command: '{command.text}'")
 
     try:
-        ml_service = MLParserService()
         ml_result = await ml_service.parse_command(command.text)
 
-        vehicle_state = request.app.state.vehicle_state
-        connection_manager = request.app.state.connection_manager
-
-        execution_result = await execute_vehicle_action(
-            ml_result, vehicle_state, connection_manager
-        )
+        execution_result = await execute_vehicle_action(ml_result, vehicle_state)
 
         return VoiceResponse(
             success=True,
@@ -862,79 +811,121 @@ async def process_voice_command(command: VoiceCommand, request: Request):
         )
 
 
-async def execute_vehicle_action(ml_result: Dict, vehicle_state, connection_manager) -> Dict:
+# Maps ML parser action names onto vehicle state commands
+ACTION_MAPPING = {
+    # Climate actions
+    "climate_set": "climate_set_temperature",
+    "climate_set_temperature": "climate_set_temperature",
+    "climate_turn_on": "climate_turn_on_ac",
+    "climate_turn_off": "climate_turn_off_ac",
+    "climate_increase": "climate_increase_temperature",
+    "climate_decrease": "climate_decrease_temperature",
+
+    # Lights actions
+    "lights_turn_on": "lights_turn_on",
+    "lights_turn_off": "lights_turn_off",
+    "lights_brighten": "lights_brighten",
+    "lights_dim": "lights_dim",
+
+    # Seats actions
+    "seats_heat_on": "seats_heat_on",
+    "seats_heat_off": "seats_heat_off",
+    "seats_adjust": "seats_adjust_position",
+
+    # Infotainment actions - COMPLETE MAPPING
+    "infotainment_play": "infotainment_play",
+    "infotainment_pause": "infotainment_pause",
+    "infotainment_stop": "infotainment_pause",
+    "infotainment_turn_off": "infotainment_pause",
+    "infotainment_turn_on": "infotainment_play",
+    "infotainment_volume_up": "infotainment_volume_up",
+    "infotainment_volume_down": "infotainment_volume_down",
+    "infotainment_set_volume": "infotainment_set_volume",
+    "infotainment_set": "infotainment_set_volume",
+    "infotainment_adjust": "infotainment_set_volume",
+    "infotainment_increase": "infotainment_volume_up",
+    "infotainment_decrease": "infotainment_volume_down",
+    "infotainment_mute": "infotainment_mute",
+    "infotainment_unmute": "infotainment_unmute",
+    "infotainment_next_track": "infotainment_next_track",
+    "infotainment_previous_track": "infotainment_previous_track",
+    "infotainment_set_source": "infotainment_set_source"
+}
+
+
+def map_vehicle_action(action: str, parameters: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Map an ML action and its parameters onto a vehicle state command"""
+    mapped_action = ACTION_MAPPING.get(action, action)
+    logger.info(f"Mapped '{action}' to '{mapped_action}'")
+
+    # Handle special parameter cases
+    if mapped_action == "climate_set_temperature":
+        if "temperature" not in parameters:
+            temp = parameters.get("temp", parameters.get("value", 22))
+            parameters = {"temperature": temp}
+
+    elif mapped_action.startswith("seats_"):
+        if "seat" not in parameters:
+            parameters["seat"] = "driver"
+
+    elif mapped_action == "infotainment_set_volume":
+        if "volume" not in parameters:
+            vol = None
+            for key in ["volume", "value", "level"]:
+                if key in parameters:
+                    vol = parameters[key]
+                    break
+            if vol is None:
+                vol = 50
+            parameters = {"volume": vol}
+
+    return mapped_action, parameters
+
+
+async def execute_chained_actions(ml_result: Dict, vehicle_state) -> Dict:
+    """Execute a multi-intent utterance ("make it cooler and turn up music") atomically"""
+    commands = []
+    for sub_command in ml_result.get("commands", []):
+        action = sub_command.get("action", "")
+        mapped_action, parameters = map_vehicle_action(action, dict(sub_command.get("parameters", {})))
+        commands.append({"action": mapped_action, "parameters": parameters, "original_action": action})
+
+    logger.info(f"Executing {len(commands)} chained actions: {[command['action'] for command in commands]}")
+
+    try:
+        result = await vehicle_state.execute_transaction(commands)
+
+        return {
+            "success": result.get("success", False),
+            "action_executed": [command["action"] for command in commands],
+            "original_action": [command["original_action"] for command in commands],
+            "parameters_used": [command["parameters"] for command in commands],
+            "execution_result": result,
+            "message": f"Successfully executed {len(commands)} chained actions" if result.get(
+                "committed") else "Chained command failed; no changes were applied"
+        }
+
+    except Exception as e:
+        logger.error(f"Error executing chained actions: {e}", exc_info=True)
+        return {
+            "success": False,
+            "error": str(e),
+            "action_attempted": [command["original_action"] for command in commands]
+        }
+
+
+async def execute_vehicle_action(ml_result: Dict, vehicle_state) -> Dict:
     """Execute vehicle action based on ML parsing result"""
+    if ml_result.get("commands"):
+        return await execute_chained_actions(ml_result, vehicle_state)
+
     action = ml_result.get("action", "")
     parameters = ml_result.get("parameters", {})
 
     logger.info(f"Executing action: {action} with parameters: {parameters}")
 
     try:
-        # COMPREHENSIVE action mapping
-        action_mapping = {
-            # Climate actions
-            "climate_set": "climate_set_temperature",
-            "climate_set_temperature": "climate_set_temperature",
-            "climate_turn_on": "climate_turn_on_ac",
-            "climate_turn_off": "climate_turn_off_ac",
-            "climate_increase": "climate_increase_temperature",
-            "climate_decrease": "climate_decrease_temperature",
-
-            # Lights actions
-            "lights_turn_on": "lights_turn_on",
-            "lights_turn_off": "lights_turn_off",
-            "lights_brighten": "lights_brighten",
-            "lights_dim": "lights_dim",
-
-            # Seats actions
-            "seats_heat_on": "seats_heat_on",
-            "seats_heat_off": "seats_heat_off",
-            "seats_adjust": "seats_adjust_position",
-
-            # Infotainment actions - COMPLETE MAPPING
-            "infotainment_play": "infotainment_play",
-            "infotainment_pause": "infotainment_pause",
-            "infotainment_stop": "infotainment_pause",
-            "infotainment_turn_off": "infotainment_pause",
-            "infotainment_turn_on": "infotainment_play",
-            "infotainment_volume_up": "infotainment_volume_up",
-            "infotainment_volume_down": "infotainment_volume_down",
-            "infotainment_set_volume": "infotainment_set_volume",
-            "infotainment_set": "infotainment_set_volume",
-            "infotainment_adjust": "infotainment_set_volume",
-            "infotainment_increase": "infotainment_volume_up",
-            "infotainment_decrease": "infotainment_volume_down",
-            "infotainment_mute": "infotainment_mute",
-            "infotainment_unmute": "infotainment_unmute",
-            "infotainment_next_track": "infotainment_next_track",
-            "infotainment_previous_track": "infotainment_previous_track",
-            "infotainment_set_source": "infotainment_set_source"
-        }
-
-        # Map the action
-        mapped_action = action_mapping.get(action, action)
-        logger.info(f"Mapped '{action}' to '{mapped_action}'")
-
-        # Handle special parameter cases
-        if mapped_action == "climate_set_temperature":
-            if "temperature" not in parameters:
-                temp = parameters.get("temp", parameters.get("value", 22))
-                parameters = {"temperature": temp}
-
-        elif mapped_action.startswith("seats_"):
-            if "seat" not in parameters:
-                parameters["seat"] = "driver"
-
-        elif mapped_action == "infotainment_set_volume":
-            if "volume" not in parameters:
-                vol = None
-                for key in ["volume", "value", "level"]:
-                    if key in parameters:
-                        vol = parameters[key]
-                        break
-                if vol is None:
-                    vol = 50
-                parameters = {"volume": vol}
+        mapped_action, parameters = map_vehicle_action(action, parameters)
 
         # ✅ FIX: Properly await the execute_command call
         result = await vehicle_state.execute_command(mapped_action, parameters)
@@ -949,22 +940,6 @@ async def execute_vehicle_action(ml_result: Dict, vehicle_state, connection_mana
                 "mapped_action": mapped_action
             }
 
-        # Broadcast state update via WebSocket if successful
-        if result.get("success", False):
-            try:
-                # ✅ FIX: Use correct method name
-                updated_state = vehicle_state.get_all_states()
-                translated_state = translate_backend_to_frontend_state(updated_state)
-
-                await connection_manager.broadcast(json.dumps({
-                    "type": "state_update",
-                    "data": translated_state,
-                    "timestamp": time.time()
-                }))
-                logger.info("State update broadcasted via WebSocket")
-            except Exception as broadcast_error:
-                logger.warning(f"Failed to broadcast state update: {broadcast_error}")
-
         return {
             "success": result.get("success", False),
             "action_executed": mapped_action,
@@ -981,21 +956,23 @@ async def execute_vehicle_action(ml_result: Dict, vehicle_state, connection_mana
             "success": False,
             "error": str(e),
             "action_attempted": action,
-            "mapped_action": action_mapping.get(action, action)
+            "mapped_action": ACTION_MAPPING.get(action, action)
         }
 
 
 @router.get("/status")
-async def get_nlp_status():
+async def get_nlp_status(ml_service: MLParserService = Depends(get_ml_service)):
     """Get NLP service status"""
     try:
-        ml_service = MLParserService()
         test_result = await ml_service.parse_command("test")
 
         return {
             "status": "healthy",
-            "ml_service_available": True,
+            "ml_service_available": ml_service.breaker.state != "open",
             "ml_service_url": ml_service.ml_service_url,
+            "circuit_breaker": ml_service.breaker.get_stats(),
+            "single_flight": ml_service.inflight.get_stats(),
+            "batching": ml_service.batcher.get_stats() if ml_service.batcher else None,
             "test_result": test_result,
             "timestamp": time.time()
         }
@@ -1008,6 +985,20 @@ async def get_nlp_status():
         }
 
 
+@router.get("/cache")
+async def get_parse_cache_stats(ml_service: MLParserService = Depends(get_ml_service)):
+    """Get parse cache statistics"""
+    return ml_service.cache.get_stats()
+
+
+@router.delete("/cache")
+async def flush_parse_cache(ml_service: MLParserService = Depends(get_ml_service)):
+    """Flush the parse cache"""
+    removed = ml_service.cache.clear()
+    logger.info(f"Parse cache flushed ({removed} entries)")
+    return {"success": True, "removed": removed, "timestamp": time.time()}
+
+
 # Health check for speech service
 @router.get("/speech-status")
 async def get_speech_status():
@@ -3,8 +3,10 @@
 Startup script for Vehicle AI Backend
 """
 
+import multiprocessing
 import uvicorn
 from config import settings
+from services.broadcast_bus import resolve_bus_kind, run_hub
 import logging
 logging.raiseExceptions = False
 
@@ -14,11 +16,24 @@ if __name__ == "__main__":
     print(f"📚 API Docs: http://{settings.HOST}:{settings.PORT}/docs")
     print(f"🔌 WebSocket: ws://{settings.HOST}:{settings.PORT}/ws")
     print("=" * 50)
-    
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level=settings.LOG_LEVEL.lower()
-    )
\ No newline at end of file
+
+    # Workers on the Unix socket bus share state changes and write leases through a hub.
+    # It is started for every such bus, even with one worker: without it no write could get a lease
+    hub = None
+    if resolve_bus_kind() == "unix":
+        print(f"👥 Workers: {settings.WORKERS} (broadcast bus: {settings.BROADCAST_BUS_SOCKET})")
+        hub = multiprocessing.Process(target=run_hub, args=(settings.BROADCAST_BUS_SOCKET,), daemon=True)
+        hub.start()
+
+    try:
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=settings.DEBUG and settings.WORKERS == 1,
+            workers=settings.WORKERS,
+            log_level=settings.LOG_LEVEL.lower()
+        )
+    finally:
+        if hub is not None:
+            hub.terminate()
\ No newline at end of file
@@ -0,0 +1,496 @@
+# services/broadcast_bus.py - Pluggable bus that shares state changes between uvicorn workers
+import asyncio
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Callable, Awaitable, List, Set, Deque
+
+from config import settings
+
+logger = logging.getLogger("broadcast-bus")
+
+BUS_KINDS = ("inprocess", "unix")
+MAX_EVENT_BYTES = 1024 * 1024
+# A hub peer that falls this far behind is disconnected and resyncs on reconnect
+MAX_PEER_BUFFER_BYTES = 8 * 1024 * 1024
+RECONNECT_DELAYS = (0.1, 0.25, 0.5, 1.0, 2.0)
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def new_worker_id() -> str:
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class WriteLockUnavailable(TimeoutError):
+    """The write lock of a vehicle could not be obtained in time"""
+
+
+class _KeyedLocks:
+    """One asyncio.Lock per key, dropped again once nobody holds or waits for it"""
+
+    def __init__(self):
+        # key -> [lock, holders and waiters]
+        self._entries: Dict[str, List[Any]] = {}
+
+    async def acquire(self, key: str, timeout: Optional[float] = None):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            await asyncio.wait_for(entry[0].acquire(), timeout)
+        except BaseException:
+            self._unref(key, entry)
+            raise
+
+    def release(self, key: str):
+        entry = self._entries[key]
+        entry[0].release()
+        self._unref(key, entry)
+
+    def _unref(self, key: str, entry: List[Any]):
+        entry[1] -= 1
+        if not entry[1]:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BroadcastBus(ABC):
+    """Carries state-change events between the workers serving one backend.
+
+    Each worker publishes the changes made through it; every other worker
+    receives them, adopts the newer state and fans it out to its own
+    WebSocket clients. Events carry the publishing worker's id, and a worker
+    ignores its own events.
+
+    Writes to a vehicle are serialized across workers by write_lock(): the
+    holder has seen every earlier write to the vehicle, so version checks
+    stay exact and no acknowledged write is overwritten by a concurrent one.
+    """
+
+    kind = "none"
+
+    def __init__(self, worker_id: Optional[str] = None, lock_timeout: Optional[float] = None):
+        self.worker_id = worker_id or new_worker_id()
+        self.lock_timeout = settings.BROADCAST_BUS_LOCK_TIMEOUT if lock_timeout is None else lock_timeout
+        self._handler: Optional[EventHandler] = None
+        # Writers of this worker queue here, so at most one lease request per vehicle is outstanding
+        self._local_locks = _KeyedLocks()
+        self.stats = {"published": 0, "received": 0, "dropped": 0, "lock_timeouts": 0}
+
+    async def start(self, handler: EventHandler):
+        """Start delivering events from other workers to handler"""
+        self._handler = handler
+
+    @property
+    def has_peers(self) -> bool:
+        """Whether other workers may write the same vehicles through this bus"""
+        return True
+
+    @abstractmethod
+    async def publish(self, event: Dict[str, Any]):
+        """Send an event to every other worker"""
+
+    @asynccontextmanager
+    async def write_lock(self, vehicle_id: str):
+        """Hold the bus-wide write lock of a vehicle.
+
+        Once it is held, every write other workers made to the vehicle has
+        been delivered to this worker. The change must be published before
+        the lock is released. Raises WriteLockUnavailable after lock_timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+        try:
+            await self._local_locks.acquire(vehicle_id, self.lock_timeout)
+        except asyncio.TimeoutError:
+            self.stats["lock_timeouts"] += 1
+            raise WriteLockUnavailable(f"Timed out waiting for the write lock of '{vehicle_id}'")
+        try:
+            try:
+                await asyncio.wait_for(self._acquire_lease(vehicle_id), max(deadline - loop.time(), 0))
+            except (asyncio.TimeoutError, ConnectionError) as e:
+                self.stats["lock_timeouts"] += 1
+                raise WriteLockUnavailable(f"Could not get the write lock of '{vehicle_id}': "
+                                           f"{str(e) or 'timed out'}") from e
+            try:
+                yield
+            finally:
+                await self._release_lease(vehicle_id)
+        finally:
+            self._local_locks.release(vehicle_id)
+
+    @abstractmethod
+    async def _acquire_lease(self, vehicle_id: str):
+        """Wait until this worker may write the vehicle"""
+
+    @abstractmethod
+    async def _release_lease(self, vehicle_id: str):
+        """Let the next worker write the vehicle"""
+
+    async def close(self):
+        self._handler = None
+
+    async def _deliver(self, event: Dict[str, Any]):
+        if event.get("origin") == self.worker_id or self._handler is None:
+            return
+        self.stats["received"] += 1
+        try:
+            await self._handler(event)
+        except Exception as e:
+            logger.error(f"Error handling bus event for '{event.get('vehicle_id')}': {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "worker_id": self.worker_id, **self.stats}
+
+
+class InProcessBus(BroadcastBus):
+    """Bus between buses sharing one peers list in the same process.
+
+    A lone InProcessBus (the single-worker default) has no peers: publish is
+    a no-op and the state broadcaster takes no write leases. Several of them
+    sharing a peers list behave like workers on a real bus, which is what
+    tests and benchmarks use.
+    """
+
+    kind = "inprocess"
+
+    def __init__(self, worker_id: Optional[str] = None, peers: Optional[List["InProcessBus"]] = None):
+        super().__init__(worker_id)
+        self.peers = peers if peers is not None else []
+        # All peers share one set of leases, like the workers behind one hub
+        self._leases = self.peers[0]._leases if self.peers else _KeyedLocks()
+        self.peers.append(self)
+
+    @property
+    def has_peers(self) -> bool:
+        return len(self.peers) > 1
+
+    async def publish(self, event: Dict[str, Any]):
+        event = {**event, "origin": self.worker_id}
+        self.stats["published"] += 1
+        for peer in self.peers:
+            if peer is not self:
+                await peer._deliver(event)
+
+    async def _acquire_lease(self, vehicle_id: str):
+        await self._leases.acquire(vehicle_id)
+
+    async def _release_lease(self, vehicle_id: str):
+        self._leases.release(vehicle_id)
+
+    async def close(self):
+        await super().close()
+        if self in self.peers:
+            self.peers.remove(self)
+
+
+class UnixSocketBus(BroadcastBus):
+    """Bus client that talks to a BusHub over a Unix domain socket.
+
+    Events are newline-delimited JSON. The connection is re-established with
+    backoff if the hub goes away; events published while disconnected are
+    dropped (the next event for a vehicle carries its full state again).
+
+    Write leases are requested from the hub with {"op": "lock"} and handed
+    back with {"op": "unlock"}. The hub answers {"op": "granted"} on the same
+    stream as the events, after every earlier event, and includes the last
+    event it relayed for the vehicle so a worker that missed it catches up.
+    No lease can be obtained while disconnected.
+    """
+
+    kind = "unix"
+
+    def __init__(self, path: str, worker_id: Optional[str] = None, lock_timeout: Optional[float] = None):
+        super().__init__(worker_id, lock_timeout)
+        self.path = path
+        self.connected = asyncio.Event()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        # vehicle_id -> future resolved when the hub grants the lease
+        self._grants: Dict[str, asyncio.Future] = {}
+
+    async def start(self, handler: EventHandler):
+        await super().start(handler)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        attempt = 0
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=MAX_EVENT_BYTES)
+            except (OSError, ConnectionError) as e:
+                delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+                if attempt == 0:
+                    logger.warning(f"Broadcast bus hub not reachable at {self.path}: {e}; retrying")
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            attempt = 0
+            self._writer = writer
+            self.connected.set()
+            logger.info(f"Worker {self.worker_id} joined broadcast bus at {self.path}")
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    message = json.loads(line)
+                    if message.get("op") == "granted":
+                        await self._granted(message)
+                    else:
+                        await self._deliver(message)
+            except (OSError, ConnectionError, ValueError) as e:
+                logger.warning(f"Broadcast bus connection lost: {e}")
+            finally:
+                self.connected.clear()
+                self._writer = None
+                writer.close()
+                # The hub releases our leases when we go; pending requests are void
+                for waiter in self._grants.values():
+                    if not waiter.done():
+                        waiter.set_exception(ConnectionError("broadcast bus connection lost"))
+                self._grants.clear()
+            logger.warning(f"Worker {self.worker_id} lost the broadcast bus; reconnecting")
+
+    async def _granted(self, message: Dict[str, Any]):
+        vehicle_id = message["vehicle_id"]
+        if message.get("event") is not None:
+            await self._deliver(message["event"])
+        waiter = self._grants.pop(vehicle_id, None)
+        if waiter is None or waiter.done():
+            # The request timed out meanwhile; hand the lease straight back
+            await self._send({"op": "unlock", "vehicle_id": vehicle_id})
+        else:
+            waiter.set_result(None)
+
+    async def _acquire_lease(self, vehicle_id: str):
+        await self.connected.wait()
+        waiter = asyncio.get_running_loop().create_future()
+        self._grants[vehicle_id] = waiter
+        try:
+            if not await self._send({"op": "lock", "vehicle_id": vehicle_id}):
+                raise ConnectionError("broadcast bus not connected")
+            await waiter
+        finally:
+            if self._grants.get(vehicle_id) is waiter:
+                del self._grants[vehicle_id]
+
+    async def _release_lease(self, vehicle_id: str):
+        # After a reconnect the hub has already released it; the unlock is then ignored
+        await self._send({"op": "unlock", "vehicle_id": vehicle_id})
+
+    async def _send(self, message: Dict[str, Any]) -> bool:
+        writer = self._writer
+        if writer is None:
+            return False
+        try:
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            return True
+        except (OSError, ConnectionError) as e:
+            logger.warning(f"Failed to write to broadcast bus: {e}")
+            return False
+
+    async def publish(self, event: Dict[str, Any]):
+        writer = self._writer
+        if writer is None:
+            self.stats["dropped"] += 1
+            return
+
+        line = json.dumps({**event, "origin": self.worker_id}, default=str).encode() + b"\n"
+        try:
+            writer.write(line)
+            await writer.drain()
+            self.stats["published"] += 1
+        except (OSError, ConnectionError) as e:
+            self.stats["dropped"] += 1
+            logger.warning(f"Failed to publish to broadcast bus: {e}")
+
+    async def close(self):
+        await super().close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class BusHub:
+    """Relays each event a worker sends to every other connected worker.
+
+    The hub also owns the write leases: lock requests for a vehicle are
+    granted one at a time in arrival order, each grant carrying the last
+    event relayed for the vehicle. A worker that disconnects gives up its
+    leases and its place in the queues. The last event is kept for up to
+    max_vehicles vehicles, least recently written dropped first.
+    """
+
+    def __init__(self, path: str, max_vehicles: Optional[int] = None):
+        self.path = path
+        self.max_vehicles = settings.MAX_VEHICLES if max_vehicles is None else max_vehicles  # 0 = unlimited
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        # vehicle_id -> workers waiting for the lease; the first one holds it
+        self._leases: Dict[str, Deque[asyncio.StreamWriter]] = {}
+        # vehicle_id -> (version, last event line)
+        self._last_events: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"relayed": 0, "peers_dropped": 0, "leases_granted": 0}
+
+    async def start(self):
+        # A socket file left behind by a previous run would make bind() fail
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle_peer, self.path, limit=MAX_EVENT_BYTES)
+        logger.info(f"Broadcast bus hub listening on {self.path}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                op = message.get("op")
+                if op == "lock":
+                    self._lock(message["vehicle_id"], writer)
+                elif op == "unlock":
+                    self._unlock(message["vehicle_id"], writer)
+                else:
+                    self._relay(message, line, writer)
+        except (OSError, ConnectionError, ValueError, KeyError, asyncio.CancelledError):
+            pass
+        finally:
+            self._drop_peer(writer)
+
+    def _relay(self, event: Dict[str, Any], line: bytes, sender: asyncio.StreamWriter):
+        vehicle_id = event.get("vehicle_id")
+        state = event.get("state") or {}
+        version = state.get("version", event.get("version", 0))
+        last = self._last_events.get(vehicle_id)
+        if last is None or version > last[0]:
+            self._last_events[vehicle_id] = (version, line.rstrip(b"\n"))
+            self._last_events.move_to_end(vehicle_id)
+            if self.max_vehicles and len(self._last_events) > self.max_vehicles:
+                self._last_events.popitem(last=False)
+
+        for peer in list(self._peers):
+            if peer is not sender:
+                self._write(peer, line)
+        self.stats["relayed"] += 1
+
+    def _write(self, peer: asyncio.StreamWriter, line: bytes):
+        if peer not in self._peers:
+            return
+        # Never wait on one slow worker; drop it instead and let it reconnect
+        if peer.transport.get_write_buffer_size() > MAX_PEER_BUFFER_BYTES:
+            self.stats["peers_dropped"] += 1
+            self._drop_peer(peer)
+            return
+        peer.write(line)
+
+    def _lock(self, vehicle_id: str, peer: asyncio.StreamWriter):
+        queue = self._leases.setdefault(vehicle_id, deque())
+        queue.append(peer)
+        if len(queue) == 1:
+            self._grant(vehicle_id, peer)
+
+    def _unlock(self, vehicle_id: str, peer: asyncio.StreamWriter):
+        queue = self._leases.get(vehicle_id)
+        # Only the holder can release; a stale unlock after a reconnect is ignored
+        if not queue or queue[0] is not peer:
+            return
+        queue.popleft()
+        self._grant_next(vehicle_id, queue)
+
+    def _grant_next(self, vehicle_id: str, queue: Deque[asyncio.StreamWriter]):
+        if queue:
+            self._grant(vehicle_id, queue[0])
+        else:
+            del self._leases[vehicle_id]
+
+    def _grant(self, vehicle_id: str, peer: asyncio.StreamWriter):
+        last = self._last_events.get(vehicle_id)
+        event = last[1] if last is not None else b"null"
+        self.stats["leases_granted"] += 1
+        self._write(peer, b'{"op":"granted","vehicle_id":' + json.dumps(vehicle_id).encode()
+                    + b',"event":' + event + b"}\n")
+
+    def _drop_peer(self, peer: asyncio.StreamWriter):
+        if peer not in self._peers:
+            return
+        self._peers.discard(peer)
+        peer.close()
+        for vehicle_id in list(self._leases):
+            # Granting the lease below may drop another peer, which rewrites the queues
+            queue = self._leases.get(vehicle_id)
+            if not queue or peer not in queue:
+                continue
+            held = queue[0] is peer
+            remaining = deque(waiter for waiter in queue if waiter is not peer)
+            self._leases[vehicle_id] = remaining
+            if held or not remaining:
+                self._grant_next(vehicle_id, remaining)
+
+    async def close(self):
+        for peer in list(self._peers):
+            peer.close()
+        self._peers.clear()
+        self._leases.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def run_hub(path: str):
+    """Entry point for the hub process started by run.py"""
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    try:
+        asyncio.run(BusHub(path).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def resolve_bus_kind(kind: Optional[str] = None) -> str:
+    """Kind of bus create_bus() builds for kind (default BROADCAST_BUS): "unix" or "inprocess"."""
+    kind = (kind or settings.BROADCAST_BUS).lower()
+    if kind == "auto":
+        return "unix" if settings.WORKERS > 1 else "inprocess"
+    if kind not in ("unix", "inprocess"):
+        logger.warning(f"Unknown broadcast bus '{kind}', using 'inprocess'")
+        return "inprocess"
+    return kind
+
+
+def create_bus(kind: Optional[str] = None) -> BroadcastBus:
+    """Bus for this worker: the Unix socket bus when running several workers, otherwise in-process.
+
+    A Unix socket bus needs a BusHub serving BROADCAST_BUS_SOCKET; run.py
+    starts one whenever resolve_bus_kind() is "unix".
+    """
+    if resolve_bus_kind(kind) == "unix":
+        return UnixSocketBus(settings.BROADCAST_BUS_SOCKET)
+    return InProcessBus()
@@ -0,0 +1,92 @@
+# services/circuit_breaker.py - Closed/open/half-open circuit breaker for calls to a remote service
+import logging
+import time
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger("circuit-breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker fed by real call outcomes and by a health prober.
+
+    closed     calls go through; failure_threshold consecutive failures open it
+    open       calls are refused without touching the network until
+               recovery_timeout has passed or a health probe succeeds
+    half_open  up to half_open_max_calls trial calls go through; a success
+               closes the breaker, a failure opens it again
+
+    Callers ask allow_request() before each call and report the outcome with
+    record_success() or record_failure(). Every allowed call must report
+    exactly one outcome, otherwise half-open trial slots are never released.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+            self._half_open_calls += 1
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def record_success(self):
+        self.stats["successes"] += 1
+        self._consecutive_failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self, reason: Optional[str] = None):
+        self.stats["failures"] += 1
+        self._consecutive_failures += 1
+        if self._state == HALF_OPEN or \
+                (self._state == CLOSED and self._consecutive_failures >= self.failure_threshold):
+            self.trip(reason)
+
+    def trip(self, reason: Optional[str] = None):
+        """Open the breaker now (e.g. because a health probe failed)"""
+        self._opened_at = time.monotonic()
+        if self._state != OPEN:
+            self.stats["opened"] += 1
+            self._transition(OPEN, reason)
+
+    def probe_succeeded(self):
+        """A health probe passed: let trial calls through instead of waiting out recovery_timeout"""
+        if self._state == OPEN:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str, reason: Optional[str] = None):
+        logger.info(f"Circuit breaker '{self.name}': {self._state} -> {state}" + (f" ({reason})" if reason else ""))
+        self._state = state
+        self._half_open_calls = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+            **self.stats
+        }
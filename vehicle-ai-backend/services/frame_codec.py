@@ -0,0 +1,157 @@
+# services/frame_codec.py - Compact binary encodings for WebSocket state frames
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import cbor2
+
+    CBOR_AVAILABLE = True
+except ImportError:
+    CBOR_AVAILABLE = False
+
+logger = logging.getLogger("frame-codec")
+
+SCHEMA_VERSION = 1
+
+# Short keys for the binary layout. Binary state frames carry the backend
+# state shape only once; the frontend aliases (temp, media, on, heatOn) are
+# derived on the client instead of being sent twice.
+ENVELOPE_KEYS = {
+    "type": "t",
+    "vehicle_id": "v",
+    "version": "n",
+    "base_version": "b",
+    "data": "d",
+    "replayed": "r",
+    "request_id": "q",
+    "timestamp": "ts",
+}
+
+FRAME_TYPES = {
+    "state_update": "s",
+    "state_delta": "d",
+}
+
+SUBSYSTEM_KEYS = {
+    "climate": ("c", {
+        "temperature": "t",
+        "fan_speed": "f",
+        "ac_enabled": "ac",
+        "heating_enabled": "h",
+        "auto_mode": "am",
+        "recirculation": "r",
+    }),
+    "lights": ("l", {
+        "interior_lights": "i",
+        "ambient_lights": "a",
+        "reading_lights": "r",
+        "brightness": "b",
+        "ambient_color": "c",
+    }),
+    "seats": ("s", {
+        "driver_heating": "dh",
+        "passenger_heating": "ph",
+        "driver_massage": "dm",
+        "passenger_massage": "pm",
+        "driver_position": "dp",
+        "passenger_position": "pp",
+    }),
+    "infotainment": ("i", {
+        "volume": "v",
+        "source": "s",
+        "station": "st",
+        "track": "tr",
+        "artist": "ar",
+        "playing": "p",
+        "muted": "m",
+    }),
+}
+
+POSITION_KEYS = {"height": "h", "tilt": "t", "lumbar": "l"}
+
+
+def available_encodings() -> List[str]:
+    """Frame encodings this server can speak; JSON is always available"""
+    encodings = ["json"]
+    if MSGPACK_AVAILABLE:
+        encodings.append("msgpack")
+    if CBOR_AVAILABLE:
+        encodings.append("cbor")
+    return encodings
+
+
+def schema() -> Dict[str, Any]:
+    """Key layout sent to binary clients so they can expand frames"""
+    return {
+        "version": SCHEMA_VERSION,
+        "envelope": ENVELOPE_KEYS,
+        "types": FRAME_TYPES,
+        "subsystems": {subsystem: {"key": key, "fields": fields} for subsystem, (key, fields) in SUBSYSTEM_KEYS.items()},
+        "position": POSITION_KEYS,
+    }
+
+
+def _compact_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {POSITION_KEYS.get(key, key): item for key, item in value.items()}
+    return value
+
+
+def compact_state(state: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Rewrite {subsystem: {field: value}} (full state or changes) with short keys"""
+    compacted = {}
+    for subsystem, fields in state.items():
+        if subsystem not in SUBSYSTEM_KEYS:
+            continue
+        key, field_keys = SUBSYSTEM_KEYS[subsystem]
+        compacted[key] = {field_keys.get(field, field): _compact_value(value) for field, value in fields.items()}
+    return compacted
+
+
+def pack(encoding: str, payload: Dict[str, Any]) -> bytes:
+    """Serialize a compact payload with a binary encoding"""
+    if encoding == "msgpack" and MSGPACK_AVAILABLE:
+        return msgpack.packb(payload, use_bin_type=True)
+    if encoding == "cbor" and CBOR_AVAILABLE:
+        return cbor2.dumps(payload)
+    raise ValueError(f"Unsupported frame encoding: {encoding}")
+
+
+def encode_snapshot(encoding: str, vehicle_id: str, state: Dict[str, Any], request_id: Any = None) -> bytes:
+    """Binary state_update frame from a backend state dict (get_all_states())"""
+    payload = {
+        "t": FRAME_TYPES["state_update"],
+        "v": vehicle_id,
+        "n": state.get("version", 0),
+        "d": compact_state({key: value for key, value in state.items() if key in SUBSYSTEM_KEYS}),
+        "ts": state.get("last_updated", time.time()),
+    }
+    if request_id is not None:
+        payload["q"] = request_id
+    return pack(encoding, payload)
+
+
+def encode_delta(encoding: str, vehicle_id: str, base_version: int, version: int,
+                 changes: Dict[str, Dict[str, Any]], replayed: Optional[bool] = None, request_id: Any = None) -> bytes:
+    """Binary state_delta frame from per-subsystem changes"""
+    payload = {
+        "t": FRAME_TYPES["state_delta"],
+        "v": vehicle_id,
+        "b": base_version,
+        "n": version,
+        "d": compact_state(changes),
+        "ts": time.time(),
+    }
+    if replayed:
+        payload["r"] = True
+    if request_id is not None:
+        payload["q"] = request_id
+    return pack(encoding, payload)
@@ -0,0 +1,86 @@
+# services/micro_batcher.py - Gather concurrent single-item calls into batches
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("micro-batcher")
+
+BatchSender = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """Collects items submitted within max_delay seconds (or until max_size
+    items are waiting) and hands them to send_batch in one call.
+
+    send_batch receives the items in submission order and must return one
+    result per item, in the same order; each submitter gets its own result.
+    If send_batch raises, every submitter of that batch gets the exception.
+    """
+
+    def __init__(self, send_batch: BatchSender, max_size: int = 16, max_delay: float = 0.002):
+        self.send_batch = send_batch
+        self.max_size = max(1, max_size)
+        self.max_delay = max(0.0, max_delay)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"items": 0, "batches": 0, "largest_batch": 0}
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.stats["items"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.send_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch of {len(batch)} items returned {len(results)} results")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # A submitter that was cancelled meanwhile no longer wants its result
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Send whatever is still waiting and wait for batches in flight"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            "max_size": self.max_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "waiting": len(self._pending),
+            "average_batch": self.stats["items"] / batches if batches else 0.0,
+            **self.stats
+        }
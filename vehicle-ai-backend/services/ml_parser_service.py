@@ -1,25 +1,73 @@
 import httpx
+import copy
 import json
-from typing import Dict, Any, Optional
+from typing import Awaitable, Dict, Any, Optional, List
 import logging
 import asyncio
 from config import settings
+from services.circuit_breaker import OPEN, CircuitBreaker
+from services.parse_cache import ParseCache, normalize_text
+from services.single_flight import SingleFlight
+from services.micro_batcher import MicroBatcher
+
+try:
+    import h2  # noqa: F401  (enables http2=True in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger("ml-parser-service")
 
 
 class MLParserService:
-    """Service to communicate with the ML command parser"""
-
-    def __init__(self, ml_service_url: str = None):
+    """Service to communicate with the ML command parser.
+
+    One instance is created at startup and shared by every request (see
+    main.py), so its pooled keep-alive client reuses connections to the ML
+    service instead of opening a new one per voice command. Call close()
+    when done with an instance.
+
+    A circuit breaker, fed by the outcome of every call to the ML service and by a
+    background /health prober (start_health_probe), sends commands straight
+    to the local keyword fallback while the ML service is down, instead of
+    each one waiting out the request timeout. Successful parses are kept in
+    a ParseCache, so repeated commands are answered without a remote call,
+    and concurrent parses of the same utterance share one upstream request
+    (SingleFlight). Different utterances arriving within a few milliseconds
+    of each other are sent together to /parse-batch (MicroBatcher).
+    """
+
+    def __init__(self, ml_service_url: str = None, http2: Optional[bool] = None):
         self.ml_service_url = ml_service_url or settings.ML_SERVICE_URL
         self.timeout = httpx.Timeout(settings.ML_SERVICE_TIMEOUT)
-        self.client = httpx.AsyncClient(timeout=self.timeout)
-        self._service_available = None  # Cache service availability
-        self._last_health_check = 0
-        self.health_check_interval = 60  # Check health every 60 seconds
-
-        logger.info(f"🔗 ML Parser Service initialized with URL: {self.ml_service_url}")
+        self.limits = httpx.Limits(
+            max_connections=settings.ML_SERVICE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ML_SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.ML_SERVICE_KEEPALIVE_EXPIRY
+        )
+        self.http2 = settings.ML_SERVICE_HTTP2 if http2 is None else http2
+        if self.http2 and not HTTP2_AVAILABLE:
+            logger.warning("⚠️ HTTP/2 requested for the ML service but the h2 package is not installed; using HTTP/1.1")
+            self.http2 = False
+        self.client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        self.breaker = CircuitBreaker(
+            "ml-parser",
+            failure_threshold=settings.ML_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.ML_BREAKER_RECOVERY_TIMEOUT
+        )
+        self.health_check_interval = settings.ML_HEALTH_PROBE_INTERVAL  # seconds; 0 disables the prober
+        self._probe_task: Optional[asyncio.Task] = None
+        self.cache = ParseCache(settings.ML_PARSE_CACHE_SIZE, settings.ML_PARSE_CACHE_TTL)
+        self.inflight = SingleFlight()
+        # Batching is off with ML_BATCH_MAX_SIZE <= 1; an ML service without /parse-batch turns it off too
+        self.batcher: Optional[MicroBatcher] = None
+        if settings.ML_BATCH_MAX_SIZE > 1:
+            self.batcher = MicroBatcher(self._send_parse_batch, settings.ML_BATCH_MAX_SIZE,
+                                        settings.ML_BATCH_MAX_DELAY_MS / 1000)
+        self._batch_supported = True
+
+        logger.info(f"🔗 ML Parser Service initialized with URL: {self.ml_service_url}"
+                    f" (pool: {settings.ML_SERVICE_MAX_CONNECTIONS} connections, http2: {self.http2})")
 
     async def parse_command(self, text: str) -> Dict[str, Any]:
         """Send voice command to ML parser service"""
@@ -28,25 +76,29 @@ class MLParserService:
             return await self._create_fallback_result(text, "Empty command")
 
         text = text.strip()
-        logger.info(f"📤 Sending to ML service: '{text}'")
+        cached = self.cache.get(text)
+        if cached is not None:
+            logger.debug(f"📦 Parse cache hit for '{text}'")
+            return cached
 
-        try:
-            # Check service health periodically
-            if not await self._is_service_healthy():
-                logger.warning("⚠️ ML service unhealthy, using fallback")
-                return await self._create_fallback_result(text, "Service unavailable")
+        # Callers asking for the same utterance while it is being parsed wait for that request
+        result = await self.inflight.do(normalize_text(text), lambda: self._request_parse(text))
+        return copy.deepcopy(result)
 
-            # Send parsing request
-            logger.info(f"📡 Posting to {self.ml_service_url}/parse")
+    async def _request_parse(self, text: str) -> Dict[str, Any]:
+        """Parse text with the ML service (or the fallback), bypassing the cache"""
+        logger.info(f"📤 Sending to ML service: '{text}'")
 
-            request_data = {"text": text}
-            logger.debug(f"📤 Request data: {request_data}")
+        if not self.breaker.allow_request():
+            logger.warning("⚠️ ML service circuit open, using fallback")
+            return await self._create_fallback_result(text, "Service unavailable")
 
-            response = await self.client.post(
-                f"{self.ml_service_url}/parse",
-                json=request_data,
-                headers={"Content-Type": "application/json"}
-            )
+        try:
+            # Send parsing request
+            if self.batcher is not None and self._batch_supported:
+                response = await self.batcher.submit(text)
+            else:
+                response = await self._post_parse(text)
 
             logger.info(f"📥 ML service response status: {response.status_code}")
 
@@ -59,6 +111,9 @@ class MLParserService:
                     normalized_result = self._normalize_ml_result(result)
                     logger.debug(f"🔄 Normalized result: {normalized_result}")
 
+                    self.cache.check_model_version(result.get("model_version"))
+                    self.cache.put(text, normalized_result)
+
                     return normalized_result
 
                 except json.JSONDecodeError as e:
@@ -77,48 +132,145 @@ class MLParserService:
 
         except httpx.TimeoutException:
             logger.error("⏰ ML service timeout")
-            self._service_available = False
             return await self._create_fallback_result(text, "Service timeout")
 
         except httpx.ConnectError as e:
             logger.error(f"🔌 Cannot connect to ML service: {e}")
-            self._service_available = False
             return await self._create_fallback_result(text, "Connection failed")
 
         except Exception as e:
             logger.error(f"❌ ML Parser service unexpected error: {e}", exc_info=True)
             return await self._create_fallback_result(text, f"Unexpected error: {str(e)}")
 
-    async def _is_service_healthy(self) -> bool:
-        """Check if ML service is available and healthy"""
-        import time
-        current_time = time.time()
+    async def _post_parse(self, text: str) -> httpx.Response:
+        logger.info(f"📡 Posting to {self.ml_service_url}/parse")
+
+        request_data = {"text": text}
+        logger.debug(f"📤 Request data: {request_data}")
 
-        # Use cached result if recent
-        if (self._service_available is not None and
-                current_time - self._last_health_check < self.health_check_interval):
-            return self._service_available
+        response = await self._call(self.client.post(
+            f"{self.ml_service_url}/parse",
+            json=request_data,
+            headers={"Content-Type": "application/json"}
+        ))
+        self._record_response(response)
+        return response
 
+    async def _call(self, request: Awaitable[httpx.Response]) -> httpx.Response:
+        """Await an HTTP call to the ML service, counting a transport error against the breaker"""
+        try:
+            return await request
+        except httpx.TimeoutException:
+            self.breaker.record_failure("timeout")
+            raise
+        except httpx.ConnectError:
+            self.breaker.record_failure("connection failed")
+            raise
+        except Exception as e:
+            self.breaker.record_failure(str(e))
+            raise
+
+    def _record_response(self, response: httpx.Response):
+        """Report the outcome of one HTTP call to the ML service to the breaker.
+
+        Each call reports once, however many parse requests it carried. A 4xx
+        means the service is up and rejected the request; only 5xx responses
+        and unreadable 200 responses count against it.
+        """
+        if response.status_code >= 500:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+            return
+        if response.status_code == 200:
+            try:
+                response.json()
+            except ValueError:
+                self.breaker.record_failure("invalid JSON response")
+                return
+        self.breaker.record_success()
+
+    async def _send_parse_batch(self, texts: List[str]) -> List[httpx.Response]:
+        """Parse several texts in one /parse-batch request; one /parse-style response per text.
+
+        Falls back to one /parse request per text (and stops batching) if the
+        ML service has no /parse-batch endpoint. The batch request reports one
+        outcome to the circuit breaker; the per-text responses it is split into
+        do not report again, and neither do errors of single texts in it.
+        """
+        if len(texts) == 1 or not self._batch_supported:
+            return list(await asyncio.gather(*(self._post_parse(text) for text in texts)))
+
+        logger.info(f"📡 Posting {len(texts)} texts to {self.ml_service_url}/parse-batch")
+        response = await self._call(self.client.post(f"{self.ml_service_url}/parse-batch", json={"texts": texts}))
+        if response.status_code != 200:
+            self._record_response(response)
+
+        if response.status_code in (404, 405):
+            logger.warning("⚠️ ML service has no /parse-batch endpoint; sending requests individually")
+            self._batch_supported = False
+            return list(await asyncio.gather(*(self._post_parse(text) for text in texts)))
+
+        if response.status_code != 200:
+            # The whole batch failed the same way
+            return [httpx.Response(response.status_code, content=response.content) for _ in texts]
+
+        try:
+            results = response.json().get("results", [])
+        except ValueError:
+            self.breaker.record_failure("invalid JSON response")
+            raise
+        if len(results) != len(texts):
+            self.breaker.record_failure("incomplete batch response")
+            raise ValueError(f"ML service returned {len(results)} results for {len(texts)} texts")
+        self.breaker.record_success()
+        return [httpx.Response(500 if result.get("error") else 200, json=result) for result in results]
+
+    async def check_health(self) -> bool:
+        """Probe /health once and feed the result to the circuit breaker"""
         try:
             logger.debug("🏥 Checking ML service health...")
             health_response = await self.client.get(
-                f"{self.ml_service_url}/healthz",
+                f"{self.ml_service_url}/health",
                 timeout=5.0  # Shorter timeout for health checks
             )
-
             is_healthy = health_response.status_code == 200
             logger.debug(f"🏥 Health check result: {is_healthy} (status: {health_response.status_code})")
-
-            self._service_available = is_healthy
-            self._last_health_check = current_time
-
-            return is_healthy
-
+            if is_healthy:
+                # A new model may parse the same words differently
+                self.cache.check_model_version(self._model_version(health_response))
         except Exception as e:
             logger.warning(f"🏥 Health check failed: {e}")
-            self._service_available = False
-            self._last_health_check = current_time
-            return False
+            is_healthy = False
+
+        # Probes count like calls, so one failed probe alone does not open the breaker
+        if not is_healthy:
+            self.breaker.record_failure("health check failed")
+        elif self.breaker.state == OPEN:
+            # /health passing does not prove /parse works: let a trial call decide
+            self.breaker.probe_succeeded()
+        else:
+            self.breaker.record_success()
+        return is_healthy
+
+    @staticmethod
+    def _model_version(response: httpx.Response) -> Optional[str]:
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        return body.get("model_version") if isinstance(body, dict) else None
+
+    def start_health_probe(self):
+        """Probe the ML service in the background every health_check_interval seconds"""
+        if self.health_check_interval > 0 and (self._probe_task is None or self._probe_task.done()):
+            self._probe_task = asyncio.create_task(self._health_probe_loop())
+
+    async def _health_probe_loop(self):
+        try:
+            while True:
+                await self.check_health()
+                await asyncio.sleep(self.health_check_interval)
+        except asyncio.CancelledError:
+            pass
 
     def _normalize_ml_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize ML service result to expected format"""
@@ -154,6 +306,13 @@ class MLParserService:
             elif "entities" in result:
                 normalized["parameters"] = result["entities"] if isinstance(result["entities"], dict) else {}
 
+            # Extract chained sub-commands for multi-intent utterances
+            if isinstance(result.get("commands"), list):
+                normalized["commands"] = [
+                    self._normalize_ml_result(sub_command)
+                    for sub_command in result["commands"] if isinstance(sub_command, dict)
+                ]
+
             # Extract intent
             if "intent" in result:
                 normalized["intent"] = str(result["intent"])
@@ -225,7 +384,7 @@ class MLParserService:
         """Test connection to ML service"""
         try:
             # Test health endpoint
-            health_response = await self.client.get(f"{self.ml_service_url}/healthz")
+            health_response = await self.client.get(f"{self.ml_service_url}/health")
             health_status = health_response.status_code == 200
 
             # Test parse endpoint with simple command
@@ -255,7 +414,16 @@ class MLParserService:
             }
 
     async def close(self):
-        """Close the HTTP client"""
+        """Stop the health prober, send any batched requests and close the HTTP client"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        if self.batcher is not None:
+            await self.batcher.close()
         try:
             await self.client.aclose()
             logger.info("🔌 ML Parser Service HTTP client closed")
@@ -0,0 +1,99 @@
+# services/parse_cache.py - LRU/TTL cache of ML parse results keyed on normalized utterance text
+import copy
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger("parse-cache")
+
+# Punctuation is dropped unless it sits between two digits ("22.5", "3:30")
+_PUNCTUATION = re.compile(r"(?<!\d)[^\w\s]|[^\w\s](?!\d)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Cache key for an utterance: lowercase, punctuation stripped, whitespace collapsed"""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+class ParseCache:
+    """Bounded cache of parse results for repeated voice commands.
+
+    Entries expire ttl seconds after they were stored and the least recently
+    used entry is evicted once max_entries is reached. Results are copied on
+    the way in and out, so callers may modify what they get back. The cache
+    remembers the ML model version its entries came from and empties itself
+    when a different version is reported.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.model_version: Optional[str] = None
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        key = normalize_text(text)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        stored_at, result = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self._entries[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return copy.deepcopy(result)
+
+    def put(self, text: str, result: Dict[str, Any]):
+        if not self.enabled:
+            return
+        key = normalize_text(text)
+        self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def check_model_version(self, model_version: Optional[str]):
+        """Empty the cache if the ML service reports a model version other than the cached entries'"""
+        if model_version is None or model_version == self.model_version:
+            return
+        if self.model_version is not None and self._entries:
+            logger.info(f"ML model version changed ({self.model_version} -> {model_version}); flushing parse cache")
+            self.stats["invalidations"] += 1
+            self._entries.clear()
+        self.model_version = model_version
+
+    def clear(self) -> int:
+        """Remove every entry; returns how many were removed"""
+        removed = len(self._entries)
+        self._entries.clear()
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "model_version": self.model_version,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            **self.stats
+        }
@@ -0,0 +1,92 @@
+# services/replay_buffer.py - Per-vehicle ring buffer of recent state changes for resumable sessions
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Deque, Tuple
+
+logger = logging.getLogger("replay-buffer")
+
+# (version, {subsystem: {field: value}}); changes is None for updates without
+# field-level detail, such as a full reset, which can only be replayed as a snapshot
+ReplayEntry = Tuple[int, Optional[Dict[str, Dict[str, Any]]]]
+
+
+class ReplayBuffer:
+    """Bounded history of the changes behind each state version, per vehicle.
+
+    The state version is the sequence number: every successful mutation bumps
+    it by exactly one, so a client that last saw version N can be brought up
+    to date with the changes recorded for N+1 ... current, as long as they are
+    all still in the buffer.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: Dict[str, Deque[ReplayEntry]] = {}
+        self.stats = {"replays": 0, "fallbacks": 0}
+
+    def record(self, vehicle_id: str, version: int, changes: Optional[Dict[str, Dict[str, Any]]]):
+        """Remember the changes that produced a version"""
+        if self.max_entries <= 0:
+            return
+
+        entries = self._entries.get(vehicle_id)
+        if entries is None:
+            entries = self._entries[vehicle_id] = deque(maxlen=self.max_entries)
+
+        # Update callbacks can finish out of order; keep the buffer sorted by version.
+        # A version recorded again (a state adopted from another worker) replaces the earlier entry
+        if not entries or version > entries[-1][0]:
+            entries.append((version, changes))
+            return
+
+        ordered = sorted([*(entry for entry in entries if entry[0] != version), (version, changes)],
+                         key=lambda entry: entry[0])
+        entries.clear()
+        entries.extend(ordered[-self.max_entries:])
+
+    def since(self, vehicle_id: str, last_version: int, current_version: int) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Merged changes from last_version (exclusive) to current_version (inclusive).
+
+        Returns None when the gap cannot be replayed (versions missing from the
+        buffer or a change without field-level detail); the caller then falls
+        back to a snapshot.
+        """
+        entries = self._entries.get(vehicle_id)
+        if not entries or last_version >= current_version:
+            self.stats["fallbacks"] += 1
+            return None
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        expected = last_version + 1
+        for version, changes in entries:
+            if version <= last_version:
+                continue
+            if version > current_version:
+                break
+            if version != expected or changes is None:
+                self.stats["fallbacks"] += 1
+                return None
+            for subsystem, fields in changes.items():
+                merged.setdefault(subsystem, {}).update(fields)
+            expected += 1
+
+        if expected != current_version + 1:
+            self.stats["fallbacks"] += 1
+            return None
+
+        self.stats["replays"] += 1
+        return merged
+
+    def clear(self, vehicle_id: Optional[str] = None):
+        if vehicle_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(vehicle_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_entries": self.max_entries,
+            "vehicles": len(self._entries),
+            "entries": sum(len(entries) for entries in self._entries.values()),
+            **self.stats
+        }
@@ -0,0 +1,408 @@
+# services/state_broadcaster.py - Publishes vehicle state changes to WebSocket clients
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, Iterable, Tuple, FrozenSet, List
+
+from fastapi import WebSocket
+from models.command_registry import SUBSYSTEMS
+from models.vehicle_registry import VehicleRegistry
+from services import frame_codec
+from services.broadcast_bus import BroadcastBus
+from services.replay_buffer import ReplayBuffer
+from services.state_translator import translate_backend_to_frontend_state, translate_changes_to_frontend
+from services.websocket_manager import ConnectionManager, PreparedFrame, FrameCache
+from config import settings
+
+logger = logging.getLogger("state-broadcaster")
+
+UPDATE_MODES = ("full", "delta")
+
+
+def changes_by_subsystem(result: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Normalise the changes of a command or batch result to {subsystem: {field: value}}"""
+    if "subsystem" in result:
+        return {result["subsystem"]: result.get("changes") or {}}
+    return result.get("changes") or {}
+
+
+class StateBroadcaster:
+    """Turns state manager update callbacks into WebSocket state frames.
+
+    Registered once on the vehicle registry, so every mutation path (WebSocket,
+    REST routers, voice pipeline) publishes exactly one update per state
+    version. Clients in "delta" mode receive only the changed frontend fields
+    together with base_version/version, where base_version is the version of
+    the last state frame sent to that client; a client whose held version
+    differs from base_version has missed an update and should resync with
+    get_state. Clients in "full" mode keep receiving complete state snapshots.
+
+    Every frame is serialized once; snapshots are additionally cached by
+    (vehicle_id, version) so broadcasts and get_state resyncs of the same
+    version share one frame. State frames are droppable: a slow client may lose
+    some and then resyncs, and a queued snapshot is superseded by a newer one
+    under the "coalesce" drop policy.
+
+    Fanout follows topic subscriptions: only connections subscribed to a
+    changed subsystem are touched, and one frame is built per distinct
+    (update mode, subscribed subsystems) combination.
+
+    Recent changes are kept in a per-vehicle replay buffer, so a reconnecting
+    client that reports its last seen version receives only what it missed.
+
+    State frames follow each connection's negotiated encoding: JSON text in the
+    translated frontend shape, or compact binary frames (see frame_codec).
+
+    With a tick configured, changes are not published one by one: the first
+    change of a vehicle opens a window of tick_ms, and everything that changes
+    inside it goes out as one update when it closes. Bursts (a held "volume up",
+    a dragged slider) therefore fan out at most once per tick per vehicle.
+    Command acknowledgements are sent by the handlers and are not delayed.
+
+    With a bus, every local change is also published to the other workers
+    together with the full vehicle state; changes arriving from the bus are
+    validated, adopted and fanned out to this worker's clients like local
+    ones. Once the bus is started with other workers on it, writes to a
+    vehicle hold the bus's write lock for that vehicle until they have been
+    published, so each version is produced by exactly one worker and
+    versions only move forward. Whenever a remote change does not sit directly on top of what
+    this worker's clients have seen, they get a snapshot instead of a delta.
+    """
+
+    def __init__(self, registry: VehicleRegistry, connection_manager: ConnectionManager,
+                 tick_ms: Optional[int] = None, bus: Optional[BroadcastBus] = None):
+        self.registry = registry
+        self.connection_manager = connection_manager
+        self.bus = bus
+        self.snapshot_cache = FrameCache()
+        self.replay = ReplayBuffer(settings.STATE_REPLAY_BUFFER_SIZE)
+        self.tick = (settings.STATE_BROADCAST_TICK_MS if tick_ms is None else tick_ms) / 1000.0
+        # vehicle_id -> {"changes": merged changes or None, "base_version": version before the window,
+        #                "version": latest version, "updates": count}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {"snapshots_sent": 0, "deltas_sent": 0, "updates_received": 0, "updates_published": 0,
+                      "remote_updates": 0, "remote_updates_rejected": 0}
+
+    def attach(self):
+        """Start publishing updates from every vehicle in the registry"""
+        self.registry.register_update_callback(self.on_state_change)
+        self.registry.register_removal_callback(self.forget_vehicle)
+
+    def forget_vehicle(self, vehicle_id: str):
+        """Drop per-vehicle bookkeeping for a vehicle removed from the registry"""
+        self.replay.clear(vehicle_id)
+
+    def detach(self):
+        """Stop publishing updates"""
+        self.registry.unregister_update_callback(self.on_state_change)
+
+    async def flush(self):
+        """Publish every pending coalesced update now, e.g. before shutdown"""
+        for task in list(self._flush_tasks.values()):
+            task.cancel()
+        self._flush_tasks.clear()
+        for vehicle_id in list(self._pending):
+            await self._flush_vehicle(vehicle_id)
+
+    async def start_bus(self):
+        """Start receiving changes made on other workers, and serialize writes with them"""
+        if self.bus is None:
+            return
+        await self.bus.start(self.on_bus_event)
+        # A worker alone on its bus has nobody to serialize with; leases would only slow its commands down
+        if self.bus.has_peers:
+            self.registry.set_write_lock(self.bus.write_lock, self.publish_write)
+
+    async def stop_bus(self):
+        if self.bus is not None:
+            self.registry.set_write_lock(None)
+            await self.bus.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "tick_ms": self.tick * 1000,
+            "pending_vehicles": len(self._pending),
+            "snapshot_cache": {"hits": self.snapshot_cache.hits, "misses": self.snapshot_cache.misses},
+            "replay": self.replay.get_stats(),
+            "bus": self.bus.get_stats() if self.bus is not None else None,
+            **self.stats
+        }
+
+    @staticmethod
+    def _backend_state(vehicle_state, subsystems: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        state = vehicle_state.get_all_states()
+        if subsystems is not None:
+            subsystems = set(subsystems)
+            state = {key: value for key, value in state.items() if key not in SUBSYSTEMS or key in subsystems}
+        return state
+
+    @classmethod
+    def snapshot_message(cls, vehicle_state, subsystems: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Translated state of one vehicle, as sent for get_state and resyncs.
+
+        With subsystems given, only those subsystems are included (plus version
+        and last_updated).
+        """
+        return {
+            "type": "state_update",
+            "vehicle_id": vehicle_state.vehicle_id,
+            "data": translate_backend_to_frontend_state(cls._backend_state(vehicle_state, subsystems)),
+            "timestamp": time.time()
+        }
+
+    def snapshot_frame(self, vehicle_state, subsystems: Optional[FrozenSet[str]] = None,
+                       encoding: str = "json") -> PreparedFrame:
+        """Prepared snapshot frame for the vehicle's current version"""
+        if subsystems is not None and len(subsystems) == len(SUBSYSTEMS):
+            subsystems = None
+        coalesce_key = ("state", vehicle_state.vehicle_id, subsystems)
+
+        def build() -> PreparedFrame:
+            if encoding == "json":
+                return PreparedFrame.from_message(self.snapshot_message(vehicle_state, subsystems),
+                                                  droppable=True, coalesce_key=coalesce_key)
+            data = frame_codec.encode_snapshot(encoding, vehicle_state.vehicle_id,
+                                               self._backend_state(vehicle_state, subsystems))
+            return PreparedFrame.from_bytes(data, droppable=True, coalesce_key=coalesce_key)
+
+        # A version names one state of the vehicle, even across removal (see VehicleRegistry)
+        key = (vehicle_state.vehicle_id, vehicle_state.version, subsystems, encoding)
+        return self.snapshot_cache.get_or_build(key, build)
+
+    def delta_frame(self, vehicle_id: str, base_version: int, version: int, changes: Dict[str, Dict[str, Any]],
+                    encoding: str = "json", replayed: bool = False, request_id: Any = None) -> PreparedFrame:
+        """Prepared delta frame; replayed frames are replies and therefore not droppable"""
+        if encoding != "json":
+            data = frame_codec.encode_delta(encoding, vehicle_id, base_version, version, changes, replayed, request_id)
+            return PreparedFrame.from_bytes(data, droppable=not replayed)
+
+        message = self.delta_message(vehicle_id, base_version, version, changes)
+        if replayed:
+            message["replayed"] = True
+        if request_id is not None:
+            message["request_id"] = request_id
+        return PreparedFrame.from_message(message, droppable=not replayed)
+
+    def _tagged_snapshot_frame(self, vehicle_state, encoding: str, request_id: Any) -> PreparedFrame:
+        """Snapshot reply carrying a request_id; unique per request, so it bypasses the cache"""
+        coalesce_key = ("state", vehicle_state.vehicle_id, None)
+        if encoding != "json":
+            data = frame_codec.encode_snapshot(encoding, vehicle_state.vehicle_id, vehicle_state.get_all_states(),
+                                               request_id)
+            return PreparedFrame.from_bytes(data, coalesce_key=coalesce_key)
+
+        message = self.snapshot_message(vehicle_state)
+        message["request_id"] = request_id
+        return PreparedFrame.from_message(message, coalesce_key=coalesce_key)
+
+    async def send_snapshot(self, websocket: WebSocket, vehicle_state, request_id: Any = None):
+        """Reply to get_state with a full snapshot; shares the cached frame but is never dropped"""
+        info = self.connection_manager.connection_info.get(websocket)
+        if info is None:
+            return
+
+        if request_id is not None:
+            reply = self._tagged_snapshot_frame(vehicle_state, info["encoding"], request_id)
+        else:
+            frame = self.snapshot_frame(vehicle_state, encoding=info["encoding"])
+            reply = (PreparedFrame.from_bytes(frame.data, coalesce_key=frame.coalesce_key) if frame.is_binary
+                     else PreparedFrame(frame.text, coalesce_key=frame.coalesce_key))
+        info["state_versions"][vehicle_state.vehicle_id] = vehicle_state.version
+        await self.connection_manager.send_personal_message(reply, websocket)
+
+    async def resume(self, websocket: WebSocket, vehicle_state, last_version: int, request_id: Any = None):
+        """Bring a reconnecting client from last_version up to date.
+
+        Replays the missing changes as one delta if the replay buffer still
+        covers the gap, otherwise falls back to a full snapshot.
+        """
+        vehicle_id = vehicle_state.vehicle_id
+        current_version = vehicle_state.version
+        info = self.connection_manager.connection_info.get(websocket)
+        if info is None:
+            return
+
+        if last_version == current_version:
+            info["state_versions"][vehicle_id] = current_version
+            message = {
+                "type": "state_unchanged",
+                "vehicle_id": vehicle_id,
+                "version": current_version,
+                "timestamp": time.time()
+            }
+            if request_id is not None:
+                message["request_id"] = request_id
+            await self.connection_manager.send_personal_message(json.dumps(message), websocket)
+            return
+
+        changes = self.replay.since(vehicle_id, last_version, current_version)
+        if changes is None:
+            logger.info(f"[{vehicle_id}] Cannot replay {last_version} -> {current_version}, sending snapshot")
+            await self.send_snapshot(websocket, vehicle_state, request_id)
+            return
+
+        subscribed = info["subscriptions"].get(vehicle_id, frozenset())
+        frame = self.delta_frame(vehicle_id, last_version, current_version,
+                                 {subsystem: fields for subsystem, fields in changes.items() if subsystem in subscribed},
+                                 encoding=info["encoding"], replayed=True, request_id=request_id)
+        info["state_versions"][vehicle_id] = current_version
+        await self.connection_manager.send_personal_message(frame, websocket)
+        logger.info(f"[{vehicle_id}] Replayed {current_version - last_version} updates to resuming client")
+
+    @staticmethod
+    def delta_message(vehicle_id: str, base_version: int, version: int,
+                      changes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Changed frontend fields between base_version and version"""
+        return {
+            "type": "state_delta",
+            "vehicle_id": vehicle_id,
+            "base_version": base_version,
+            "version": version,
+            "data": translate_changes_to_frontend(changes),
+            "timestamp": time.time()
+        }
+
+    async def on_state_change(self, action: str, parameters: Dict[str, Any], result: Dict[str, Any]):
+        """Update callback: broadcast the change to this worker's clients"""
+        vehicle_id = result.get("vehicle_id")
+        vehicle_state = self.registry.peek(vehicle_id)
+        if vehicle_state is None:
+            return
+
+        changes = changes_by_subsystem(result)
+        version = result.get("version", vehicle_state.version)
+        await self._accept_change(vehicle_id, version, changes)
+
+    async def publish_write(self, action: str, parameters: Dict[str, Any], result: Dict[str, Any]):
+        """Send a write to the other workers, together with the full state; runs under the write lock"""
+        vehicle_id = result.get("vehicle_id")
+        vehicle_state = self.registry.peek(vehicle_id)
+        if vehicle_state is None:
+            return
+
+        changes = changes_by_subsystem(result)
+        await self.bus.publish({
+            "vehicle_id": vehicle_id,
+            "version": result.get("version", vehicle_state.version),
+            "action": action,
+            "changes": changes or None,
+            "state": vehicle_state.get_all_states()
+        })
+
+    async def on_bus_event(self, event: Dict[str, Any]):
+        """Bus handler: adopt a change made on another worker and publish it to this worker's clients"""
+        vehicle_id = event["vehicle_id"]
+        vehicle_state = self.registry.get(vehicle_id)
+        previous_version = vehicle_state.version
+
+        try:
+            applied = await vehicle_state.apply_remote_state(event["state"])
+        except ValueError as e:
+            self.stats["remote_updates_rejected"] += 1
+            logger.warning(f"[{vehicle_id}] Rejected invalid state from worker {event.get('origin')}: {e}")
+            return
+        if not applied:
+            return
+        self.stats["remote_updates"] += 1
+
+        # The event's changes are a valid delta only if they sit directly on top of our previous state
+        version = vehicle_state.version
+        clean = event.get("version") == version == previous_version + 1
+        await self._accept_change(vehicle_id, version, (event.get("changes") or {}) if clean else {})
+
+    async def _accept_change(self, vehicle_id: str, version: int, changes: Dict[str, Dict[str, Any]]):
+        """Record a change and broadcast it, now or at the end of the tick"""
+        self.replay.record(vehicle_id, version, changes or None)
+        self.stats["updates_received"] += 1
+
+        if self.tick <= 0:
+            await self._publish(vehicle_id, version - 1, version, changes)
+            return
+
+        pending = self._pending.get(vehicle_id)
+        if pending is None:
+            self._pending[vehicle_id] = {"changes": self._copy_changes(changes), "base_version": version - 1,
+                                         "version": version, "updates": 1}
+            self._flush_tasks[vehicle_id] = asyncio.create_task(self._flush_after_tick(vehicle_id))
+            return
+
+        # Any change without field-level detail turns the whole window into a snapshot
+        if pending["changes"] is not None and changes:
+            for subsystem, fields in changes.items():
+                pending["changes"].setdefault(subsystem, {}).update(fields)
+        else:
+            pending["changes"] = None
+        pending["base_version"] = min(pending["base_version"], version - 1)
+        pending["version"] = max(pending["version"], version)
+        pending["updates"] += 1
+
+    @staticmethod
+    def _copy_changes(changes: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Dict[str, Any]]]:
+        if not changes:
+            return None
+        return {subsystem: dict(fields) for subsystem, fields in changes.items()}
+
+    async def _flush_after_tick(self, vehicle_id: str):
+        try:
+            await asyncio.sleep(self.tick)
+        except asyncio.CancelledError:
+            return
+        self._flush_tasks.pop(vehicle_id, None)
+        try:
+            await self._flush_vehicle(vehicle_id)
+        except Exception as e:
+            logger.error(f"[{vehicle_id}] Failed to publish coalesced update: {e}")
+
+    async def _flush_vehicle(self, vehicle_id: str):
+        pending = self._pending.pop(vehicle_id, None)
+        if pending is None:
+            return
+        if pending["updates"] > 1:
+            logger.debug(f"[{vehicle_id}] Coalesced {pending['updates']} updates into version {pending['version']}")
+        await self._publish(vehicle_id, pending["base_version"], pending["version"], pending["changes"] or {})
+
+    async def _publish(self, vehicle_id: str, base_version: int, version: int, changes: Dict[str, Dict[str, Any]]):
+        """Send one state update (delta or snapshot per connection) covering base_version -> version.
+
+        base_version is only the default for connections that have not been
+        sent a state frame for this vehicle yet.
+        """
+        vehicle_state = self.registry.peek(vehicle_id)
+        if vehicle_state is None:
+            return
+        self.stats["updates_published"] += 1
+
+        # Resets and other changes without field-level detail go out as snapshots of every subsystem
+        touched = frozenset(changes) if changes else frozenset(SUBSYSTEMS)
+
+        subscribers = self.connection_manager.topic_subscribers(vehicle_id, touched)
+        if not subscribers:
+            return
+
+        # One frame per distinct (kind, subsystems, base version, encoding) combination
+        groups: Dict[Tuple[str, FrozenSet[str], Optional[int], str], List[WebSocket]] = {}
+        for websocket, info in subscribers.items():
+            subscribed = info["subscriptions"][vehicle_id]
+            client_base = info["state_versions"].get(vehicle_id, base_version)
+            # A delta that arrives after a newer frame was already sent cannot be applied; send a snapshot
+            if info["update_mode"] == "delta" and changes and client_base < version:
+                key = ("delta", subscribed & touched, client_base, info["encoding"])
+                info["state_versions"][vehicle_id] = version
+            else:
+                key = ("full", subscribed, None, info["encoding"])
+                info["state_versions"][vehicle_id] = vehicle_state.version
+            groups.setdefault(key, []).append(websocket)
+
+        for (kind, subsystems, delta_base, encoding), connections in groups.items():
+            if kind == "delta":
+                delta = {subsystem: changes[subsystem] for subsystem in subsystems}
+                frame = self.delta_frame(vehicle_id, delta_base, version, delta, encoding)
+                self.stats["deltas_sent"] += 1
+            else:
+                frame = self.snapshot_frame(vehicle_state, subsystems, encoding)
+                self.stats["snapshots_sent"] += 1
+            await self.connection_manager.send_to_connections(frame, connections)
+
+        logger.debug(f"[{vehicle_id}] Published version {version}")
@@ -0,0 +1,108 @@
+# services/state_translator.py - Backend <-> frontend state shape translation
+import time
+from typing import Dict, Any, List, Tuple
+
+# Frontend locations written by each backend (subsystem, field) whose name differs
+# or is duplicated on the frontend. Fields not listed map to the same name in the
+# section named after their subsystem.
+FIELD_ALIASES: Dict[Tuple[str, str], List[Tuple[str, str]]] = {
+    ("climate", "temperature"): [("climate", "temperature"), ("climate", "temp")],  # Frontend uses 'temp'
+    ("lights", "interior_lights"): [("lights", "interior_lights"), ("lights", "on")],  # Frontend uses 'on'
+    ("seats", "driver_heating"): [("seats", "driver_heating"), ("seats", "heatOn")],  # Frontend uses 'heatOn'
+    ("infotainment", "playing"): [("infotainment", "playing"), ("media", "playing"), ("media", "on")],
+}
+
+# Infotainment fields mirrored into the frontend 'media' section
+MEDIA_FIELDS = ("volume", "source", "station", "track", "artist", "muted")
+
+
+def translate_backend_to_frontend_state(backend_state: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate backend state structure to match frontend expectations"""
+    translated = {}
+
+    # Translate climate
+    if "climate" in backend_state:
+        translated["climate"] = {
+            "temperature": backend_state["climate"].get("temperature", 22),
+            "temp": backend_state["climate"].get("temperature", 22),  # Frontend uses 'temp'
+            "ac_enabled": backend_state["climate"].get("ac_enabled", False),
+            "fan_speed": backend_state["climate"].get("fan_speed", 3),
+            "heating_enabled": backend_state["climate"].get("heating_enabled", False),
+            "auto_mode": backend_state["climate"].get("auto_mode", True),
+            "recirculation": backend_state["climate"].get("recirculation", False)
+        }
+
+    # Translate infotainment to include both formats
+    if "infotainment" in backend_state:
+        translated["infotainment"] = backend_state["infotainment"]
+        translated["media"] = {  # Frontend uses 'media'
+            "volume": backend_state["infotainment"].get("volume", 50),
+            "playing": backend_state["infotainment"].get("playing", False),
+            "on": backend_state["infotainment"].get("playing", False),  # Frontend uses 'on'
+            "source": backend_state["infotainment"].get("source", "radio"),
+            "station": backend_state["infotainment"].get("station", "FM 101.5"),
+            "track": backend_state["infotainment"].get("track"),
+            "artist": backend_state["infotainment"].get("artist"),
+            "muted": backend_state["infotainment"].get("muted", False)
+        }
+
+    # Lights structure matches
+    if "lights" in backend_state:
+        translated["lights"] = {
+            "interior_lights": backend_state["lights"].get("interior_lights", True),
+            "on": backend_state["lights"].get("interior_lights", True),  # Frontend uses 'on'
+            "ambient_lights": backend_state["lights"].get("ambient_lights", True),
+            "reading_lights": backend_state["lights"].get("reading_lights", False),
+            "brightness": backend_state["lights"].get("brightness", 80),
+            "ambient_color": backend_state["lights"].get("ambient_color", "white")
+        }
+
+    # Translate seats
+    if "seats" in backend_state:
+        translated["seats"] = {
+            "driver_heating": backend_state["seats"].get("driver_heating", False),
+            "heatOn": backend_state["seats"].get("driver_heating", False),  # Frontend uses 'heatOn'
+            "passenger_heating": backend_state["seats"].get("passenger_heating", False),
+            "driver_massage": backend_state["seats"].get("driver_massage", False),
+            "passenger_massage": backend_state["seats"].get("passenger_massage", False),
+            "driver_position": backend_state["seats"].get("driver_position", {"height": 50, "tilt": 50, "lumbar": 50}),
+            "passenger_position": backend_state["seats"].get("passenger_position",
+                                                             {"height": 50, "tilt": 50, "lumbar": 50}),
+            "position": 3  # Default position for frontend slider
+        }
+
+    translated["version"] = backend_state.get("version", 0)
+    translated["last_updated"] = backend_state.get("last_updated", time.time())
+
+    return translated
+
+
+def translate_changes_to_frontend(changes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Translate per-subsystem changed fields into the frontend fields they touch.
+
+    The result has the same shape as translate_backend_to_frontend_state but only
+    contains the sections and fields that actually changed.
+    """
+    translated: Dict[str, Dict[str, Any]] = {}
+
+    for subsystem, fields in changes.items():
+        for field, value in fields.items():
+            targets = _FRONTEND_TARGETS.get((subsystem, field)) or _frontend_targets(subsystem, field)
+            for section, name in targets:
+                translated.setdefault(section, {})[name] = value
+
+    return translated
+
+
+# Frontend locations per backend (subsystem, field), filled on first use
+_FRONTEND_TARGETS: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+
+
+def _frontend_targets(subsystem: str, field: str) -> List[Tuple[str, str]]:
+    targets = FIELD_ALIASES.get((subsystem, field))
+    if targets is None:
+        targets = [(subsystem, field)]
+        if subsystem == "infotainment" and field in MEDIA_FIELDS:
+            targets.append(("media", field))
+    _FRONTEND_TARGETS[(subsystem, field)] = targets
+    return targets
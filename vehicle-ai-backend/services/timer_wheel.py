@@ -0,0 +1,79 @@
+# services/timer_wheel.py - Hashed timer wheel for per-connection heartbeat timers
+import math
+import time
+from typing import Dict, Hashable, List, Optional
+
+
+class TimerWheel:
+    """Hashed timer wheel with a fixed number of slots of tick seconds each.
+
+    Scheduling and cancelling are O(1); advancing only looks at the slots the
+    clock has passed. Timers further out than one revolution share a slot
+    with nearer ones and are kept until their absolute tick comes up, so any
+    delay can be scheduled. Each key holds at most one timer; scheduling a key
+    again replaces its timer.
+
+    The wheel does not run anything itself: the owner calls advance()
+    periodically and handles the keys that expired.
+    """
+
+    def __init__(self, tick: float, slots: int = 64, now: Optional[float] = None):
+        if tick <= 0 or slots <= 0:
+            raise ValueError("TimerWheel needs a positive tick and slot count")
+        self.tick = tick
+        self.slots = slots
+        self._origin = time.monotonic() if now is None else now
+        self._current_tick = 0
+        # One {key: due tick} dict per slot, plus key -> slot for O(1) cancel
+        self._wheel: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+
+    def _tick_at(self, moment: float) -> int:
+        return math.floor((moment - self._origin) / self.tick)
+
+    def schedule(self, key: Hashable, delay: float, now: Optional[float] = None):
+        """Expire key after delay seconds (rounded up to the next tick)"""
+        self.cancel(key)
+        now = time.monotonic() if now is None else now
+        due = max(self._current_tick + 1, math.ceil((now + delay - self._origin) / self.tick))
+        slot = due % self.slots
+        self._wheel[slot][key] = due
+        self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return False
+        del self._wheel[slot][key]
+        return True
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """Move the clock to now and return the keys whose timers expired, oldest tick first"""
+        target = self._tick_at(time.monotonic() if now is None else now)
+        # After a long stall there is no point walking the same slots more than once
+        if target - self._current_tick > self.slots:
+            self._current_tick = target - self.slots
+
+        expired = []
+        while self._current_tick < target:
+            self._current_tick += 1
+            slot = self._wheel[self._current_tick % self.slots]
+            if not slot:
+                continue
+            due_now = [key for key, due in slot.items() if due <= self._current_tick]
+            for key in due_now:
+                del slot[key]
+                del self._slot_of[key]
+            expired.extend(due_now)
+        return expired
+
+    def clear(self):
+        for slot in self._wheel:
+            slot.clear()
+        self._slot_of.clear()
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slot_of
@@ -1,40 +1,351 @@
 import json
 import logging
 import asyncio
+import itertools
 import time
-from typing import List, Dict, Any, Optional
-from fastapi import WebSocket, WebSocketDisconnect
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Optional, Set, Union, Iterable, Hashable, Callable, Deque, Tuple
+from fastapi import WebSocket, WebSocketDisconnect, status
+from models.command_registry import SUBSYSTEMS
+from models.vehicle_registry import VehicleRegistry
+from services.timer_wheel import TimerWheel
+from config import settings
 
 logger = logging.getLogger("websocket-manager")
 
+# Prepared frames are read by programs only; whitespace is a sizeable share of a small delta frame
+_compact_json = json.JSONEncoder(separators=(",", ":"))
+
+DROP_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+CLOSE_TIMEOUT = 5.0  # seconds to wait for an evicted client's close frame
+MAX_TOPICS_PER_CONNECTION = 256
+HEARTBEAT_WHEEL_SLOTS = 64  # pings of one interval are spread over this many ticks
+GOLDEN_RATIO_FRACTION = 0.6180339887498949
+
+# A topic is one subsystem of one vehicle: ("default", "climate")
+Topic = Tuple[str, str]
+# Subscriptions of a client that follows every subsystem of a vehicle
+ALL_SUBSYSTEMS = frozenset(SUBSYSTEMS)
+
+
+def parse_topics(topics: Iterable[str], default_vehicle_id: Optional[str]) -> Set[Topic]:
+    """Parse topic strings into (vehicle_id, subsystem) pairs.
+
+    "climate" addresses the connection's own vehicle, "truck-7/climate" another
+    vehicle, and "*" or "truck-7/*" every subsystem. Raises ValueError on
+    malformed topics.
+    """
+    parsed = set()
+    for topic in topics:
+        if not isinstance(topic, str):
+            raise ValueError(f"Invalid topic: {topic!r}")
+
+        vehicle_id, _, subsystem = topic.rpartition("/")
+        vehicle_id = vehicle_id or default_vehicle_id
+        if vehicle_id is None:
+            raise ValueError(f"Topic '{topic}' needs a vehicle ID")
+        VehicleRegistry.validate_vehicle_id(vehicle_id)
+
+        if subsystem == "*":
+            parsed.update((vehicle_id, each) for each in SUBSYSTEMS)
+        elif subsystem in SUBSYSTEMS:
+            parsed.add((vehicle_id, subsystem))
+        else:
+            raise ValueError(f"Unknown topic subsystem '{subsystem}' (expected one of {', '.join(SUBSYSTEMS)} or *)")
+    return parsed
+
+
+def format_topic(topic: Topic) -> str:
+    return f"{topic[0]}/{topic[1]}"
+
+
+class PreparedFrame:
+    """A WebSocket message serialized once and shared by every recipient.
+
+    Frames are still sent as text (the frontend parses text frames), so the
+    compact JSON string is built once and the same object is handed to every
+    socket; the UTF-8 encoding is computed lazily and cached for size accounting.
+
+    Binary frames (negotiated msgpack/CBOR encodings) are created with
+    from_bytes; they have no text and are sent with send_bytes.
+
+    droppable marks state frames that a slow client may lose (it resyncs with
+    get_state); replies and errors are never dropped. Queued frames sharing a
+    coalesce_key are superseded by the newest one under the "coalesce" policy.
+    """
+
+    __slots__ = ("text", "droppable", "coalesce_key", "_data")
+
+    def __init__(self, text: Optional[str], droppable: bool = False, coalesce_key: Optional[Hashable] = None):
+        self.text = text
+        self.droppable = droppable
+        self.coalesce_key = coalesce_key
+        self._data: Optional[bytes] = None
+
+    @classmethod
+    def from_bytes(cls, data: bytes, droppable: bool = False,
+                   coalesce_key: Optional[Hashable] = None) -> "PreparedFrame":
+        frame = cls(None, droppable, coalesce_key)
+        frame._data = data
+        return frame
+
+    @property
+    def is_binary(self) -> bool:
+        return self.text is None
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any], droppable: bool = False,
+                     coalesce_key: Optional[Hashable] = None) -> "PreparedFrame":
+        return cls(_compact_json.encode(message), droppable, coalesce_key)
+
+    @property
+    def data(self) -> bytes:
+        """The frame encoded as UTF-8, computed on first use"""
+        if self._data is None:
+            self._data = self.text.encode("utf-8")
+        return self._data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+def prepare_frame(message: Union[str, Dict[str, Any], PreparedFrame]) -> PreparedFrame:
+    """Turn a message (dict, JSON string or frame) into a PreparedFrame"""
+    if isinstance(message, PreparedFrame):
+        return message
+    if isinstance(message, str):
+        return PreparedFrame(message)
+    return PreparedFrame.from_message(message)
+
+
+class FrameCache:
+    """Small LRU cache of prepared frames, keyed e.g. by (vehicle_id, version, kind).
+
+    Only safe for content that is fully determined by its key, such as the
+    state snapshot of a given version.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._frames: "OrderedDict[Hashable, PreparedFrame]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: Hashable, build: Callable[[], PreparedFrame]) -> PreparedFrame:
+        frame = self._frames.get(key)
+        if frame is not None:
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        frame = build()
+        self._frames[key] = frame
+        if len(self._frames) > self.max_entries:
+            self._frames.popitem(last=False)
+        return frame
+
+    def clear(self):
+        self._frames.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._frames), "hits": self.hits, "misses": self.misses}
+
+
+class ClientConnection:
+    """One WebSocket client with its own writer task and bounded outbound queue.
+
+    Senders only enqueue frames; the writer task drains the queue to the socket,
+    so a slow client only ever delays itself. The writer exists only while
+    frames are queued: the first enqueue starts it and it exits once the queue
+    is empty, so idle clients hold no task and disconnecting one cancels
+    nothing. When the queue is full the drop policy decides what happens:
+    "drop_oldest" discards the oldest queued state frame, "coalesce" does the
+    same but also replaces a queued frame with a newer one sharing its
+    coalesce_key, and "disconnect" evicts the client.
+    Frames that are not droppable are never discarded; if nothing droppable can
+    make room, the client is evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, info: Dict[str, Any], max_queue: int, drop_policy: str,
+                 on_failure: Callable[["ClientConnection", str, bool], None], stats: Dict[str, int]):
+        self.websocket = websocket
+        self.info = info
+        self.max_queue = max_queue
+        self.drop_policy = drop_policy
+        self.closed = False
+        self._queue: Deque[PreparedFrame] = deque()
+        self._closing = False
+        self._on_failure = on_failure
+        self._stats = stats
+        self._writer: Optional[asyncio.Task] = None
+
+        info.update({"queue_depth": 0, "max_queue_depth": 0, "frames_dropped": 0})
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, frame: PreparedFrame) -> bool:
+        """Queue a frame for sending; returns False if the client is (or just got) evicted"""
+        if self.closed or self._closing:
+            return False
+
+        if self.drop_policy == "coalesce" and frame.coalesce_key is not None:
+            self._remove_superseded(frame.coalesce_key)
+
+        if len(self._queue) >= self.max_queue:
+            if self.drop_policy == "disconnect" or not self._drop_oldest():
+                self._on_failure(self, f"send queue full ({self.max_queue} frames)", True)
+                return False
+
+        self._queue.append(frame)
+        depth = len(self._queue)
+        self.info["queue_depth"] = depth
+        if depth > self.info["max_queue_depth"]:
+            self.info["max_queue_depth"] = depth
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+        return True
+
+    def _drop_oldest(self) -> bool:
+        """Discard the oldest droppable frame; False if every queued frame must be delivered"""
+        for index, queued in enumerate(self._queue):
+            if queued.droppable:
+                del self._queue[index]
+                self._count_drop("frames_dropped")
+                return True
+        return False
+
+    def _remove_superseded(self, coalesce_key: Hashable):
+        """Remove queued frames that a newer frame with the same key replaces"""
+        superseded = [queued for queued in self._queue if queued.coalesce_key == coalesce_key]
+        for queued in superseded:
+            self._queue.remove(queued)
+            self._count_drop("frames_coalesced")
+
+    def _count_drop(self, counter: str):
+        self.info["frames_dropped"] += 1
+        self._stats[counter] += 1
+
+    async def _write_loop(self):
+        try:
+            while self._queue:
+                frame = self._queue.popleft()
+                self.info["queue_depth"] = len(self._queue)
+                if frame.is_binary:
+                    await self.websocket.send_bytes(frame.data)
+                else:
+                    await self.websocket.send_text(frame.text)
+                self.info["message_count"] += 1
+        except asyncio.CancelledError:
+            pass
+        except WebSocketDisconnect:
+            self._on_failure(self, "disconnected during send", False)
+        except Exception as e:
+            self._on_failure(self, f"send failed: {e}", False)
+        finally:
+            # Nothing can be enqueued between the empty-queue check and here, so no frame is stranded
+            if self._writer is asyncio.current_task():
+                self._writer = None
+
+    async def drain(self, timeout: float):
+        """Stop accepting frames and wait (bounded) for the queue to be flushed"""
+        self._closing = True
+        if self._writer is not None and not self._writer.done():
+            await asyncio.wait([self._writer], timeout=timeout)
+
+    def close(self):
+        """Stop the writer task and discard anything still queued"""
+        self.closed = True
+        self._queue.clear()
+        self.info["queue_depth"] = 0
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
 
 class ConnectionManager:
-    """Manages WebSocket connections for real-time communication"""
+    """Manages WebSocket connections for real-time communication.
+
+    Every registry structure is hashed (by socket, connection id, vehicle or
+    topic), so connecting, disconnecting and addressing a single client are
+    O(1) regardless of how many clients are connected.
+    """
 
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # socket -> connection id, in connection order
+        self.active_connections: Dict[WebSocket, int] = {}
+        self.connections_by_id: Dict[int, WebSocket] = {}
+        self._connection_ids = itertools.count(1)
         self.connection_info: Dict[WebSocket, Dict[str, Any]] = {}
+        self.vehicle_connections: Dict[str, Set[WebSocket]] = {}
+        self.host_connections: Dict[str, int] = {}
+        self.topic_connections: Dict[Topic, Set[WebSocket]] = {}
+        self.clients: Dict[WebSocket, ClientConnection] = {}
         self._heartbeat_task: Optional[asyncio.Task] = None
-        self.heartbeat_interval = 30000  # 30 seconds
+        self.heartbeat_interval = max(1, settings.WEBSOCKET_HEARTBEAT_INTERVAL)  # seconds
+        # Per-connection ("ping", id) and ("deadline", id) timers
+        self.heartbeat_timers = TimerWheel(self.heartbeat_interval / HEARTBEAT_WHEEL_SLOTS, HEARTBEAT_WHEEL_SLOTS)
+
+        self.send_queue_size = max(1, settings.WEBSOCKET_SEND_QUEUE_SIZE)
+        self.drop_policy = settings.WEBSOCKET_DROP_POLICY
+        if self.drop_policy not in DROP_POLICIES:
+            logger.warning(f"Unknown WebSocket drop policy '{self.drop_policy}', using 'drop_oldest'")
+            self.drop_policy = "drop_oldest"
+        self.send_stats = {"frames_dropped": 0, "frames_coalesced": 0, "evictions": 0}
+        self.idle_timeout = settings.WEBSOCKET_IDLE_TIMEOUT
+        self.heartbeat_stats = {"pings_received": 0, "pongs_received": 0, "pings_sent": 0, "idle_reaped": 0}
+
+        # Caps applied before accept(); 0 disables a cap
+        self.max_connections = max(0, settings.WEBSOCKET_MAX_CONNECTIONS)
+        self.max_connections_per_host = max(0, settings.WEBSOCKET_MAX_CONNECTIONS_PER_HOST)
+        self.max_connections_per_vehicle = max(0, settings.WEBSOCKET_MAX_CONNECTIONS_PER_VEHICLE)
+        # Slots held by sockets that were admitted but are still completing accept()
+        self._admitting: Dict[Hashable, int] = {}
+        self.admission_stats = {"admitted": 0, "rejected_global": 0, "rejected_host": 0, "rejected_vehicle": 0}
 
         logger.info("WebSocket Connection Manager initialized")
 
-    async def connect(self, websocket: WebSocket):
-        """Accept a new WebSocket connection"""
+    async def connect(self, websocket: WebSocket, vehicle_id: Optional[str] = None, update_mode: str = "full",
+                      encoding: str = "json", welcome_extra: Optional[Dict[str, Any]] = None) -> bool:
+        """Accept a new WebSocket connection, optionally bound to a vehicle.
+
+        update_mode selects how state changes reach the client: "full" snapshots
+        or "delta" frames carrying only the changed fields. encoding selects the
+        format of state frames ("json" text, or binary "msgpack"/"cbor");
+        replies and other messages are always JSON text.
+
+        Returns False if the connection was refused or could not be set up.
+        Sockets over a connection cap are closed before accept(), so a client
+        stuck in a reconnect loop costs no writer task, timers or welcome frame.
+        """
+        client_host = websocket.client.host if websocket.client else "unknown"
+        reason = self._admission_check(client_host, vehicle_id)
+        if reason is not None:
+            self.admission_stats[f"rejected_{reason}"] += 1
+            # Debug only: a client looping on reconnect would otherwise flood the log
+            logger.debug(f"Rejecting WebSocket connection from {client_host} for vehicle '{vehicle_id}':"
+                           f" {reason} connection limit reached")
+            # Closing before accept() answers the handshake with HTTP 403
+            await self._close_quietly(websocket, status.WS_1013_TRY_AGAIN_LATER)
+            return False
+
+        slots = self._admission_slots(client_host, vehicle_id)
+        self._hold_slots(slots, 1)
         try:
             await websocket.accept()
-            self.active_connections.append(websocket)
-
-            # Store connection info
-            self.connection_info[websocket] = {
-                "connected_at": time.time(),
-                "client_host": websocket.client.host if websocket.client else "unknown",
-                "last_ping": time.time(),
-                "message_count": 0
-            }
+            client = self._register(websocket, vehicle_id, update_mode, encoding)
+        except Exception as e:
+            logger.error(f"Error connecting WebSocket: {e}")
+            self.disconnect(websocket)
+            return False
+        finally:
+            self._hold_slots(slots, -1)
+        self.admission_stats["admitted"] += 1
 
-            logger.info(f"New WebSocket connection from {websocket.client.host if websocket.client else 'unknown'}")
-            logger.info(f"Total active connections: {len(self.active_connections)}")
+        try:
+            logger.debug(f"New WebSocket connection from {client_host} for vehicle '{vehicle_id}';"
+                         f" {len(self.active_connections)} active")
 
             # Start heartbeat if this is the first connection
             if len(self.active_connections) == 1:
@@ -44,33 +355,165 @@ class ConnectionManager:
             await self.send_personal_message(json.dumps({
                 "type": "connection_established",
                 "message": "Connected to Vehicle AI Backend",
+                "vehicle_id": vehicle_id,
+                "update_mode": update_mode,
+                "encoding": encoding,
+                "topics": self.subscribed_topics(websocket),
+                # Milliseconds, as clients have always received it
+                "heartbeat_interval": int(self.heartbeat_interval * 1000),
                 "timestamp": time.time(),
-                "connection_id": id(websocket)
+                "connection_id": client.info["connection_id"],
+                **(welcome_extra or {})
             }), websocket)
+            return True
 
         except Exception as e:
             logger.error(f"Error connecting WebSocket: {e}")
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
+            self.disconnect(websocket)
+            return False
+
+    @staticmethod
+    def _admission_slots(client_host: str, vehicle_id: Optional[str]) -> Tuple[Hashable, ...]:
+        return ("global", ("host", client_host), ("vehicle", vehicle_id))
+
+    def _hold_slots(self, slots: Iterable[Hashable], delta: int):
+        for slot in slots:
+            count = self._admitting.get(slot, 0) + delta
+            if count > 0:
+                self._admitting[slot] = count
+            else:
+                self._admitting.pop(slot, None)
+
+    def _admission_check(self, client_host: str, vehicle_id: Optional[str]) -> Optional[str]:
+        """Name of the cap ("global", "host" or "vehicle") a new connection would exceed, or None.
+
+        Counts include sockets still completing accept(), so a burst of
+        concurrent connects cannot overshoot a cap.
+        """
+        admitting = self._admitting
+        if self.max_connections and \
+                len(self.active_connections) + admitting.get("global", 0) >= self.max_connections:
+            return "global"
+        if self.max_connections_per_host and \
+                self.host_connections.get(client_host, 0) + admitting.get(("host", client_host), 0) \
+                >= self.max_connections_per_host:
+            return "host"
+        if self.max_connections_per_vehicle and vehicle_id is not None and \
+                len(self.vehicle_connections.get(vehicle_id, ())) + admitting.get(("vehicle", vehicle_id), 0) \
+                >= self.max_connections_per_vehicle:
+            return "vehicle"
+        return None
+
+    def _register(self, websocket: WebSocket, vehicle_id: Optional[str], update_mode: str,
+                  encoding: str = "json") -> ClientConnection:
+        """Track an accepted socket; its writer task starts with the first queued frame"""
+        connection_id = next(self._connection_ids)
+        self.active_connections[websocket] = connection_id
+        self.connections_by_id[connection_id] = websocket
+
+        client_host = websocket.client.host if websocket.client else "unknown"
+        self.host_connections[client_host] = self.host_connections.get(client_host, 0) + 1
+
+        # Store connection info
+        info = {
+            "connection_id": connection_id,
+            "connected_at": time.time(),
+            "client_host": client_host,
+            "vehicle_id": vehicle_id,
+            "update_mode": update_mode,
+            "encoding": encoding,
+            "last_ping": time.time(),
+            "message_count": 0,
+            "topics": set(),
+            "subscriptions": {},  # vehicle_id -> frozenset of subscribed subsystems
+            "state_versions": {}  # vehicle_id -> version of the last state frame queued for this client
+        }
+        self.connection_info[websocket] = info
+        if vehicle_id is not None:
+            self.vehicle_connections.setdefault(vehicle_id, set()).add(websocket)
+            # Clients see every subsystem of their own vehicle until they narrow it down
+            for subsystem in SUBSYSTEMS:
+                topic = (vehicle_id, subsystem)
+                self.topic_connections.setdefault(topic, set()).add(websocket)
+                info["topics"].add(topic)
+            info["subscriptions"] = {vehicle_id: ALL_SUBSYSTEMS}
+
+        client = ClientConnection(websocket, info, self.send_queue_size, self.drop_policy,
+                                  self._on_client_failure, self.send_stats)
+        self.clients[websocket] = client
+        self._schedule_heartbeat(connection_id)
+        return client
+
+    def _schedule_heartbeat(self, connection_id: int):
+        """Give a new connection its ping timer and liveness deadline.
+
+        The first ping lands at a golden-ratio offset into the interval, so
+        consecutive connections (including a reconnect storm) are spread evenly
+        across the interval instead of all being pinged on the same tick.
+        """
+        offset = ((connection_id * GOLDEN_RATIO_FRACTION) % 1.0) * self.heartbeat_interval
+        self.heartbeat_timers.schedule(("ping", connection_id), offset)
+        if self.idle_timeout > 0:
+            self.heartbeat_timers.schedule(("deadline", connection_id), self.idle_timeout)
+
+    def _on_client_failure(self, client: ClientConnection, reason: str, evict: bool):
+        """Drop a client whose socket failed or whose send queue overflowed"""
+        websocket = client.websocket
+        client_host = client.info.get("client_host", "unknown")
+
+        if evict:
+            self.send_stats["evictions"] += 1
+            logger.warning(f"Evicting slow WebSocket client {client_host}: {reason}")
+            asyncio.create_task(self._close_quietly(websocket, status.WS_1013_TRY_AGAIN_LATER))
+        else:
+            logger.info(f"WebSocket client {client_host} dropped: {reason}")
+
+        self.disconnect(websocket)
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket, code: int):
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=CLOSE_TIMEOUT)
+        except Exception:
+            pass
 
     def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
         try:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
-
-            if websocket in self.connection_info:
-                connection_duration = time.time() - self.connection_info[websocket]["connected_at"]
-                message_count = self.connection_info[websocket]["message_count"]
-                client_host = self.connection_info[websocket]["client_host"]
+            client = self.clients.pop(websocket, None)
+            if client is not None:
+                client.close()
+
+            connection_id = self.active_connections.pop(websocket, None)
+            if connection_id is not None:
+                self.connections_by_id.pop(connection_id, None)
+                self.heartbeat_timers.cancel(("ping", connection_id))
+                self.heartbeat_timers.cancel(("deadline", connection_id))
+
+            info = self.connection_info.get(websocket)
+            if info is not None:
+                connection_duration = time.time() - info["connected_at"]
+                vehicle_id = info.get("vehicle_id")
+
+                vehicle_sockets = self.vehicle_connections.get(vehicle_id)
+                if vehicle_sockets is not None:
+                    vehicle_sockets.discard(websocket)
+                    if not vehicle_sockets:
+                        del self.vehicle_connections[vehicle_id]
+                self._unlink_topics(websocket, info["topics"])
+
+                host_count = self.host_connections.get(info["client_host"], 0) - 1
+                if host_count > 0:
+                    self.host_connections[info["client_host"]] = host_count
+                else:
+                    self.host_connections.pop(info["client_host"], None)
 
-                logger.info(f"WebSocket disconnected from {client_host}")
-                logger.info(f"Connection duration: {connection_duration:.1f}s, Messages: {message_count}")
+                # Debug only: one line per connect and disconnect would dominate the cost of a reconnect storm
+                logger.debug(f"WebSocket disconnected from {info['client_host']} after {connection_duration:.1f}s,"
+                             f" {info['message_count']} messages; {len(self.active_connections)} remaining")
 
                 del self.connection_info[websocket]
 
-            logger.info(f"Remaining active connections: {len(self.active_connections)}")
-
             # Stop heartbeat if no connections remain
             if len(self.active_connections) == 0:
                 self._stop_heartbeat()
@@ -78,84 +521,151 @@ class ConnectionManager:
         except Exception as e:
             logger.error(f"Error disconnecting WebSocket: {e}")
 
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        """Send a message to a specific WebSocket connection"""
-        try:
-            if websocket in self.active_connections:
-                await websocket.send_text(message)
-
-                # Update message count
-                if websocket in self.connection_info:
-                    self.connection_info[websocket]["message_count"] += 1
-
-                logger.debug(f"Sent personal message to {websocket.client.host if websocket.client else 'unknown'}")
-            else:
-                logger.warning("Attempted to send message to disconnected WebSocket")
-
-        except WebSocketDisconnect:
-            logger.info("WebSocket disconnected during message send")
-            self.disconnect(websocket)
-        except Exception as e:
-            logger.error(f"Error sending personal message: {e}")
-            self.disconnect(websocket)
+    def _add_topics(self, websocket: WebSocket, topics: Set[Topic]):
+        info = self.connection_info[websocket]
+        for topic in topics - info["topics"]:
+            self.topic_connections.setdefault(topic, set()).add(websocket)
+        info["topics"] |= topics
+        self._refresh_subscriptions(info)
+
+    def _remove_topics(self, websocket: WebSocket, topics: Set[Topic]):
+        info = self.connection_info[websocket]
+        self._unlink_topics(websocket, topics & info["topics"])
+        info["topics"] -= topics
+        self._refresh_subscriptions(info)
+
+    def _unlink_topics(self, websocket: WebSocket, topics: Iterable[Topic]):
+        """Take the socket off the fanout sets of topics (which it must be subscribed to)"""
+        for topic in topics:
+            sockets = self.topic_connections.get(topic)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self.topic_connections[topic]
+
+    @staticmethod
+    def _refresh_subscriptions(info: Dict[str, Any]):
+        subscriptions: Dict[str, Set[str]] = {}
+        for vehicle_id, subsystem in info["topics"]:
+            subscriptions.setdefault(vehicle_id, set()).add(subsystem)
+        info["subscriptions"] = {vehicle_id: frozenset(subsystems) for vehicle_id, subsystems in subscriptions.items()}
+
+    def subscribed_topics(self, websocket: WebSocket) -> List[str]:
+        info = self.connection_info.get(websocket)
+        return sorted(format_topic(topic) for topic in info["topics"]) if info else []
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """Subscribe a connection to topics; returns its full topic list. Raises ValueError on bad topics."""
+        info = self.connection_info.get(websocket)
+        if info is None:
+            return []
+
+        parsed = parse_topics(topics, info.get("vehicle_id"))
+        if len(info["topics"] | parsed) > MAX_TOPICS_PER_CONNECTION:
+            raise ValueError(f"A connection may subscribe to at most {MAX_TOPICS_PER_CONNECTION} topics")
+
+        self._add_topics(websocket, parsed)
+        return self.subscribed_topics(websocket)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        """Unsubscribe a connection from topics; returns its remaining topic list"""
+        info = self.connection_info.get(websocket)
+        if info is None:
+            return []
+
+        self._remove_topics(websocket, parse_topics(topics, info.get("vehicle_id")))
+        return self.subscribed_topics(websocket)
+
+    def topic_subscribers(self, vehicle_id: str, subsystems: Iterable[str]) -> Dict[WebSocket, Dict[str, Any]]:
+        """Connections subscribed to any of the vehicle's given subsystems, with their connection info"""
+        subscribers = {}
+        for subsystem in subsystems:
+            for websocket in self.topic_connections.get((vehicle_id, subsystem), ()):
+                if websocket not in subscribers:
+                    subscribers[websocket] = self.connection_info[websocket]
+        return subscribers
+
+    def has_clients(self, vehicle_id: str) -> bool:
+        """Whether any connection is bound or subscribed to the vehicle"""
+        if vehicle_id in self.vehicle_connections:
+            return True
+        return any((vehicle_id, subsystem) in self.topic_connections for subsystem in SUBSYSTEMS)
+
+    def get_connection(self, connection_id: int) -> Optional[WebSocket]:
+        """Socket for a connection id (as sent in the welcome message), if still connected"""
+        return self.connections_by_id.get(connection_id)
+
+    async def send_personal_message(self, message: Union[str, PreparedFrame], websocket: WebSocket):
+        """Queue a message for a specific WebSocket connection; never waits on the socket"""
+        client = self.clients.get(websocket)
+        if client is None:
+            logger.warning("Attempted to send message to disconnected WebSocket")
+            return
 
-    async def broadcast(self, message: str):
-        """Broadcast a message to all connected WebSocket clients"""
-        if not self.active_connections:
+        if client.enqueue(prepare_frame(message)):
+            logger.debug(f"Queued personal message for {client.info['client_host']}")
+
+    def _broadcast_targets(self, vehicle_id: Union[None, str, Iterable[str]],
+                           update_mode: Optional[str] = None) -> List[WebSocket]:
+        """Snapshot the connections a broadcast should reach"""
+        if vehicle_id is None:
+            targets = list(self.active_connections)
+        elif isinstance(vehicle_id, str):
+            targets = list(self.vehicle_connections.get(vehicle_id, ()))
+        else:
+            targets = [connection for each_id in vehicle_id for connection in self.vehicle_connections.get(each_id, ())]
+
+        if update_mode is not None:
+            targets = [connection for connection in targets
+                       if self.connection_info.get(connection, {}).get("update_mode") == update_mode]
+        return targets
+
+    async def send_to_connections(self, message: Union[str, PreparedFrame], connections: Iterable[WebSocket]) -> int:
+        """Queue one shared frame for each of the given connections; returns how many accepted it"""
+        frame = prepare_frame(message)
+        queued = 0
+        for connection in connections:
+            client = self.clients.get(connection)
+            if client is not None and client.enqueue(frame):
+                queued += 1
+        return queued
+
+    async def broadcast(self, message: Union[str, PreparedFrame], vehicle_id: Union[None, str, Iterable[str]] = None,
+                        update_mode: Optional[str] = None):
+        """Broadcast a message to all clients, or only to clients of one or more vehicles.
+
+        The message may be a JSON string or a PreparedFrame; either way it is
+        serialized once and the same frame is queued for every recipient. This
+        never waits on a socket, so a stalled client cannot delay the others. If
+        update_mode is given, only clients that requested that state update
+        mode receive the message.
+        """
+        targets = self._broadcast_targets(vehicle_id, update_mode)
+        if not targets:
             logger.debug("No active connections for broadcast")
             return
 
-        logger.info(f"Broadcasting message to {len(self.active_connections)} connections")
-
-        # Create list of tasks for concurrent sending
-        tasks = []
-        disconnected_clients = []
+        # Only enqueue: each client's writer task delivers at its own pace
+        queued = await self.send_to_connections(message, targets)
+        logger.info(f"Broadcast queued for {queued}/{len(targets)} connections")
 
-        for connection in self.active_connections.copy():
-            try:
-                task = asyncio.create_task(connection.send_text(message))
-                tasks.append((task, connection))
-            except Exception as e:
-                logger.error(
-                    f"Error creating broadcast task for {connection.client.host if connection.client else 'unknown'}: {e}")
-                disconnected_clients.append(connection)
-
-        # Wait for all sends to complete
-        for task, connection in tasks:
-            try:
-                await task
-                # Update message count
-                if connection in self.connection_info:
-                    self.connection_info[connection]["message_count"] += 1
-            except WebSocketDisconnect:
-                logger.info(
-                    f"WebSocket disconnected during broadcast: {connection.client.host if connection.client else 'unknown'}")
-                disconnected_clients.append(connection)
-            except Exception as e:
-                logger.error(f"Error broadcasting to {connection.client.host if connection.client else 'unknown'}: {e}")
-                disconnected_clients.append(connection)
-
-        # Clean up disconnected clients
-        for connection in disconnected_clients:
-            self.disconnect(connection)
-
-        successful_sends = len(self.active_connections)
-        logger.info(f"Broadcast completed: {successful_sends} successful, {len(disconnected_clients)} failed")
-
-    async def broadcast_state_update(self, update_data: Dict[str, Any]):
-        """Broadcast a vehicle state update to all clients"""
+    async def broadcast_state_update(self, update_data: Dict[str, Any], vehicle_id: Optional[str] = None):
+        """Broadcast a vehicle state update to all clients of a vehicle"""
         message = {
             "type": "state_update",
+            "vehicle_id": vehicle_id,
             "data": update_data,
             "timestamp": time.time()
         }
 
         logger.info(
             f"Broadcasting state update: {update_data.get('system', 'unknown')} - {update_data.get('action', 'unknown')}")
-        await self.broadcast(json.dumps(message))
+        await self.broadcast(PreparedFrame.from_message(message, droppable=True, coalesce_key=("state", vehicle_id)),
+                             vehicle_id=vehicle_id)
 
-    async def broadcast_command_result(self, command: str, result: Dict[str, Any], success: bool):
-        """Broadcast command execution result to all clients"""
+    async def broadcast_command_result(self, command: str, result: Dict[str, Any], success: bool,
+                                       vehicle_id: Optional[str] = None):
+        """Broadcast command execution result to all clients of a vehicle"""
         message = {
             "type": "command_result",
             "data": {
@@ -167,10 +677,50 @@ class ConnectionManager:
         }
 
         logger.info(f"Broadcasting command result: {command} - {'Success' if success else 'Failed'}")
-        await self.broadcast(json.dumps(message))
+        await self.broadcast(PreparedFrame.from_message(message), vehicle_id=vehicle_id)
 
-    async def send_error_to_client(self, websocket: WebSocket, error_message: str, error_code: str = "GENERAL_ERROR"):
-        """Send an error message to a specific client"""
+    def touch(self, websocket: WebSocket):
+        """Record inbound traffic from a client; any message proves the connection is alive"""
+        info = self.connection_info.get(websocket)
+        if info is not None:
+            info["last_ping"] = time.time()
+
+    async def handle_heartbeat(self, message: Dict[str, Any], websocket: WebSocket):
+        """Answer a client ping with a pong to that client only; record pongs"""
+        self.touch(websocket)
+
+        if message.get("type") == "ping":
+            self.heartbeat_stats["pings_received"] += 1
+            await self.send_personal_message(json.dumps({
+                "type": "pong",
+                "ping_timestamp": message.get("timestamp"),
+                "timestamp": time.time()
+            }), websocket)
+        else:
+            self.heartbeat_stats["pongs_received"] += 1
+
+    def reap_idle_connections(self, timeout: Optional[float] = None) -> int:
+        """Close connections with no inbound traffic for longer than timeout seconds"""
+        timeout = self.idle_timeout if timeout is None else timeout
+        if timeout <= 0:
+            return 0
+
+        deadline = time.time() - timeout
+        idle = [websocket for websocket, info in self.connection_info.items() if info["last_ping"] < deadline]
+        for websocket in idle:
+            self._reap(websocket, timeout)
+        return len(idle)
+
+    def _reap(self, websocket: WebSocket, timeout: float):
+        logger.info(f"Reaping idle WebSocket {self.connection_info[websocket]['client_host']} "
+                    f"(silent for more than {timeout:.0f}s)")
+        self.heartbeat_stats["idle_reaped"] += 1
+        asyncio.create_task(self._close_quietly(websocket, status.WS_1001_GOING_AWAY))
+        self.disconnect(websocket)
+
+    async def send_error_to_client(self, websocket: WebSocket, error_message: str, error_code: str = "GENERAL_ERROR",
+                                   request_id: Any = None):
+        """Send an error message to a specific client, tagged with the request_id it answers"""
         error_data = {
             "type": "error",
             "data": {
@@ -179,6 +729,8 @@ class ConnectionManager:
                 "timestamp": time.time()
             }
         }
+        if request_id is not None:
+            error_data["request_id"] = request_id
 
         logger.warning(f"Sending error to client: {error_code} - {error_message}")
         await self.send_personal_message(json.dumps(error_data), websocket)
@@ -191,45 +743,107 @@ class ConnectionManager:
         connection_details = []
         for websocket, info in self.connection_info.items():
             connection_details.append({
+                "connection_id": info["connection_id"],
                 "client_host": info["client_host"],
+                "vehicle_id": info.get("vehicle_id"),
+                "update_mode": info.get("update_mode"),
+                "encoding": info.get("encoding"),
                 "connected_at": info["connected_at"],
                 "connection_duration": time.time() - info["connected_at"],
                 "message_count": info["message_count"],
-                "last_ping": info["last_ping"]
+                "last_ping": info["last_ping"],
+                "queue_depth": info.get("queue_depth", 0),
+                "max_queue_depth": info.get("max_queue_depth", 0),
+                "frames_dropped": info.get("frames_dropped", 0),
+                "topics": len(info.get("topics", ()))
             })
 
         return {
             "total_connections": total_connections,
             "total_messages_sent": total_messages,
+            "connections_per_vehicle": {
+                vehicle_id: len(sockets) for vehicle_id, sockets in self.vehicle_connections.items()
+            },
             "connections": connection_details,
+            "subscribers_per_topic": {
+                format_topic(topic): len(sockets) for topic, sockets in self.topic_connections.items()
+            },
+            "send_queues": {
+                "queue_size": self.send_queue_size,
+                "drop_policy": self.drop_policy,
+                "total_queued": sum(client.queue_depth for client in self.clients.values()),
+                "max_queue_depth": max((client.queue_depth for client in self.clients.values()), default=0),
+                **self.send_stats
+            },
+            "heartbeat": {
+                "interval": self.heartbeat_interval,
+                "idle_timeout": self.idle_timeout,
+                "pending_timers": len(self.heartbeat_timers),
+                **self.heartbeat_stats
+            },
+            "admission": {
+                "max_connections": self.max_connections,
+                "max_connections_per_host": self.max_connections_per_host,
+                "max_connections_per_vehicle": self.max_connections_per_vehicle,
+                "connections_per_host": dict(self.host_connections),
+                "rejected": sum(count for name, count in self.admission_stats.items() if name.startswith("rejected")),
+                **self.admission_stats
+            },
             "heartbeat_active": self._heartbeat_task is not None and not self._heartbeat_task.done()
         }
 
+    @staticmethod
+    def _ping_frame() -> PreparedFrame:
+        # Droppable and coalesced: a client that has not drained its last ping only ever holds one
+        return PreparedFrame.from_message({"type": "ping", "timestamp": time.time()},
+                                          droppable=True, coalesce_key=("ping",))
+
     async def ping_all_connections(self):
-        """Send ping to all connections to check if they're alive"""
+        """Send ping to all connections at once (the heartbeat loop pings them staggered instead)"""
         if not self.active_connections:
             return
 
-        ping_message = {
-            "type": "ping",
-            "timestamp": time.time()
-        }
-
         logger.debug(f"Pinging {len(self.active_connections)} connections")
 
-        disconnected_clients = []
-        for connection in self.active_connections.copy():
-            try:
-                await connection.send_text(json.dumps(ping_message))
-                if connection in self.connection_info:
-                    self.connection_info[connection]["last_ping"] = time.time()
-            except Exception as e:
-                logger.warning(f"Ping failed for {connection.client.host if connection.client else 'unknown'}: {e}")
-                disconnected_clients.append(connection)
+        # Failed sockets are cleaned up by their writer tasks
+        frame = self._ping_frame()
+        for client in list(self.clients.values()):
+            client.enqueue(frame)
+        self.heartbeat_stats["pings_sent"] += len(self.clients)
+
+    def run_heartbeat_timers(self, now: Optional[float] = None) -> Tuple[int, int]:
+        """Handle the heartbeat timers that are due; returns (pings queued, connections reaped).
+
+        Due pings share one prepared frame and are only enqueued, so the sweep
+        never waits on a socket; each ping timer is re-armed one interval
+        later. A due liveness deadline reaps the connection if it has been
+        silent for idle_timeout, or is pushed back to idle_timeout after its
+        last message otherwise.
+        """
+        pinged = reaped = 0
+        frame = None
+        for kind, connection_id in self.heartbeat_timers.advance(now):
+            websocket = self.connections_by_id.get(connection_id)
+            if websocket is None:
+                continue
+
+            if kind == "ping":
+                client = self.clients.get(websocket)
+                if client is not None:
+                    frame = frame or self._ping_frame()
+                    client.enqueue(frame)
+                    pinged += 1
+                self.heartbeat_timers.schedule(("ping", connection_id), self.heartbeat_interval, now)
+            else:
+                silent_for = time.time() - self.connection_info[websocket]["last_ping"]
+                if silent_for >= self.idle_timeout:
+                    self._reap(websocket, self.idle_timeout)
+                    reaped += 1
+                else:
+                    self.heartbeat_timers.schedule(("deadline", connection_id), self.idle_timeout - silent_for, now)
 
-        # Clean up failed connections
-        for connection in disconnected_clients:
-            self.disconnect(connection)
+        self.heartbeat_stats["pings_sent"] += pinged
+        return pinged, reaped
 
     async def _start_heartbeat(self):
         """Start the heartbeat task to ping connections periodically"""
@@ -244,14 +858,11 @@ class ConnectionManager:
             logger.info("Stopped WebSocket heartbeat task")
 
     async def _heartbeat_loop(self):
-        """Heartbeat loop to maintain connections"""
+        """Heartbeat loop: one wheel tick at a time, so each tick only pings a slice of the clients"""
         try:
-            while True:
-                await asyncio.sleep(30)  # Ping every 30 seconds
-                if self.active_connections:  # Only ping if there are connections
-                    await self.ping_all_connections()
-                else:
-                    break  # Exit loop if no connections
+            while self.active_connections:
+                await asyncio.sleep(self.heartbeat_timers.tick)
+                self.run_heartbeat_timers()
         except asyncio.CancelledError:
             logger.info("Heartbeat task cancelled")
         except Exception as e:
@@ -269,26 +880,29 @@ class ConnectionManager:
             except asyncio.CancelledError:
                 pass
 
-        # Close all connections
-        disconnect_tasks = []
-        for connection in self.active_connections.copy():
-            try:
-                disconnect_message = {
-                    "type": "server_shutdown",
-                    "message": "Server is shutting down",
-                    "timestamp": time.time()
-                }
-                task = asyncio.create_task(connection.send_text(json.dumps(disconnect_message)))
-                disconnect_tasks.append(task)
-            except Exception as e:
-                logger.error(f"Error sending shutdown message: {e}")
-
-        # Wait for all disconnect messages to be sent
-        if disconnect_tasks:
-            await asyncio.gather(*disconnect_tasks, return_exceptions=True)
+        # Queue the shutdown notice behind whatever each client still has pending
+        disconnect_message = PreparedFrame.from_message({
+            "type": "server_shutdown",
+            "message": "Server is shutting down",
+            "timestamp": time.time()
+        })
+        clients = list(self.clients.values())
+        for client in clients:
+            client.enqueue(disconnect_message)
+
+        # Give the writers a bounded amount of time to flush
+        if clients:
+            await asyncio.gather(*(client.drain(CLOSE_TIMEOUT) for client in clients), return_exceptions=True)
+        for client in clients:
+            client.close()
 
         # Clear all connections
+        self.clients.clear()
         self.active_connections.clear()
+        self.connections_by_id.clear()
+        self.heartbeat_timers.clear()
         self.connection_info.clear()
+        self.vehicle_connections.clear()
+        self.topic_connections.clear()
 
         logger.info("WebSocket Connection Manager shutdown complete")
\ No newline at end of file
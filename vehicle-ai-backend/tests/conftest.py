@@ -0,0 +1,36 @@
+# tests/conftest.py - Shared fixtures for the backend test suite
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from models.vehicle_registry import VehicleRegistry
+from models.vehicle_state import VehicleStateManager
+from routers import climate, commands, infotainment, lights, seats
+
+logging.disable(logging.CRITICAL)
+
+
+@pytest.fixture
+def vehicle_state():
+    return VehicleStateManager("test-vehicle")
+
+
+@pytest.fixture
+def registry():
+    return VehicleRegistry(max_vehicles=0, idle_timeout=0)
+
+
+@pytest.fixture
+def api_client(registry):
+    """The REST routers mounted like main.py does, on a fresh registry"""
+    app = FastAPI()
+    app.state.vehicle_registry = registry
+    app.include_router(climate.router, prefix="/api/climate")
+    app.include_router(infotainment.router, prefix="/api/infotainment")
+    app.include_router(lights.router, prefix="/api/lights")
+    app.include_router(seats.router, prefix="/api/seats")
+    app.include_router(commands.router, prefix="/api/commands")
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,47 @@
+# tests/fakes.py - Stand-ins for the network objects the services talk to
+import asyncio
+
+
+class FakeClient:
+    host = "10.0.0.1"
+
+
+class FakeWebSocket:
+    """Records the frames a connection manager sends to it"""
+
+    def __init__(self, host: str = "10.0.0.1"):
+        self.client = FakeClient()
+        self.client.host = host
+        self.sent = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = (code, reason)
+
+
+class StalledWebSocket(FakeWebSocket):
+    """A client that stops reading: sends block until release() is called"""
+
+    def __init__(self, host: str = "10.0.0.1"):
+        super().__init__(host)
+        self._gate = asyncio.Event()
+
+    def release(self):
+        self._gate.set()
+
+    async def send_text(self, data: str):
+        await self._gate.wait()
+        await super().send_text(data)
+
+    async def send_bytes(self, data: bytes):
+        await self._gate.wait()
+        await super().send_bytes(data)
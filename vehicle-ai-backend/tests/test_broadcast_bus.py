@@ -0,0 +1,192 @@
+# tests/test_broadcast_bus.py - Sharing state and write leases between workers
+import asyncio
+import json
+
+import pytest
+
+from models.vehicle_registry import VehicleRegistry
+from services.broadcast_bus import BroadcastBus, BusHub, InProcessBus, UnixSocketBus, create_bus, resolve_bus_kind
+from services.state_broadcaster import StateBroadcaster
+from services.websocket_manager import ConnectionManager
+from tests.fakes import FakeWebSocket
+
+
+class Worker:
+    """A registry, connection manager and broadcaster joined to a bus, like one uvicorn worker"""
+
+    def __init__(self, bus: BroadcastBus):
+        self.bus = bus
+        self.registry = VehicleRegistry(max_vehicles=0, idle_timeout=0)
+        self.connections = ConnectionManager()
+        self.broadcaster = StateBroadcaster(self.registry, self.connections, tick_ms=0, bus=bus)
+        self.broadcaster.attach()
+        self.client = FakeWebSocket()
+        self.connections._register(self.client, "car", "delta")
+
+    def frames(self):
+        return [json.loads(frame) for frame in self.client.sent]
+
+
+@pytest.fixture
+async def hub(tmp_path):
+    hub = BusHub(str(tmp_path / "bus.sock"), max_vehicles=0)
+    await hub.start()
+    yield hub
+    await hub.close()
+
+
+async def in_process_workers(count: int):
+    peers = []
+    workers = [Worker(InProcessBus(f"worker-{index}", peers)) for index in range(count)]
+    for worker in workers:
+        await worker.broadcaster.start_bus()
+    return workers
+
+
+async def unix_workers(hub, count: int, lock_timeout: float = 2.0):
+    workers = [Worker(UnixSocketBus(hub.path, f"worker-{index}", lock_timeout=lock_timeout))
+               for index in range(count)]
+    for worker in workers:
+        await worker.broadcaster.start_bus()
+        await asyncio.wait_for(worker.bus.connected.wait(), 5)
+    return workers
+
+
+async def stop(workers):
+    for worker in workers:
+        await worker.broadcaster.stop_bus()
+        await worker.connections.shutdown()
+
+
+def test_publish_is_abstract():
+    with pytest.raises(TypeError):
+        BroadcastBus()
+
+
+@pytest.mark.parametrize("kind, workers, resolved", [
+    ("auto", 1, "inprocess"),
+    ("auto", 4, "unix"),
+    ("unix", 1, "unix"),
+    ("carrier-pigeon", 4, "inprocess"),
+])
+def test_bus_kind_follows_the_setting_and_the_worker_count(monkeypatch, kind, workers, resolved):
+    monkeypatch.setattr("config.settings.WORKERS", workers)
+    assert resolve_bus_kind(kind) == resolved
+    assert create_bus(kind).kind == resolved
+
+
+async def test_in_process_changes_reach_every_worker():
+    workers = await in_process_workers(2)
+    await workers[0].registry.get("car").execute_command("lights_dim", {})
+    await workers[1].registry.get("car").execute_command("infotainment_mute", {})
+    await asyncio.sleep(0)
+
+    for worker in workers:
+        car = worker.registry.get("car")
+        assert car.version == 2
+        assert car.state.lights.brightness == 70 and car.state.infotainment.muted
+        assert [(frame["base_version"], frame["version"]) for frame in worker.frames()] == [(0, 1), (1, 2)]
+    await stop(workers)
+
+
+async def test_in_process_compare_and_set_has_one_winner_across_workers():
+    workers = await in_process_workers(3)
+    results = await asyncio.gather(*[
+        worker.registry.get("car").execute_command("lights_dim", {}, expected_version=0) for worker in workers
+    ])
+    assert [result["success"] for result in results].count(True) == 1
+    assert all(worker.registry.get("car").version == 1 for worker in workers)
+    await stop(workers)
+
+
+async def test_write_lock_is_released_before_the_update_callbacks_run():
+    workers = await in_process_workers(2)
+    release = asyncio.Event()
+
+    async def slow_callback(action, parameters, result):
+        await release.wait()
+
+    workers[0].registry.register_update_callback(slow_callback)
+    first = asyncio.create_task(workers[0].registry.get("car").execute_command("lights_dim", {}))
+    await asyncio.sleep(0)
+
+    # The other worker already has the first write and can write on top of it
+    try:
+        second = await asyncio.wait_for(workers[1].registry.get("car").execute_command("lights_dim", {}), 1)
+        assert not first.done()
+    finally:
+        release.set()
+    assert second["success"] and second["version"] == 2
+    assert (await first)["version"] == 1
+    await asyncio.sleep(0)
+    assert all(worker.registry.get("car").version == 2 for worker in workers)
+    await stop(workers)
+
+
+async def test_invalid_remote_state_is_rejected():
+    worker, = await in_process_workers(1)
+    await worker.broadcaster.on_bus_event({
+        "vehicle_id": "car", "version": 1, "origin": "elsewhere",
+        "state": {"version": 1, "climate": {"temperature": "hot"}}
+    })
+    assert worker.registry.get("car").version == 0
+    assert worker.broadcaster.stats["remote_updates_rejected"] == 1
+    assert worker.client.sent == []
+
+
+async def test_unix_bus_compare_and_set_has_one_winner(hub):
+    workers = await unix_workers(hub, 2)
+    results = await asyncio.gather(*[
+        worker.registry.get("car").execute_command("lights_dim", {}, expected_version=0) for worker in workers
+    ])
+    assert sorted(bool(result.get("conflict")) for result in results) == [False, True]
+
+    await workers[1].registry.get("car").execute_command("infotainment_mute", {})
+    await asyncio.sleep(0.05)
+    states = [worker.registry.get("car").get_all_states() for worker in workers]
+    assert states[0] == states[1] and states[0]["version"] == 2
+    await stop(workers)
+
+
+async def test_unix_bus_writes_are_never_lost(hub):
+    workers = await unix_workers(hub, 3)
+
+    async def write(worker, count):
+        for _ in range(count):
+            result = await worker.registry.get("car").execute_command("infotainment_volume_up", {})
+            assert result["success"]
+
+    await asyncio.gather(*[write(worker, 10) for worker in workers])
+    await asyncio.sleep(0.05)
+    assert [worker.registry.get("car").version for worker in workers] == [30, 30, 30]
+    # Each acknowledged version reached the clients of every worker exactly once
+    for worker in workers:
+        assert [frame["version"] for frame in worker.frames()] == list(range(1, 31))
+    await stop(workers)
+
+
+async def test_unix_bus_lock_times_out_while_another_worker_holds_it(hub):
+    workers = await unix_workers(hub, 2, lock_timeout=0.2)
+    async with workers[0].bus.write_lock("car"):
+        result = await workers[1].registry.get("car").execute_command("lights_dim", {})
+    assert not result["success"] and "write lock" in result["error"]
+    assert workers[1].bus.stats["lock_timeouts"] == 1
+
+    # The late grant is handed straight back, so the vehicle is writable again
+    result = await workers[1].registry.get("car").execute_command("lights_dim", {})
+    assert result["success"]
+    await stop(workers)
+
+
+async def test_hub_releases_the_leases_of_a_worker_that_goes_away(hub):
+    workers = await unix_workers(hub, 2)
+    holder = workers[0].bus.write_lock("car")
+    await holder.__aenter__()
+    waiting = asyncio.create_task(workers[1].registry.get("car").execute_command("lights_dim", {}))
+    await asyncio.sleep(0.05)
+    assert not waiting.done()
+
+    await workers[0].broadcaster.stop_bus()
+    assert (await asyncio.wait_for(waiting, 2))["success"]
+    await holder.__aexit__(None, None, None)
+    await stop(workers[1:])
@@ -0,0 +1,66 @@
+# tests/test_circuit_breaker.py - State transitions of the ML service circuit breaker
+import time
+
+import pytest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_consecutive_failures_open_the_breaker(clock):
+    breaker = CircuitBreaker("ml", failure_threshold=3, recovery_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.stats["rejected"] == 1 and breaker.stats["opened"] == 1
+
+
+def test_half_open_after_the_recovery_timeout(clock):
+    breaker = CircuitBreaker("ml", failure_threshold=1, recovery_timeout=30)
+    breaker.record_failure()
+    clock[0] += 29
+    assert breaker.state == OPEN
+
+    clock[0] += 1
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    # Only one trial call at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow_request()
+
+
+def test_failed_trial_call_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker("ml", failure_threshold=2, recovery_timeout=30)
+    breaker.trip("health check failed")
+    clock[0] += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    clock[0] += 29
+    assert not breaker.allow_request()
+
+
+def test_health_probe_lets_trial_calls_through_early(clock):
+    breaker = CircuitBreaker("ml", failure_threshold=1, recovery_timeout=30)
+    breaker.probe_succeeded()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    breaker.probe_succeeded()
+    assert breaker.state == HALF_OPEN and breaker.allow_request()
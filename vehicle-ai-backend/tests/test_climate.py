@@ -0,0 +1,53 @@
+# tests/test_climate.py - Climate commands and the /api/climate router
+import pytest
+
+from models.vehicle_state import VehicleStateManager
+
+# (action, parameters, success, changes or error) as the old if/elif dispatch
+# produced them, each starting from the default state
+LEGACY_RESULTS = [
+    ('climate_decrease', {}, True, {'temperature': 21.0}),
+    ('climate_decrease_temperature', {}, True, {'temperature': 21.0}),
+    ('climate_increase', {}, True, {'temperature': 23.0}),
+    ('climate_increase_temperature', {}, True, {'temperature': 23.0}),
+    ('climate_set_fan_speed', {}, True, {'fan_speed': 3}),
+    ('climate_set_fan_speed', {'speed': 5}, True, {'fan_speed': 5}),
+    ('climate_set_fan_speed', {'speed': 9}, False, 'Invalid fan speed'),
+    ('climate_set_fan_speed', {'speed': 'x'}, False, 'Invalid fan speed'),
+    ('climate_set_temperature', {}, True, {'temperature': 22.0}),
+    ('climate_set_temperature', {'temperature': 25}, True, {'temperature': 25.0}),
+    ('climate_set_temperature', {'temperature': 40}, True, {'temperature': 32.0}),
+    ('climate_set_temperature', {'temperature': 'warm'}, False, 'Invalid temperature value'),
+    ('climate_toggle_auto', {}, True, {'auto_mode': False}),
+    ('climate_toggle_recirculation', {}, True, {'recirculation': True}),
+    ('climate_turn_off_ac', {}, True, {'ac_enabled': False}),
+    ('climate_turn_on_ac', {}, True, {'ac_enabled': True}),
+    ('climate_defrost', {}, False, 'Unknown climate action: climate_defrost'),
+]
+
+
+@pytest.mark.parametrize("action, parameters, success, expected", LEGACY_RESULTS)
+async def test_dispatch_matches_legacy_chain(action, parameters, success, expected):
+    result = await VehicleStateManager().execute_command(action, dict(parameters))
+    assert result["success"] is success
+    assert (result["changes"] if success else result["error"]) == expected
+
+
+def test_set_temperature(api_client):
+    response = api_client.post("/api/climate/temperature", params={"temperature": 25})
+    assert response.status_code == 200
+    assert response.json()["result"]["version"] == 1
+    assert api_client.get("/api/climate/status").json()["temperature"] == 25.0
+
+
+def test_set_temperature_out_of_range(api_client):
+    response = api_client.post("/api/climate/temperature", params={"temperature": 35})
+    assert response.status_code == 400
+
+
+def test_stale_expected_version_is_a_conflict(api_client):
+    api_client.post("/api/climate/ac", params={"enabled": True})
+    response = api_client.post("/api/climate/ac", params={"enabled": False, "expected_version": 0})
+    assert response.status_code == 409
+    assert response.json()["detail"]["current_version"] == 1
+    assert api_client.get("/api/climate/status").json()["ac_enabled"] is True
@@ -0,0 +1,40 @@
+# tests/test_frame_codec.py - Compact binary state frames
+import cbor2
+import msgpack
+import pytest
+
+from models.vehicle_state import VehicleStateManager
+from services import frame_codec
+
+
+def test_json_is_always_available():
+    assert frame_codec.available_encodings()[0] == "json"
+
+
+@pytest.mark.parametrize("encoding, unpack", [("msgpack", msgpack.unpackb), ("cbor", cbor2.loads)])
+def test_snapshot_round_trip(encoding, unpack):
+    state = VehicleStateManager("car").get_all_states()
+    frame = unpack(frame_codec.encode_snapshot(encoding, "car", state, request_id=7))
+
+    assert (frame["t"], frame["v"], frame["n"], frame["q"]) == ("s", "car", 0, 7)
+    assert frame["d"]["c"]["t"] == 22.0
+    assert frame["d"]["s"]["dp"] == {"h": 50, "t": 50, "l": 50}
+    assert set(frame["d"]) == {"c", "l", "s", "i"}
+
+
+def test_delta_carries_only_the_changes():
+    frame = msgpack.unpackb(frame_codec.encode_delta("msgpack", "car", 3, 5, {"lights": {"brightness": 40}},
+                                                     replayed=True))
+    assert (frame["t"], frame["b"], frame["n"], frame["r"]) == ("d", 3, 5, True)
+    assert frame["d"] == {"l": {"b": 40}}
+
+
+def test_schema_expands_every_short_key():
+    schema = frame_codec.schema()
+    assert schema["types"] == {"state_update": "s", "state_delta": "d"}
+    assert schema["subsystems"]["climate"]["fields"]["temperature"] == "t"
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        frame_codec.pack("protobuf", {})
@@ -0,0 +1,61 @@
+# tests/test_infotainment.py - Infotainment commands and the /api/infotainment router
+import pytest
+
+from models.vehicle_state import VehicleStateManager
+
+# (action, parameters, success, changes or error) as the old if/elif dispatch
+# produced them, each starting from the default state
+LEGACY_RESULTS = [
+    ('infotainment_decrease', {}, True, {'volume': 45}),
+    ('infotainment_increase', {}, True, {'volume': 55}),
+    ('infotainment_mute', {}, True, {'muted': True}),
+    ('infotainment_next_track', {}, True, {'track': 'Next Track'}),
+    ('infotainment_pause', {}, True, {'playing': False}),
+    ('infotainment_play', {}, True, {'playing': True}),
+    ('infotainment_previous_track', {}, True, {'track': 'Previous Track'}),
+    ('infotainment_radio_tune', {}, True, {'station': 'FM 101.5', 'source': 'radio', 'playing': True}),
+    ('infotainment_radio_tune', {'station': 'FM 99.1'}, True,
+     {'station': 'FM 99.1', 'source': 'radio', 'playing': True}),
+    ('infotainment_set', {}, True, {'volume': 50}),
+    ('infotainment_set', {'volume': 80}, True, {'volume': 80}),
+    ('infotainment_set', {'volume': -5}, True, {'volume': 0}),
+    ('infotainment_set', {'volume': 'loud'}, False, 'Invalid volume value'),
+    ('infotainment_set_source', {}, True, {'source': 'radio'}),
+    ('infotainment_set_source', {'source': 'usb'}, True, {'source': 'usb'}),
+    ('infotainment_set_source', {'source': 'cassette'}, False, 'Invalid source'),
+    ('infotainment_set_volume', {}, True, {'volume': 50}),
+    ('infotainment_set_volume', {'volume': 80}, True, {'volume': 80}),
+    ('infotainment_set_volume', {'volume': -5}, True, {'volume': 0}),
+    ('infotainment_set_volume', {'volume': 'loud'}, False, 'Invalid volume value'),
+    ('infotainment_stop', {}, True, {'playing': False}),
+    ('infotainment_unmute', {}, True, {'muted': False}),
+    ('infotainment_volume_down', {}, True, {'volume': 45}),
+    ('infotainment_volume_up', {}, True, {'volume': 55}),
+]
+
+
+@pytest.mark.parametrize("action, parameters, success, expected", LEGACY_RESULTS)
+async def test_dispatch_matches_legacy_chain(action, parameters, success, expected):
+    result = await VehicleStateManager().execute_command(action, dict(parameters))
+    assert result["success"] is success
+    assert (result["changes"] if success else result["error"]) == expected
+
+
+@pytest.mark.parametrize("alias, playing", [("infotainment_play_music", True), ("infotainment_pause_music", False)])
+async def test_music_aliases(alias, playing):
+    # Not in the old chains; the ML parser emits these names
+    result = await VehicleStateManager().execute_command(alias, {})
+    assert result["success"] and result["changes"] == {"playing": playing}
+
+
+def test_set_volume(api_client):
+    response = api_client.post("/api/infotainment/volume", params={"volume": 70})
+    assert response.status_code == 200
+    assert api_client.get("/api/infotainment/status").json()["volume"] == 70
+
+
+def test_stale_expected_version_is_a_conflict(api_client):
+    api_client.post("/api/infotainment/volume", params={"volume": 70})
+    response = api_client.post("/api/infotainment/volume", params={"volume": 20, "expected_version": 0})
+    assert response.status_code == 409
+    assert api_client.get("/api/infotainment/status").json()["volume"] == 70
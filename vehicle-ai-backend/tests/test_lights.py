@@ -0,0 +1,45 @@
+# tests/test_lights.py - Lights commands and the /api/lights router
+import pytest
+
+from models.vehicle_state import VehicleStateManager
+
+# (action, parameters, success, changes or error) as the old if/elif dispatch
+# produced them, each starting from the default state
+LEGACY_RESULTS = [
+    ('lights_brighten', {}, True, {'brightness': 90}),
+    ('lights_dim', {}, True, {'brightness': 70}),
+    ('lights_set', {}, True, {'brightness': 80}),
+    ('lights_set', {'brightness': 30}, True, {'brightness': 30}),
+    ('lights_set', {'brightness': 150}, True, {'brightness': 100}),
+    ('lights_set', {'brightness': 'dim'}, False, 'Invalid brightness value'),
+    ('lights_set_brightness', {}, True, {'brightness': 80}),
+    ('lights_set_brightness', {'brightness': 30}, True, {'brightness': 30}),
+    ('lights_set_brightness', {'brightness': 150}, True, {'brightness': 100}),
+    ('lights_set_brightness', {'brightness': 'dim'}, False, 'Invalid brightness value'),
+    ('lights_set_color', {}, True, {'ambient_color': 'white'}),
+    ('lights_set_color', {'color': 'blue'}, True, {'ambient_color': 'blue'}),
+    ('lights_set_color', {'color': 'pink'}, False, 'Invalid color'),
+    ('lights_toggle_ambient', {}, True, {'ambient_lights': False}),
+    ('lights_toggle_interior', {}, True, {'interior_lights': False}),
+    ('lights_toggle_reading', {}, True, {'reading_lights': True}),
+    ('lights_turn_off', {}, True, {'interior_lights': False, 'ambient_lights': False, 'reading_lights': False}),
+    ('lights_turn_on', {}, True, {'interior_lights': True, 'ambient_lights': True}),
+]
+
+
+@pytest.mark.parametrize("action, parameters, success, expected", LEGACY_RESULTS)
+async def test_dispatch_matches_legacy_chain(action, parameters, success, expected):
+    result = await VehicleStateManager().execute_command(action, dict(parameters))
+    assert result["success"] is success
+    assert (result["changes"] if success else result["error"]) == expected
+
+
+def test_set_brightness(api_client):
+    response = api_client.post("/api/lights/brightness", params={"brightness": 40, "expected_version": 0})
+    assert response.status_code == 200
+    assert api_client.get("/api/lights/status").json()["brightness"] == 40
+
+
+def test_invalid_color(api_client):
+    response = api_client.post("/api/lights/color", params={"color": "pink"})
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+# tests/test_micro_batcher.py - Gathering concurrent submissions into batches
+import asyncio
+
+import pytest
+
+from services.micro_batcher import MicroBatcher
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        return [item.upper() for item in items]
+
+
+async def test_items_within_the_delay_go_in_one_batch():
+    send = Recorder()
+    batcher = MicroBatcher(send, max_size=16, max_delay=0.01)
+    results = await asyncio.gather(*[batcher.submit(text) for text in ("a", "b", "c")])
+
+    assert results == ["A", "B", "C"]
+    assert send.batches == [["a", "b", "c"]]
+    assert batcher.stats == {"items": 3, "batches": 1, "largest_batch": 3}
+
+
+async def test_full_batch_is_sent_without_waiting():
+    send = Recorder()
+    batcher = MicroBatcher(send, max_size=2, max_delay=10)
+    results = await asyncio.wait_for(asyncio.gather(*[batcher.submit(text) for text in "abcd"]), 1)
+
+    assert results == ["A", "B", "C", "D"]
+    assert send.batches == [["a", "b"], ["c", "d"]]
+
+
+async def test_failed_batch_fails_every_submitter():
+    async def send(items):
+        raise ConnectionError("down")
+
+    batcher = MicroBatcher(send, max_size=16, max_delay=0.001)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+async def test_wrong_number_of_results_is_an_error():
+    async def send(items):
+        return items[:1]
+
+    batcher = MicroBatcher(send, max_size=2, max_delay=0.001)
+    with pytest.raises(ValueError):
+        await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+
+async def test_close_sends_what_is_waiting():
+    send = Recorder()
+    batcher = MicroBatcher(send, max_size=16, max_delay=10)
+    waiting = asyncio.create_task(batcher.submit("a"))
+    await asyncio.sleep(0)
+
+    await batcher.close()
+    assert await waiting == "A"
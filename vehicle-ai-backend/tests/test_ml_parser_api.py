@@ -0,0 +1,86 @@
+# tests/test_ml_parser_api.py - /parse-batch and the inference queue of ml-parser/api_server.py
+import importlib.util
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+API_SERVER = os.path.join(os.path.dirname(os.path.dirname(__file__)), "ml-parser", "api_server.py")
+
+
+class FakeParser:
+    """Stand-in for EnsembleCommandParser; texts containing "fail" raise"""
+
+    def parse_command(self, text: str) -> dict:
+        if "fail" in text:
+            raise RuntimeError("cannot parse")
+        return {"intent": "lights", "action": "lights_dim", "confidence": 0.9, "parameters": {}}
+
+
+@pytest.fixture
+def api_server(monkeypatch):
+    spec = importlib.util.spec_from_file_location("ml_parser_api_server", API_SERVER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "parser", FakeParser())
+    monkeypatch.setattr(module, "PARSER_AVAILABLE", True)
+    monkeypatch.setattr(module, "MAX_BATCH_SIZE", 3)
+    monkeypatch.setattr(module, "INFERENCE_QUEUE_SIZE", 2)
+    return module
+
+
+@pytest.fixture
+def client(api_server):
+    with TestClient(api_server.app) as client:
+        yield client
+
+
+def test_batch_results_come_back_in_order(client):
+    response = client.post("/parse-batch", json={"texts": ["dim the lights", "fail", "dim"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 3
+    assert [result["action"] for result in body["results"]] == ["lights_dim", "unknown", "lights_dim"]
+    assert body["results"][1]["error"] == "Parsing failed: cannot parse"
+
+
+def test_oversized_batch_is_rejected_with_413(client, api_server):
+    response = client.post("/parse-batch", json={"texts": ["dim"] * 4})
+    assert response.status_code == 413
+    assert api_server.inference_stats["pending"] == 0
+
+
+def test_full_inference_queue_is_rejected_with_503(client, api_server):
+    api_server.inference_stats["pending"] = api_server.INFERENCE_QUEUE_SIZE
+    response = client.post("/parse-batch", json={"texts": ["dim"]})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(api_server.INFERENCE_RETRY_AFTER)
+    assert api_server.inference_stats["rejected"] == 1
+
+
+def test_missing_parser_is_reported_with_503(client, api_server):
+    api_server.parser = None
+    assert client.post("/parse-batch", json={"texts": ["dim"]}).status_code == 503
+    assert client.post("/parse", json={"text": "dim"}).status_code == 503
+
+
+def test_chained_utterances_return_their_sub_commands(client, api_server):
+    class ChainParser(FakeParser):
+        def parse_command(self, text: str) -> dict:
+            return {**super().parse_command(text),
+                    "commands": [{"intent": "lights", "action": "lights_dim", "confidence": 0.9},
+                                 {"intent": "infotainment", "action": "infotainment_mute", "confidence": 0.8}]}
+
+    api_server.parser = ChainParser()
+    body = client.post("/parse", json={"text": "dim the lights and mute"}).json()
+    assert [command["action"] for command in body["commands"]] == ["lights_dim", "infotainment_mute"]
+    assert body["commands"][1]["parameters"] == {}
+
+
+def test_finished_jobs_free_their_queue_slot(client, api_server):
+    for _ in range(api_server.INFERENCE_QUEUE_SIZE + 1):
+        assert client.post("/parse", json={"text": "dim the lights"}).status_code == 200
+    assert client.post("/parse", json={"text": "fail"}).status_code == 500
+
+    stats = api_server.inference_stats
+    assert (stats["pending"], stats["completed"], stats["failed"]) == (0, 3, 1)
@@ -0,0 +1,170 @@
+# tests/test_ml_parser_service.py - Pooling, breaker, cache, single-flight and batching around the ML service calls
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from routers.dependencies import get_ml_service
+from services.circuit_breaker import CLOSED, OPEN
+from services.ml_parser_service import MLParserService
+
+
+class FakeMLService:
+    """httpx transport answering /parse, /parse-batch and /health like ml-parser/api_server.py"""
+
+    def __init__(self, status_code: int = 200, batch: bool = True, healthy: bool = True):
+        self.status_code = status_code
+        self.healthy = healthy
+        self.batch = batch
+        self.requests = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    @staticmethod
+    def result(text: str):
+        return {"action": "lights_dim" if "dim" in text.lower() else "unknown", "intent": "lights", "confidence": 0.9,
+                "parameters": {}, "original_text": text, "model_version": "1"}
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await self.release.wait()
+        path = request.url.path
+        body = json.loads(request.content) if request.content else None
+        self.requests.append((path, body))
+        if path == "/health":
+            if not self.healthy:
+                return httpx.Response(503, json={"status": "unavailable"})
+            return httpx.Response(200, json={"status": "healthy", "model_version": "1"})
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, json={"detail": "down"})
+        if path == "/parse":
+            return httpx.Response(200, json=self.result(body["text"]))
+        if path == "/parse-batch" and self.batch:
+            return httpx.Response(200, json={"results": [self.result(text) for text in body["texts"]]})
+        return httpx.Response(404)
+
+    def paths(self):
+        return [path for path, _ in self.requests]
+
+
+@pytest.fixture
+async def service():
+    services = []
+
+    def create(ml: FakeMLService) -> MLParserService:
+        service = MLParserService("http://ml")
+        service.client = httpx.AsyncClient(transport=httpx.MockTransport(ml.handle))
+        services.append(service)
+        return service
+
+    yield create
+    for service in services:
+        await service.close()
+
+
+async def test_commands_share_one_client(service):
+    ml = FakeMLService()
+    parser = service(ml)
+    client = parser.client
+    for text in ("dim the lights", "play jazz"):
+        await parser.parse_command(text)
+
+    assert parser.client is client
+    assert ml.paths() == ["/parse", "/parse"]
+
+
+async def test_repeated_commands_are_answered_from_the_cache(service):
+    ml = FakeMLService()
+    parser = service(ml)
+    first = await parser.parse_command("Dim the lights")
+    again = await parser.parse_command("dim the lights!")
+
+    assert first["action"] == again["action"] == "lights_dim"
+    assert ml.paths() == ["/parse"]
+    assert parser.cache.stats["hits"] == 1
+
+
+async def test_concurrent_identical_commands_share_one_request(service):
+    ml = FakeMLService()
+    parser = service(ml)
+    ml.release.clear()
+    parsing = asyncio.gather(*[parser.parse_command("dim the lights") for _ in range(5)])
+    await asyncio.sleep(0.01)
+    ml.release.set()
+
+    assert [result["action"] for result in await parsing] == ["lights_dim"] * 5
+    assert len(ml.requests) == 1
+    assert parser.inflight.stats["collapsed"] == 4
+
+
+async def test_different_commands_are_sent_in_one_batch(service):
+    ml = FakeMLService()
+    parser = service(ml)
+    results = await asyncio.gather(parser.parse_command("dim the lights"), parser.parse_command("play jazz"))
+
+    assert [result["action"] for result in results] == ["lights_dim", "unknown"]
+    assert ml.requests == [("/parse-batch", {"texts": ["dim the lights", "play jazz"]})]
+    assert parser.breaker.stats["successes"] == 1
+
+
+async def test_service_without_batch_endpoint_gets_single_requests(service):
+    ml = FakeMLService(batch=False)
+    parser = service(ml)
+    results = await asyncio.gather(parser.parse_command("dim the lights"), parser.parse_command("play jazz"))
+
+    assert [result["action"] for result in results] == ["lights_dim", "unknown"]
+    assert sorted(ml.paths()) == ["/parse", "/parse", "/parse-batch"]
+    assert parser.batcher is not None and not parser._batch_supported
+
+
+async def test_requests_get_the_app_wide_service():
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+    ml_service = get_ml_service(request)
+    assert get_ml_service(request) is ml_service
+    await ml_service.close()
+    assert ml_service.client.is_closed
+
+
+async def test_open_breaker_skips_the_network(service):
+    ml = FakeMLService(status_code=503)
+    parser = service(ml)
+    parser.breaker.failure_threshold = 2
+    for text in ("dim the lights", "more light"):
+        result = await parser.parse_command(text)
+        assert result["source"] == "fallback" and result["fallback_reason"] == "HTTP 503"
+    assert parser.breaker.state == OPEN
+
+    result = await parser.parse_command("brighter lights")
+    assert result["fallback_reason"] == "Service unavailable" and result["action"] == "lights_unknown"
+    assert len(ml.requests) == 2
+
+
+async def test_health_probe_closes_the_breaker(service):
+    ml = FakeMLService()
+    parser = service(ml)
+    parser.breaker.trip("test")
+    assert await parser.check_health()
+    assert parser.breaker.allow_request()
+    assert parser.cache.model_version == "1"
+
+
+async def test_failed_health_probes_count_toward_the_threshold(service):
+    parser = service(FakeMLService(healthy=False))
+    parser.breaker.failure_threshold = 2
+    assert not await parser.check_health()
+    assert parser.breaker.state == CLOSED
+
+    assert not await parser.check_health()
+    assert parser.breaker.state == OPEN
+
+
+async def test_healthy_probe_resets_the_failure_count(service):
+    parser = service(FakeMLService())
+    parser.breaker.failure_threshold = 2
+    parser.breaker.record_failure()
+    assert await parser.check_health()
+
+    parser.breaker.record_failure()
+    assert parser.breaker.state == CLOSED
+    assert parser.breaker.get_stats()["consecutive_failures"] == 1
@@ -0,0 +1,71 @@
+# tests/test_parse_cache.py - TTL, LRU eviction and model-version invalidation of the parse cache
+import time
+
+import pytest
+
+from services.parse_cache import ParseCache, normalize_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.mark.parametrize("text, key", [
+    ("  Turn ON the   lights! ", "turn on the lights"),
+    ("Set temperature to 22.5, please.", "set temperature to 22.5 please"),
+    ("Wake me at 3:30", "wake me at 3:30"),
+])
+def test_normalize_text(text, key):
+    assert normalize_text(text) == key
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ParseCache(max_entries=4, ttl=60)
+    cache.put("turn on the lights", {"action": "lights_on"})
+    clock[0] += 59
+    assert cache.get("Turn on the lights.") == {"action": "lights_on"}
+
+    clock[0] += 1
+    assert cache.get("turn on the lights") is None
+    assert cache.stats["expired"] == 1 and len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ParseCache(max_entries=2, ttl=60)
+    cache.put("a", {"action": "a"})
+    cache.put("b", {"action": "b"})
+    cache.get("a")
+    cache.put("c", {"action": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats["evictions"] == 1
+
+
+def test_results_are_copied():
+    cache = ParseCache()
+    result = {"action": "climate_set_temperature", "parameters": {"temperature": 22}}
+    cache.put("set it to 22", result)
+    result["parameters"]["temperature"] = 30
+    cache.get("set it to 22")["parameters"]["temperature"] = 18
+    assert cache.get("set it to 22")["parameters"] == {"temperature": 22}
+
+
+def test_new_model_version_empties_the_cache():
+    cache = ParseCache()
+    cache.check_model_version("1")
+    cache.put("dim the lights", {"action": "lights_dim"})
+    cache.check_model_version("1")
+    assert len(cache) == 1
+
+    cache.check_model_version("2")
+    assert len(cache) == 0 and cache.stats["invalidations"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ParseCache(max_entries=0)
+    cache.put("dim the lights", {"action": "lights_dim"})
+    assert cache.get("dim the lights") is None and len(cache) == 0
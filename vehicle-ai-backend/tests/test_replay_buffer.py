@@ -0,0 +1,35 @@
+# tests/test_replay_buffer.py - Per-vehicle history of changes for resumable sessions
+from services.replay_buffer import ReplayBuffer
+
+
+def test_changes_since_a_version_are_merged():
+    replay = ReplayBuffer(8)
+    replay.record("car", 1, {"lights": {"brightness": 70}})
+    replay.record("car", 2, {"infotainment": {"muted": True}})
+    replay.record("car", 3, {"lights": {"brightness": 60}})
+
+    assert replay.since("car", 1, 3) == {"infotainment": {"muted": True}, "lights": {"brightness": 60}}
+    assert replay.since("car", 3, 3) is None
+    assert replay.since("truck", 0, 1) is None
+
+
+def test_out_of_order_records_are_kept_in_version_order():
+    replay = ReplayBuffer(3)
+    replay.record("car", 2, {"lights": {"brightness": 70}})
+    replay.record("car", 1, {"lights": {"brightness": 90}})
+    replay.record("car", 3, None)
+
+    assert replay.since("car", 0, 2) == {"lights": {"brightness": 70}}
+    # A version without field-level detail can only be sent as a snapshot
+    assert replay.since("car", 0, 3) is None
+    assert replay.get_stats()["entries"] == 3
+
+
+def test_gaps_beyond_the_buffer_cannot_be_replayed():
+    replay = ReplayBuffer(2)
+    for version in range(1, 5):
+        replay.record("car", version, {"infotainment": {"volume": 50 + version}})
+
+    assert replay.since("car", 2, 4) == {"infotainment": {"volume": 54}}
+    assert replay.since("car", 1, 4) is None
+    assert replay.stats == {"replays": 1, "fallbacks": 1}
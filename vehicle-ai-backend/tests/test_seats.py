@@ -0,0 +1,54 @@
+# tests/test_seats.py - Seats commands and the /api/seats router
+import pytest
+
+from models.vehicle_state import VehicleStateManager
+
+# (action, parameters, success, changes or error) as the old if/elif dispatch
+# produced them, each starting from the default state
+LEGACY_RESULTS = [
+    ('seats_adjust', {}, True, {'driver_position': {'height': 50, 'tilt': 50, 'lumbar': 50}}),
+    ('seats_adjust', {'seat': 'passenger'}, True, {'passenger_position': {'height': 50, 'tilt': 50, 'lumbar': 50}}),
+    ('seats_adjust', {'seat': 'rear'}, True, {'passenger_position': {'height': 50, 'tilt': 50, 'lumbar': 50}}),
+    ('seats_adjust', {'position': {'height': 70, 'tilt': 120}}, True,
+     {'driver_position': {'height': 70, 'tilt': 100, 'lumbar': 50}}),
+    ('seats_adjust', {'position': 'up'}, False, 'Invalid position format'),
+    ('seats_adjust_position', {}, True, {'driver_position': {'height': 50, 'tilt': 50, 'lumbar': 50}}),
+    ('seats_adjust_position', {'seat': 'passenger'}, True,
+     {'passenger_position': {'height': 50, 'tilt': 50, 'lumbar': 50}}),
+    ('seats_adjust_position', {'seat': 'rear'}, True,
+     {'passenger_position': {'height': 50, 'tilt': 50, 'lumbar': 50}}),
+    ('seats_adjust_position', {'position': {'height': 70, 'tilt': 120}}, True,
+     {'driver_position': {'height': 70, 'tilt': 100, 'lumbar': 50}}),
+    ('seats_adjust_position', {'position': 'up'}, False, 'Invalid position format'),
+    ('seats_heat_off', {}, True, {'driver_heating': False}),
+    ('seats_heat_off', {'seat': 'passenger'}, True, {'passenger_heating': False}),
+    ('seats_heat_off', {'seat': 'rear'}, True, {'passenger_heating': False}),
+    ('seats_heat_on', {}, True, {'driver_heating': True}),
+    ('seats_heat_on', {'seat': 'passenger'}, True, {'passenger_heating': True}),
+    ('seats_heat_on', {'seat': 'rear'}, True, {'passenger_heating': True}),
+    ('seats_massage_off', {}, True, {'driver_massage': False}),
+    ('seats_massage_off', {'seat': 'passenger'}, True, {'passenger_massage': False}),
+    ('seats_massage_off', {'seat': 'rear'}, True, {'passenger_massage': False}),
+    ('seats_massage_on', {}, True, {'driver_massage': True}),
+    ('seats_massage_on', {'seat': 'passenger'}, True, {'passenger_massage': True}),
+    ('seats_massage_on', {'seat': 'rear'}, True, {'passenger_massage': True}),
+]
+
+
+@pytest.mark.parametrize("action, parameters, success, expected", LEGACY_RESULTS)
+async def test_dispatch_matches_legacy_chain(action, parameters, success, expected):
+    result = await VehicleStateManager().execute_command(action, dict(parameters))
+    assert result["success"] is success
+    assert (result["changes"] if success else result["error"]) == expected
+
+
+def test_passenger_heating(api_client):
+    response = api_client.post("/api/seats/heating", params={"seat": "passenger", "enabled": True})
+    assert response.status_code == 200
+    status = api_client.get("/api/seats/status").json()
+    assert status["passenger_heating"] is True and status["driver_heating"] is False
+
+
+def test_invalid_seat(api_client):
+    response = api_client.post("/api/seats/heating", params={"seat": "rear", "enabled": True})
+    assert response.status_code == 400
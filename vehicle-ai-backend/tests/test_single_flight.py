@@ -0,0 +1,67 @@
+# tests/test_single_flight.py - Sharing one in-flight call between concurrent callers
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+async def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await release.wait()
+        return {"action": "lights_dim"}
+
+    waiting = [asyncio.create_task(flight.do("dim", call)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiting) == [{"action": "lights_dim"}] * 5
+    assert len(calls) == 1
+    assert flight.stats == {"calls": 5, "executed": 1, "collapsed": 4}
+    assert flight.inflight == 0
+
+
+async def test_every_caller_gets_the_exception():
+    flight = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0)
+        raise ConnectionError("down")
+
+    results = await asyncio.gather(flight.do("k", call), flight.do("k", call), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+async def test_cancelled_caller_does_not_cancel_the_call_for_others():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def call():
+        await release.wait()
+        return 42
+
+    first = asyncio.create_task(flight.do("k", call))
+    second = asyncio.create_task(flight.do("k", call))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == 42
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_next_caller_starts_a_new_call():
+    flight = SingleFlight()
+    counter = iter(range(10))
+
+    async def call():
+        return next(counter)
+
+    assert await flight.do("k", call) == 0
+    assert await flight.do("k", call) == 1
@@ -0,0 +1,257 @@
+# tests/test_state_broadcaster.py - State frames published by StateBroadcaster
+import asyncio
+import json
+
+import msgpack
+import pytest
+
+from services.broadcast_bus import create_bus
+from services.replay_buffer import ReplayBuffer
+from services.state_broadcaster import StateBroadcaster
+from services.websocket_manager import ConnectionManager
+from tests.fakes import FakeWebSocket
+
+STATE_FRAMES = ("state_update", "state_delta", "state_unchanged")
+
+
+@pytest.fixture
+async def broadcaster(registry):
+    broadcaster = StateBroadcaster(registry, ConnectionManager(), tick_ms=0)
+    broadcaster.attach()
+    yield broadcaster
+    broadcaster.detach()
+    await broadcaster.connection_manager.shutdown()
+
+
+async def connect(broadcaster, update_mode: str = "delta", encoding: str = "json") -> FakeWebSocket:
+    websocket = FakeWebSocket()
+    await broadcaster.connection_manager.connect(websocket, "car", update_mode, encoding)
+    return websocket
+
+
+def frames(websocket):
+    """State frames sent to a JSON client, without the welcome message"""
+    return [frame for frame in map(json.loads, websocket.sent) if frame["type"] in STATE_FRAMES]
+
+
+def binary_frames(websocket):
+    return [msgpack.unpackb(frame) for frame in websocket.sent if isinstance(frame, bytes)]
+
+
+async def test_deltas_chain_on_base_version(broadcaster, registry):
+    websocket = await connect(broadcaster)
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+    await car.execute_command("climate_decrease_temperature", {})
+    await asyncio.sleep(0)
+
+    first, second = frames(websocket)
+    assert (first["type"], first["base_version"], first["version"]) == ("state_delta", 0, 1)
+    assert first["data"] == {"lights": {"brightness": 70}}
+    assert (second["base_version"], second["version"]) == (1, 2)
+    assert second["data"]["climate"]["temperature"] == 21.0
+
+
+async def test_json_state_frames_are_compact(broadcaster, registry):
+    websocket = await connect(broadcaster)
+    await registry.get("car").execute_command("lights_dim", {})
+    await asyncio.sleep(0)
+
+    delta = websocket.sent[-1]
+    assert json.loads(delta)["type"] == "state_delta"
+    assert delta == json.dumps(json.loads(delta), separators=(",", ":"))
+
+
+async def test_full_mode_clients_get_snapshots(broadcaster, registry):
+    websocket = await connect(broadcaster, "full")
+    await registry.get("car").execute_command("lights_dim", {})
+    await asyncio.sleep(0)
+
+    frame, = frames(websocket)
+    assert frame["type"] == "state_update" and frame["data"]["version"] == 1
+    assert set(frame["data"]) >= {"climate", "lights", "seats", "infotainment"}
+
+
+async def test_reset_is_sent_as_a_snapshot(broadcaster, registry):
+    websocket = await connect(broadcaster)
+    await registry.get("car").reset_all_states()
+    await asyncio.sleep(0)
+    assert [frame["type"] for frame in frames(websocket)] == ["state_update"]
+
+
+async def test_updates_within_a_tick_are_coalesced(registry):
+    broadcaster = StateBroadcaster(registry, ConnectionManager(), tick_ms=20)
+    broadcaster.attach()
+    websocket = await connect(broadcaster)
+    car = registry.get("car")
+    for _ in range(3):
+        await car.execute_command("infotainment_volume_up", {})
+    await car.execute_command("lights_dim", {})
+    await asyncio.sleep(0)
+    assert frames(websocket) == []
+
+    await asyncio.sleep(0.05)
+    frame, = frames(websocket)
+    assert (frame["base_version"], frame["version"]) == (0, 4)
+    assert frame["data"]["infotainment"] == {"volume": 65}
+    assert frame["data"]["lights"] == {"brightness": 70}
+    broadcaster.detach()
+    await broadcaster.connection_manager.shutdown()
+
+
+async def test_reset_within_a_tick_turns_the_window_into_a_snapshot(registry):
+    broadcaster = StateBroadcaster(registry, ConnectionManager(), tick_ms=20)
+    broadcaster.attach()
+    websocket = await connect(broadcaster)
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+    await car.reset_all_states()
+    await asyncio.sleep(0.05)
+
+    frame, = frames(websocket)
+    assert frame["type"] == "state_update" and frame["data"]["version"] == 2
+    broadcaster.detach()
+    await broadcaster.connection_manager.shutdown()
+
+
+async def test_other_vehicles_clients_get_nothing(broadcaster, registry):
+    websocket = await connect(broadcaster)
+    await registry.get("truck").execute_command("lights_dim", {})
+    await asyncio.sleep(0)
+    assert frames(websocket) == []
+
+
+async def test_snapshot_frames_are_shared_per_version(broadcaster, registry):
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+    assert broadcaster.snapshot_frame(car) is broadcaster.snapshot_frame(car)
+
+    await car.execute_command("lights_dim", {})
+    assert json.loads(broadcaster.snapshot_frame(car).text)["data"]["version"] == 2
+
+
+async def test_recreated_vehicle_gets_a_new_snapshot_frame(broadcaster, registry):
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+    before = broadcaster.snapshot_frame(car)
+    registry.remove("car")
+
+    after = broadcaster.snapshot_frame(registry.get("car"))
+    assert after is not before
+    assert json.loads(after.text)["data"]["version"] == 2
+
+
+async def test_topic_fanout_sends_only_subscribed_subsystems(broadcaster, registry):
+    lights_only, everything, climate_only = [await connect(broadcaster) for _ in range(3)]
+    connections = broadcaster.connection_manager
+    connections.unsubscribe(lights_only, ["*"])
+    connections.subscribe(lights_only, ["lights"])
+    connections.unsubscribe(climate_only, ["*"])
+    connections.subscribe(climate_only, ["climate"])
+
+    await registry.get("car").execute_batch([{"action": "lights_dim"}, {"action": "infotainment_mute"}])
+    await asyncio.sleep(0)
+
+    assert [frame["data"] for frame in frames(lights_only)] == [{"lights": {"brightness": 70}}]
+    assert set(frames(everything)[0]["data"]) == {"lights", "infotainment", "media"}
+    assert frames(climate_only) == []
+
+
+async def test_base_version_follows_the_last_frame_a_client_was_sent(broadcaster, registry):
+    websocket = await connect(broadcaster)
+    broadcaster.connection_manager.unsubscribe(websocket, ["*"])
+    broadcaster.connection_manager.subscribe(websocket, ["lights"])
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+    await car.execute_command("infotainment_mute", {})
+    await car.execute_command("lights_dim", {})
+    await asyncio.sleep(0)
+
+    assert [(frame["base_version"], frame["version"]) for frame in frames(websocket)] == [(0, 1), (1, 3)]
+
+
+async def test_binary_clients_get_compact_frames(broadcaster, registry):
+    binary, text = await connect(broadcaster, encoding="msgpack"), await connect(broadcaster)
+    await registry.get("car").execute_command("lights_dim", {})
+    await asyncio.sleep(0)
+
+    frame, = binary_frames(binary)
+    assert (frame["t"], frame["b"], frame["n"]) == ("d", 0, 1)
+    assert frame["d"] == {"l": {"b": 70}}
+    assert frames(text)[0]["data"] == {"lights": {"brightness": 70}}
+
+async def test_resume_replays_the_missed_changes(broadcaster, registry):
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+    await car.execute_command("infotainment_mute", {})
+    await car.execute_command("lights_dim", {})
+
+    websocket = await connect(broadcaster)
+    await broadcaster.resume(websocket, car, last_version=1, request_id="r1")
+    await asyncio.sleep(0)
+
+    frame, = frames(websocket)
+    assert frame["type"] == "state_delta" and frame["replayed"]
+    assert (frame["base_version"], frame["version"], frame["request_id"]) == (1, 3, "r1")
+    assert frame["data"]["lights"] == {"brightness": 60}
+    assert frame["data"]["infotainment"] == {"muted": True}
+
+    # Later updates continue the chain from the replayed version
+    await car.execute_command("seats_heat_on", {})
+    await asyncio.sleep(0)
+    assert (frames(websocket)[-1]["base_version"], frames(websocket)[-1]["version"]) == (3, 4)
+
+
+async def test_resume_at_the_current_version_sends_state_unchanged(broadcaster, registry):
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+
+    websocket = await connect(broadcaster)
+    await broadcaster.resume(websocket, car, last_version=1)
+    await asyncio.sleep(0)
+    assert [(frame["type"], frame["version"]) for frame in frames(websocket)] == [("state_unchanged", 1)]
+
+
+@pytest.mark.parametrize("last_version", [0, 5])
+async def test_resume_falls_back_to_a_snapshot(broadcaster, registry, last_version):
+    broadcaster.replay = ReplayBuffer(2)
+    car = registry.get("car")
+    for _ in range(4):
+        await car.execute_command("infotainment_volume_up", {})
+
+    websocket = await connect(broadcaster)
+    await broadcaster.resume(websocket, car, last_version=last_version)
+    await asyncio.sleep(0)
+
+    frame, = frames(websocket)
+    assert frame["type"] == "state_update" and frame["data"]["version"] == 4
+    assert broadcaster.replay.stats["fallbacks"] == 1
+
+
+async def test_slow_callback_does_not_block_commands_on_the_default_bus(registry, monkeypatch):
+    # Wired like main.py with a single worker
+    monkeypatch.setattr("config.settings.WORKERS", 1)
+    broadcaster = StateBroadcaster(registry, ConnectionManager(), tick_ms=0, bus=create_bus("auto"))
+    broadcaster.attach()
+    await broadcaster.start_bus()
+    release = asyncio.Event()
+
+    async def slow_callback(action, parameters, result):
+        if action == "climate_turn_on_ac":
+            await release.wait()
+
+    registry.register_update_callback(slow_callback)
+    car = registry.get("car")
+    climate = asyncio.create_task(car.execute_command("climate_turn_on_ac", {}))
+    await asyncio.sleep(0)
+
+    # A worker alone on its bus takes no write leases, so nothing waits for the callback
+    try:
+        volume = await asyncio.wait_for(car.execute_command("infotainment_volume_up", {}), 1)
+        assert not climate.done()
+    finally:
+        release.set()
+    assert volume["success"] and car.write_lock is None
+    assert (await climate)["success"]
+    await broadcaster.stop_bus()
+    await broadcaster.connection_manager.shutdown()
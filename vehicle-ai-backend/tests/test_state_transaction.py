@@ -0,0 +1,34 @@
+# tests/test_state_transaction.py - Copy-on-write staging behind atomic batches
+import pytest
+
+from models.schemas import VehicleState
+from models.state_transaction import StateView
+
+
+def test_writes_are_staged_until_commit():
+    state = VehicleState()
+    view = StateView(state)
+    view.lights.brightness = 30
+    view.seats.driver_position["height"] = 70
+
+    assert view.lights.brightness == 30
+    assert state.lights.brightness == 80 and state.seats.driver_position["height"] == 50
+    assert sorted(view.staged_fields()) == [("lights", "brightness"), ("seats", "driver_position")]
+
+    assert view.commit() == 2
+    assert state.lights.brightness == 30 and state.seats.driver_position["height"] == 70
+
+
+def test_rollback_discards_staged_writes():
+    state = VehicleState()
+    view = StateView(state)
+    view.climate.fan_speed = 7
+    view.rollback()
+
+    assert view.staged_fields() == []
+    assert view.climate.fan_speed == state.climate.fan_speed == 3
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(AttributeError):
+        StateView(VehicleState()).lights.strobe = True
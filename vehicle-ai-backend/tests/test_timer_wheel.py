@@ -0,0 +1,53 @@
+# tests/test_timer_wheel.py - Hashed timer wheel behind the heartbeat sweep
+import pytest
+
+from services.timer_wheel import TimerWheel
+
+
+def test_timers_expire_on_their_tick():
+    wheel = TimerWheel(tick=1.0, slots=8, now=0.0)
+    wheel.schedule("a", 2.0, now=0.0)
+    wheel.schedule("b", 3.5, now=0.0)
+
+    assert wheel.advance(1.9) == []
+    assert wheel.advance(2.0) == ["a"]
+    # Delays are rounded up to the next tick
+    assert wheel.advance(3.5) == []
+    assert wheel.advance(4.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_timers_beyond_one_revolution_wait_for_their_tick():
+    wheel = TimerWheel(tick=1.0, slots=4, now=0.0)
+    wheel.schedule("near", 1.0, now=0.0)
+    wheel.schedule("far", 5.0, now=0.0)  # same slot as "near"
+
+    assert wheel.advance(1.0) == ["near"]
+    assert "far" in wheel
+    assert wheel.advance(4.0) == []
+    assert wheel.advance(5.0) == ["far"]
+
+
+def test_rescheduling_replaces_and_cancel_removes():
+    wheel = TimerWheel(tick=1.0, slots=8, now=0.0)
+    wheel.schedule("a", 1.0, now=0.0)
+    wheel.schedule("a", 3.0, now=0.0)
+    wheel.schedule("b", 1.0, now=0.0)
+    assert wheel.cancel("b")
+    assert not wheel.cancel("b")
+
+    assert wheel.advance(2.0) == []
+    assert wheel.advance(3.0) == ["a"]
+
+
+def test_advance_after_a_long_stall_returns_every_due_timer_once():
+    wheel = TimerWheel(tick=1.0, slots=4, now=0.0)
+    for index in range(4):
+        wheel.schedule(index, index + 1.0, now=0.0)
+    assert sorted(wheel.advance(100.0)) == [0, 1, 2, 3]
+    assert wheel.advance(200.0) == []
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        TimerWheel(tick=0)
@@ -0,0 +1,107 @@
+# tests/test_vehicle_registry.py - Per-vehicle state managers, eviction and limits
+import time
+
+import pytest
+
+from models.vehicle_registry import VehicleRegistry
+
+
+async def test_vehicles_have_independent_state(registry):
+    await registry.get("car-1").execute_command("lights_dim", {})
+    assert registry.get("car-1").version == 1
+    assert registry.get("car-2").version == 0
+    assert registry.get() is registry.get(registry.default_vehicle_id)
+
+
+@pytest.mark.parametrize("vehicle_id", ["a" * 65, "car/1", "car 1", "../etc"])
+def test_invalid_vehicle_ids_are_rejected(registry, vehicle_id):
+    with pytest.raises(ValueError):
+        registry.get(vehicle_id)
+    assert vehicle_id not in registry
+
+
+def test_least_recently_used_vehicle_makes_room():
+    removed = []
+    registry = VehicleRegistry(default_vehicle_id="default", max_vehicles=3, idle_timeout=0)
+    registry.register_removal_callback(removed.append)
+    for vehicle_id in ("default", "a", "b"):
+        registry.get(vehicle_id)
+    registry.get("a")
+
+    registry.get("c")
+    assert removed == ["b"]
+    assert registry.vehicle_ids() == ["default", "a", "c"]
+
+
+def test_busy_vehicles_are_kept_and_the_limit_enforced():
+    registry = VehicleRegistry(default_vehicle_id="default", max_vehicles=2, idle_timeout=0)
+    registry.is_in_use = lambda vehicle_id: vehicle_id == "busy"
+    registry.get("default")
+    registry.get("busy")
+
+    with pytest.raises(ValueError, match="Vehicle limit reached"):
+        registry.get("another")
+    assert registry.vehicle_ids() == ["default", "busy"]
+
+
+def test_idle_vehicles_are_dropped(monkeypatch):
+    registry = VehicleRegistry(default_vehicle_id="default", max_vehicles=0, idle_timeout=60)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    registry.get("default")
+    registry.get("old")
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    registry.get("new")
+    assert registry.vehicle_ids() == ["default", "new"]
+    assert registry.evictions == 1
+
+
+async def test_update_callbacks_follow_vehicles(registry):
+    seen = []
+
+    async def on_update(action, parameters, result):
+        seen.append(result["vehicle_id"])
+
+    registry.get("car-1")
+    registry.register_update_callback(on_update)
+    await registry.get("car-1").execute_command("lights_dim", {})
+    await registry.get("car-2").execute_command("lights_dim", {})
+    assert seen == ["car-1", "car-2"]
+
+    manager = registry.get("car-1")
+    registry.remove("car-1")
+    await manager.execute_command("lights_dim", {})
+    assert seen == ["car-1", "car-2"]
+
+
+def test_routers_address_vehicles_by_query_parameter(api_client):
+    assert api_client.post("/api/lights/brightness", params={"brightness": 40, "vehicle_id": "car-2"}).status_code == 200
+    assert api_client.get("/api/lights/status", params={"vehicle_id": "car-2"}).json()["brightness"] == 40
+    assert api_client.get("/api/lights/status").json()["brightness"] == 80
+    assert api_client.get("/api/lights/status", params={"vehicle_id": "car/2"}).status_code == 400
+
+
+async def test_recreated_vehicle_starts_above_its_last_version(registry):
+    car = registry.get("car")
+    await car.execute_command("lights_dim", {})
+    await car.execute_command("lights_dim", {})
+    registry.remove("car")
+
+    again = registry.get("car")
+    assert again.version == 3 and again.state.lights.brightness == 80
+    # A writer that last saw the dropped state cannot overwrite the defaults
+    stale = await again.execute_command("lights_dim", {}, expected_version=2)
+    assert stale["conflict"] and again.state.lights.brightness == 80
+
+
+async def test_forgotten_versions_raise_the_floor_for_every_vehicle():
+    registry = VehicleRegistry(max_vehicles=0, idle_timeout=0, max_tombstones=1)
+    for vehicle_id, commands in (("a", 2), ("b", 1)):
+        for _ in range(commands):
+            await registry.get(vehicle_id).execute_command("lights_dim", {})
+        registry.remove(vehicle_id)
+
+    assert registry.get("b").version == 2
+    assert registry.get("a").version == 3
+    assert registry.get("new").version == 3
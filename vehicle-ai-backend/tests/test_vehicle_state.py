@@ -0,0 +1,179 @@
+# tests/test_vehicle_state.py - Locking, batches, transactions and versioning of VehicleStateManager
+import asyncio
+
+import pytest
+
+from models.vehicle_state import VehicleStateManager
+
+
+def record_updates(vehicle_state):
+    updates = []
+
+    async def on_update(action, parameters, result):
+        updates.append((action, result))
+
+    vehicle_state.register_update_callback(on_update)
+    return updates
+
+
+async def test_unknown_action_category(vehicle_state):
+    result = await vehicle_state.execute_command("wipers_on", {})
+    assert not result["success"]
+    assert result["error"] == "Unknown action category: wipers_on"
+    assert vehicle_state.version == 0
+
+
+async def test_slow_callback_does_not_block_other_commands(vehicle_state):
+    release = asyncio.Event()
+
+    async def slow_callback(action, parameters, result):
+        if action == "climate_turn_on_ac":
+            await release.wait()
+
+    vehicle_state.register_update_callback(slow_callback)
+    climate = asyncio.create_task(vehicle_state.execute_command("climate_turn_on_ac", {}))
+    await asyncio.sleep(0)
+
+    # Neither another subsystem nor the same one waits for the callback: the lock is already released
+    volume = await asyncio.wait_for(vehicle_state.execute_command("infotainment_volume_up", {}), 1)
+    fan = await asyncio.wait_for(vehicle_state.execute_command("climate_set_fan_speed", {"speed": 5}), 1)
+    assert volume["success"] and fan["success"]
+    assert not climate.done()
+
+    release.set()
+    assert (await climate)["success"]
+    assert vehicle_state.state.climate.fan_speed == 5 and vehicle_state.state.infotainment.volume == 55
+    assert vehicle_state.version == 3
+
+
+async def test_versions_increase_once_per_successful_command(vehicle_state):
+    first = await vehicle_state.execute_command("lights_dim", {})
+    failed = await vehicle_state.execute_command("climate_set_fan_speed", {"speed": 9})
+    second = await vehicle_state.execute_command("lights_dim", {})
+    assert (first["version"], second["version"]) == (1, 2)
+    assert not failed["success"]
+    assert vehicle_state.version == 2
+
+
+async def test_compare_and_set(vehicle_state):
+    await vehicle_state.execute_command("lights_dim", {})
+
+    stale = await vehicle_state.execute_command("lights_dim", {}, expected_version=0)
+    assert stale["conflict"] and stale["current_version"] == 1
+    assert vehicle_state.state.lights.brightness == 70
+
+    current = await vehicle_state.execute_command("lights_dim", {}, expected_version=1)
+    assert current["success"] and current["version"] == 2
+
+
+async def test_concurrent_compare_and_set_has_one_winner(vehicle_state):
+    results = await asyncio.gather(*[
+        vehicle_state.execute_command(action, {}, expected_version=0)
+        for action in ("lights_dim", "infotainment_mute", "seats_heat_on", "climate_turn_on_ac")
+    ])
+    assert sum(1 for result in results if result["success"]) == 1
+    assert sum(1 for result in results if result.get("conflict")) == 3
+    assert vehicle_state.version == 1
+
+
+async def test_batch_applies_under_one_version_and_one_update(vehicle_state):
+    updates = record_updates(vehicle_state)
+    result = await vehicle_state.execute_batch([
+        {"action": "climate_decrease_temperature"},
+        {"action": "lights_set_brightness", "parameters": {"brightness": 30}},
+        {"action": "climate_set_fan_speed", "parameters": {"speed": 9}},
+        {"action": "infotainment_mute"},
+    ])
+
+    assert not result["success"]
+    assert (result["succeeded"], result["failed"], result["not_run"]) == (3, 1, 0)
+    assert [entry["applied"] for entry in result["results"]] == [True, True, False, True]
+    assert result["version"] == vehicle_state.version == 1
+    assert result["changes"] == {"climate": {"temperature": 21.0}, "lights": {"brightness": 30},
+                                 "infotainment": {"muted": True}}
+    assert [action for action, _ in updates] == ["batch"]
+
+
+async def test_transaction_rolls_back_on_failure(vehicle_state):
+    updates = record_updates(vehicle_state)
+    before = vehicle_state.get_all_states()
+    result = await vehicle_state.execute_transaction([
+        {"action": "lights_dim"},
+        {"action": "climate_set_fan_speed", "parameters": {"speed": 9}},
+        {"action": "infotainment_mute"},
+    ])
+
+    assert not result["success"] and not result["committed"]
+    assert (result["succeeded"], result["failed"], result["rolled_back"], result["not_run"]) == (0, 1, 1, 1)
+    first, failing, skipped = result["results"]
+    assert first["rolled_back"] and not first["success"] and not first["applied"]
+    assert failing["error"] == "Invalid fan speed"
+    assert skipped["not_run"]
+    assert result["changes"] == {}
+    assert vehicle_state.get_all_states() == before
+    assert updates == []
+
+
+async def test_transaction_commits_all_commands(vehicle_state):
+    result = await vehicle_state.execute_transaction([
+        {"action": "lights_dim"},
+        {"action": "seats_heat_on", "parameters": {"seat": "passenger"}},
+    ])
+    assert result["success"] and result["committed"]
+    assert vehicle_state.state.lights.brightness == 70
+    assert vehicle_state.state.seats.passenger_heating
+    assert vehicle_state.version == 1
+
+
+async def test_stale_transaction_is_rejected_before_running(vehicle_state):
+    await vehicle_state.execute_command("lights_dim", {})
+    result = await vehicle_state.execute_transaction([{"action": "lights_dim"}], expected_version=0)
+    assert result["conflict"]
+    assert vehicle_state.state.lights.brightness == 70
+
+
+async def test_reset_bumps_the_version(vehicle_state):
+    await vehicle_state.execute_command("lights_dim", {})
+    await vehicle_state.reset_all_states()
+    assert vehicle_state.version == 2
+    assert vehicle_state.state.lights.brightness == VehicleStateManager().state.lights.brightness
+
+
+async def test_apply_remote_state_validates_and_only_moves_forward(vehicle_state):
+    remote = VehicleStateManager("other")
+    await remote.execute_command("climate_set_temperature", {"temperature": 31})
+    await remote.execute_command("lights_dim", {})
+
+    assert await vehicle_state.apply_remote_state(remote.get_all_states())
+    assert vehicle_state.version == 2 and vehicle_state.state.climate.temperature == 31.0
+
+    assert not await vehicle_state.apply_remote_state({**remote.get_all_states(), "version": 1})
+
+    invalid = {**remote.get_all_states(), "version": 3, "lights": {"brightness": "dazzling"}}
+    with pytest.raises(ValueError):
+        await vehicle_state.apply_remote_state(invalid)
+    assert vehicle_state.version == 2 and vehicle_state.state.lights.brightness == 70
+
+
+def test_batch_endpoint(api_client):
+    response = api_client.post("/api/commands/batch", json={
+        "commands": [{"action": "lights_dim"}, {"action": "lights_set_color", "parameters": {"color": "pink"}}]
+    })
+    assert response.status_code == 200
+    assert (response.json()["succeeded"], response.json()["failed"]) == (1, 1)
+    assert api_client.get("/api/lights/status").json()["brightness"] == 70
+
+    response = api_client.post("/api/commands/batch", json={
+        "atomic": True,
+        "commands": [{"action": "lights_dim"}, {"action": "lights_set_color", "parameters": {"color": "pink"}}]
+    })
+    assert response.json()["committed"] is False
+    assert api_client.get("/api/lights/status").json()["brightness"] == 70
+
+    stale = api_client.post("/api/commands/batch", json={"expected_version": 0, "commands": [{"action": "lights_dim"}]})
+    assert stale.status_code == 409
+    assert stale.json()["detail"]["current_version"] == 1
+
+
+def test_batch_endpoint_rejects_empty_batches(api_client):
+    assert api_client.post("/api/commands/batch", json={"commands": []}).status_code == 400
@@ -0,0 +1,63 @@
+# tests/test_websocket_endpoint.py - Request handling on the /ws endpoint of main.py
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import main
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_tagged_requests_are_answered_out_of_order(client, monkeypatch):
+    async def slow_voice_command(text):
+        await asyncio.sleep(0.2)
+        return {"type": "command_response", "original_text": text}
+
+    monkeypatch.setattr(main, "process_voice_command", slow_voice_command)
+    with client.websocket_connect("/ws?vehicle_id=pipeline-1") as websocket:
+        assert websocket.receive_json()["type"] == "connection_established"
+        websocket.send_json({"type": "voice_command", "text": "dim the lights", "request_id": "slow"})
+        websocket.send_json({"type": "get_state", "request_id": 2})
+
+        first, second = websocket.receive_json(), websocket.receive_json()
+        assert (first["type"], first["request_id"]) == ("state_update", 2)
+        assert (second["type"], second["request_id"]) == ("command_response", "slow")
+
+
+def test_untagged_requests_are_answered_in_order(client):
+    with client.websocket_connect("/ws?vehicle_id=pipeline-2") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "manual_control", "action": "lights_dim", "parameters": {}})
+        websocket.send_json({"type": "get_state", "known_version": 1})
+
+        assert websocket.receive_json()["type"] == "manual_control_response"
+        reply = websocket.receive_json()
+        assert reply["type"] == "state_unchanged" and "request_id" not in reply
+
+
+def test_unknown_tagged_request_gets_an_error(client):
+    with client.websocket_connect("/ws?vehicle_id=pipeline-3") as websocket:
+        websocket.receive_json()
+        websocket.send_json({"type": "teleport", "request_id": 9})
+
+        reply = websocket.receive_json()
+        assert reply["type"] == "error" and reply["request_id"] == 9
+        assert reply["data"]["code"] == "INVALID_MESSAGE"
+
+
+def test_full_registry_closes_the_connection_after_admission(client, monkeypatch):
+    registry = main.vehicle_registry
+    monkeypatch.setattr(registry, "max_vehicles", len(registry.vehicle_ids()))
+    monkeypatch.setattr(registry, "is_in_use", lambda vehicle_id: True)
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/ws?vehicle_id=overflow") as websocket:
+            while True:
+                websocket.receive_json()
+    assert closed.value.code == 1013
+    assert "overflow" not in registry
@@ -0,0 +1,233 @@
+# tests/test_websocket_manager.py - Frame fanout, send queues and heartbeats of ConnectionManager
+import asyncio
+import json
+import time
+
+import pytest
+
+from services.websocket_manager import ConnectionManager, FrameCache, PreparedFrame
+from tests.fakes import FakeWebSocket, StalledWebSocket
+
+
+@pytest.fixture
+async def manager():
+    manager = ConnectionManager()
+    yield manager
+    for websocket in list(manager.clients):
+        if isinstance(websocket, StalledWebSocket):
+            websocket.release()
+    await manager.shutdown()
+
+
+def state_frame(number: int, coalesce: bool = False) -> PreparedFrame:
+    return PreparedFrame.from_message({"type": "state_update", "n": number}, droppable=True,
+                                      coalesce_key=("state", "car") if coalesce else None)
+
+
+def numbers(websocket):
+    return [json.loads(frame).get("n") for frame in websocket.sent]
+
+
+async def test_broadcast_serializes_the_frame_once(manager):
+    sockets = [FakeWebSocket() for _ in range(3)]
+    for websocket in sockets:
+        await manager.connect(websocket, "car")
+
+    frame = PreparedFrame.from_message({"type": "state_update", "n": 1})
+    await manager.broadcast(frame, vehicle_id="car")
+    await asyncio.sleep(0)
+    assert all(websocket.sent[-1] is frame.text for websocket in sockets)
+    assert len(frame) == len(frame.text.encode("utf-8"))
+
+
+async def test_connections_get_unique_ids(manager):
+    first, second = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(first, "car")
+    await manager.connect(second, "car")
+    await asyncio.sleep(0)
+    welcome = json.loads(first.sent[0])
+    assert welcome["type"] == "connection_established" and welcome["connection_id"] == 1
+    assert manager.get_connection(2) is second
+
+    manager.disconnect(first)
+    assert manager.get_connection(1) is None and list(manager.active_connections) == [second]
+    third = FakeWebSocket()
+    await manager.connect(third, "car")
+    assert manager.active_connections[third] == 3
+
+
+async def test_welcome_reports_the_heartbeat_interval_in_milliseconds(manager):
+    manager.heartbeat_interval = 30
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, "car")
+    await asyncio.sleep(0)
+    assert json.loads(websocket.sent[0])["heartbeat_interval"] == 30000
+
+
+def test_frame_cache_keeps_the_most_recently_used_frames():
+    cache = FrameCache(max_entries=2)
+    built = []
+
+    def build(number):
+        built.append(number)
+        return {"n": number}
+
+    first = cache.get_or_build(1, lambda: build(1))
+    cache.get_or_build(2, lambda: build(2))
+    assert cache.get_or_build(1, lambda: build(1)) is first
+    cache.get_or_build(3, lambda: build(3))
+    cache.get_or_build(2, lambda: build(2))
+
+    assert built == [1, 2, 3, 2]
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 4}
+
+
+async def test_drop_oldest_keeps_the_newest_state_frames(manager):
+    manager.send_queue_size = 3
+    websocket = StalledWebSocket()
+    manager._register(websocket, "car", "full")
+    for number in range(6):
+        await manager.send_personal_message(state_frame(number), websocket)
+
+    websocket.release()
+    await asyncio.sleep(0.01)
+    assert numbers(websocket) == [3, 4, 5]
+    assert manager.send_stats["frames_dropped"] == 3
+    assert websocket in manager.clients
+
+
+async def test_coalesce_replaces_superseded_frames(manager):
+    manager.drop_policy = "coalesce"
+    websocket = StalledWebSocket()
+    manager._register(websocket, "car", "full")
+    await manager.send_personal_message(state_frame(1, coalesce=True), websocket)
+    await manager.send_personal_message(PreparedFrame.from_message({"type": "command_result", "n": 2}), websocket)
+    await manager.send_personal_message(state_frame(3, coalesce=True), websocket)
+
+    websocket.release()
+    await asyncio.sleep(0)
+    assert numbers(websocket) == [2, 3]
+    assert manager.send_stats["frames_coalesced"] == 1
+
+
+async def test_disconnect_policy_evicts_a_slow_client(manager):
+    manager.send_queue_size = 2
+    manager.drop_policy = "disconnect"
+    websocket = StalledWebSocket()
+    manager._register(websocket, "car", "full")
+    for number in range(3):
+        await manager.send_personal_message(state_frame(number), websocket)
+
+    await asyncio.sleep(0.01)
+    assert websocket not in manager.clients and "car" not in manager.vehicle_connections
+    assert websocket.closed == (1013, "")
+    assert manager.send_stats["evictions"] == 1
+
+
+async def test_frames_that_must_be_delivered_are_never_dropped(manager):
+    manager.send_queue_size = 2
+    websocket = StalledWebSocket()
+    manager._register(websocket, "car", "full")
+    for number in range(3):
+        await manager.send_personal_message(PreparedFrame.from_message({"n": number}), websocket)
+
+    assert websocket not in manager.clients
+    assert manager.send_stats["frames_dropped"] == 0 and manager.send_stats["evictions"] == 1
+
+
+async def test_a_stalled_client_does_not_delay_the_others(manager):
+    stalled, healthy = StalledWebSocket(), FakeWebSocket()
+    manager._register(stalled, "car", "full")
+    manager._register(healthy, "car", "full")
+
+    await asyncio.wait_for(manager.broadcast(state_frame(1), vehicle_id="car"), 1)
+    await asyncio.sleep(0)
+    assert numbers(healthy) == [1] and stalled.sent == []
+
+
+async def test_ping_is_answered_to_the_sender_only(manager):
+    pinger, other = FakeWebSocket(), FakeWebSocket()
+    manager._register(pinger, "car", "full")
+    manager._register(other, "car", "full")
+
+    await manager.handle_heartbeat({"type": "ping", "timestamp": 1}, pinger)
+    await asyncio.sleep(0)
+    assert [json.loads(frame)["type"] for frame in pinger.sent] == ["pong"]
+    assert json.loads(pinger.sent[0])["ping_timestamp"] == 1
+    assert other.sent == []
+
+
+async def test_heartbeat_timers_ping_each_connection_once_per_interval(manager):
+    sockets = [FakeWebSocket() for _ in range(10)]
+    for websocket in sockets:
+        manager._register(websocket, "car", "full")
+
+    now = time.monotonic()
+    pinged, reaped = manager.run_heartbeat_timers(now + manager.heartbeat_interval)
+    assert (pinged, reaped) == (10, 0)
+    assert manager.run_heartbeat_timers(now + manager.heartbeat_interval)[0] == 0
+    assert manager.run_heartbeat_timers(now + 2 * manager.heartbeat_interval + 1)[0] == 10
+
+
+async def test_heartbeat_deadline_reaps_silent_connections(manager):
+    manager.idle_timeout = 5
+    silent, chatty = FakeWebSocket(), FakeWebSocket()
+    manager._register(silent, "car", "full")
+    manager._register(chatty, "car", "full")
+    manager.connection_info[silent]["last_ping"] -= 10
+
+    reaped = manager.run_heartbeat_timers(time.monotonic() + 6)[1]
+    assert reaped == 1
+    await asyncio.sleep(0.01)
+    assert silent not in manager.clients and chatty in manager.clients
+    assert silent.closed == (1001, "")
+
+
+@pytest.mark.parametrize("cap, hosts, vehicles, rejected", [
+    ("max_connections", ["a", "b", "c"], ["v1", "v2", "v3"], "rejected_global"),
+    ("max_connections_per_host", ["a", "a", "a"], ["v1", "v2", "v3"], "rejected_host"),
+    ("max_connections_per_vehicle", ["a", "b", "c"], ["v1", "v1", "v1"], "rejected_vehicle"),
+])
+async def test_admission_caps(manager, cap, hosts, vehicles, rejected):
+    setattr(manager, cap, 2)
+    sockets = [FakeWebSocket(host) for host in hosts]
+    admitted = [await manager.connect(websocket, vehicle_id) for websocket, vehicle_id in zip(sockets, vehicles)]
+
+    assert admitted == [True, True, False]
+    assert sockets[2].closed == (1013, "") and sockets[2].sent == []
+    assert manager.admission_stats[rejected] == 1
+    assert len(manager.active_connections) == 2
+
+
+async def test_concurrent_connects_cannot_overshoot_a_cap(manager):
+    manager.max_connections = 2
+    gate = asyncio.Event()
+
+    class SlowHandshake(FakeWebSocket):
+        async def accept(self):
+            await gate.wait()
+
+    sockets = [SlowHandshake(f"10.0.0.{index}") for index in range(4)]
+    connecting = asyncio.gather(*[manager.connect(websocket, "car") for websocket in sockets])
+    await asyncio.sleep(0)
+    gate.set()
+    assert sorted(await connecting) == [False, False, True, True]
+
+
+async def test_topic_subscriptions(manager):
+    websocket = FakeWebSocket()
+    manager._register(websocket, "car", "delta")
+    assert manager.subscribed_topics(websocket) == ["car/climate", "car/infotainment", "car/lights", "car/seats"]
+
+    manager.unsubscribe(websocket, ["*"])
+    assert manager.subscribe(websocket, ["climate", "truck/lights"]) == ["car/climate", "truck/lights"]
+    assert websocket in manager.topic_subscribers("truck", ["lights", "seats"])
+    assert websocket not in manager.topic_subscribers("car", ["lights"])
+    assert manager.has_clients("truck")
+
+    with pytest.raises(ValueError):
+        manager.subscribe(websocket, ["car/wipers"])
+
+    manager.disconnect(websocket)
+    assert manager.topic_connections == {} and manager.vehicle_connections == {}
+    assert not manager.has_clients("truck")